@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+End-to-end API benchmark against a fake Firecrawl.
+
+Drives the FastAPI app in-process at each concurrency level and reports
+throughput, p50/p95/p99 latency and memory (current RSS, and peak RSS per
+level where Linux lets the peak be reset) for the single (/zillow),
+URL (/zillow/url) and batch (/zillow/batch) endpoints. Firecrawl is replaced
+by benchmarks/fake_firecrawl.py, which replays the recorded fixtures with the
+given latency and failure distributions; nothing leaves the process and no
+credits are spent.
+
+Every request asks for a different property and the zpid/result caches and
+wait tuning are off, so each run measures the full scrape path. The fake is
+seeded, so two runs on the same code see the same latencies and failures.
+
+    python benchmarks/api_benchmark.py --concurrency 1,10,50 --requests 200
+    python benchmarks/api_benchmark.py --error-rate 0.05 --blocked-rate 0.05
+
+CI-style: save a baseline, then fail (exit 1) when a later run's throughput
+drops, or its p95 grows, by more than --tolerance:
+
+    python benchmarks/api_benchmark.py --save baseline.json
+    python benchmarks/api_benchmark.py --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Dict, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("FIRECRAWL_API_KEY", "fc-benchmark")
+# measure the scrape path itself: no caches, no learned waits, no background work
+os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+os.environ.setdefault("ZPID_CACHE_BACKEND", "none")
+os.environ.setdefault("CHANGE_DETECTION_ENABLED", "false")
+os.environ.setdefault("WAIT_TUNING_ENABLED", "false")
+os.environ.setdefault("FIRECRAWL_CALLS_PER_MINUTE", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+
+import httpx
+
+from fake_firecrawl import FakeFirecrawl
+
+ENDPOINTS = ("single", "url", "batch")
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rss_mb() -> float:
+    # current resident set size
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb() -> float:
+    # high-water mark since reset_peak_rss() (VmHWM), else for the whole process so far
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def reset_peak_rss() -> None:
+    # Linux: writing 5 to clear_refs resets VmHWM, so each level gets its own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+class Workload:
+    # hands out request bodies that each name a property no earlier request asked for
+    def __init__(self, batch_size: int, include_raw: bool = False):
+        self.batch_size = batch_size
+        self.query = "?include_raw=true" if include_raw else ""
+        self.counter = 0
+
+    def _next(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def address(self) -> dict:
+        n = self._next()
+        return {
+            "address": f"{n} Benchmark Ave",
+            "city": "Austin",
+            "state": "TX",
+            "zip": "78701",
+        }
+
+    def request(self, endpoint: str) -> Tuple[str, dict]:
+        if endpoint == "single":
+            return "/api/scrape/zillow" + self.query, self.address()
+        if endpoint == "url":
+            zpid = 20000000 + self._next()
+            return "/api/scrape/zillow/url" + self.query, {
+                "zillow_url": f"https://www.zillow.com/homedetails/{zpid}-Benchmark-Ave-Austin-TX-78701/{zpid}_zpid/"
+            }
+        return "/api/scrape/zillow/batch" + self.query, {
+            "properties": [self.address() for _ in range(self.batch_size)]
+        }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    endpoint: str,
+    concurrency: int,
+    requests: int,
+    fake: FakeFirecrawl,
+) -> dict:
+    latencies = []
+    statuses: Dict[int, int] = {}
+    remaining = [requests]
+    calls_before = fake.calls
+    gc.collect()
+    reset_peak_rss()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    async def worker() -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            path, body = workload.request(endpoint)
+            started = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "firecrawl_calls": fake.calls - calls_before,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if tracemalloc.is_tracing():
+        result["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    if endpoint == "batch":
+        result["properties_per_second"] = round(
+            requests * workload.batch_size / elapsed, 2
+        )
+    return result
+
+
+async def run(args: argparse.Namespace) -> list:
+    from main import app
+    from routers import scraping
+    from services.firecrawl import ZillowScrapingService
+
+    # the service logs every scrape at INFO, which would drown the report
+    logging.getLogger().setLevel(args.log_level)
+    logging.getLogger("httpx").setLevel(args.log_level)
+
+    fake = FakeFirecrawl(
+        args.latency_median,
+        args.latency_p95,
+        args.error_rate,
+        args.blocked_rate,
+        args.action_wait_factor,
+        args.seed,
+    )
+    scraping.scraper = ZillowScrapingService(transport=fake.transport())
+    workload = Workload(args.batch_size, args.include_raw)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    results = []
+    headers = (
+        {"Accept-Encoding": args.accept_encoding} if args.accept_encoding else None
+    )
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        timeout=None,
+        headers=headers,
+    ) as client:
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                requests = (
+                    args.requests
+                    if endpoint != "batch"
+                    else max(concurrency, args.requests // args.batch_size)
+                )
+                result = await run_level(
+                    client, workload, endpoint, concurrency, requests, fake
+                )
+                results.append(result)
+                print(
+                    f"{endpoint:>6} c={concurrency:<4} {result['throughput_rps']:>8.1f} req/s  "
+                    f"p50 {result['p50_ms']:>7.1f}ms  p95 {result['p95_ms']:>7.1f}ms  p99 {result['p99_ms']:>7.1f}ms  "
+                    f"rss {result['rss_mb']:.0f}MB (peak {result['peak_rss_mb']:.0f}MB)  statuses {result['statuses']}"
+                )
+    await scraping.scraper.aclose()
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    # regressions against a saved run, matched by endpoint and concurrency
+    previous = {(item["endpoint"], item["concurrency"]): item for item in baseline}
+    regressions = []
+    for item in results:
+        before = previous.get((item["endpoint"], item["concurrency"]))
+        if before is None:
+            continue
+        label = f"{item['endpoint']} c={item['concurrency']}"
+        if item["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: throughput {before['throughput_rps']} -> {item['throughput_rps']} req/s"
+            )
+        if item["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p95 {before['p95_ms']} -> {item['p95_ms']} ms"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--endpoints",
+        default=",".join(ENDPOINTS),
+        help="comma-separated: single,url,batch",
+    )
+    parser.add_argument(
+        "--concurrency", default="1,10,50", help="comma-separated concurrency levels"
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=200,
+        help="requests per level (batch: properties per level)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=10, help="properties per batch request"
+    )
+    parser.add_argument(
+        "--latency-median",
+        type=float,
+        default=0.05,
+        help="fake Firecrawl median latency, seconds",
+    )
+    parser.add_argument(
+        "--latency-p95",
+        type=float,
+        default=0.15,
+        help="fake Firecrawl p95 latency, seconds",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="share of calls answered with HTTP 500",
+    )
+    parser.add_argument(
+        "--blocked-rate",
+        type=float,
+        default=0.0,
+        help="share of calls answered with a 403 page",
+    )
+    parser.add_argument(
+        "--action-wait-factor",
+        type=float,
+        default=0.0,
+        help="share of action waits the fake sleeps",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--include-raw",
+        action="store_true",
+        help="ask for raw_content in every response",
+    )
+    parser.add_argument(
+        "--accept-encoding", help="e.g. identity or gzip (default: httpx's own)"
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="also report the traced Python heap peak (slower)",
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed regression vs. --baseline"
+    )
+    args = parser.parse_args()
+    args.endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    results = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for property field extraction.
+
+Runs the original per-field extractor (kept below as the reference) and
+services.extraction.extract_property_fields over the recorded Firecrawl
+responses in benchmarks/fixtures/zillow/, checks that the markdown path
+returns identical results, and reports pages/second and MB/second for each.
+Fixtures that carry rawHtml are also timed through the embedded-JSON path.
+
+    python benchmarks/extraction_benchmark.py --scale 15 --seconds 2
+
+--scale repeats each page body to simulate large (~200 KB) listings.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.extraction import extract_property_fields
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "zillow")
+
+
+# --- reference: the extractor as it was before services/extraction.py ---
+
+
+def legacy_extract(markdown: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "address": metadata.get("title", "").replace(" | Zillow", ""),
+        "price": _legacy_price(markdown),
+        "bedrooms": _legacy_bedrooms(markdown),
+        "bathrooms": _legacy_bathrooms(markdown),
+        "square_feet": _legacy_square_feet(markdown),
+        "lot_size": _legacy_lot_size(markdown),
+        "year_built": _legacy_year_built(markdown),
+        "property_type": _legacy_property_type(markdown),
+        "description": metadata.get("description", ""),
+        "images": metadata.get("ogImage", []),
+    }
+
+
+def _legacy_price(markdown: str) -> Optional[str]:
+    import re
+
+    match = re.search(r"\$[\d,]+(?:\.\d{2})?", markdown)
+    return match.group(0) if match else None
+
+
+def _legacy_bedrooms(markdown: str) -> Optional[int]:
+    import re
+
+    match = re.search(r"(\d+)\s*(?:bd|bed|bedroom)", markdown.lower())
+    return int(match.group(1)) if match else None
+
+
+def _legacy_bathrooms(markdown: str) -> Optional[float]:
+    import re
+
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(?:ba|bath|bathroom)", markdown.lower())
+    return float(match.group(1)) if match else None
+
+
+def _legacy_square_feet(markdown: str) -> Optional[int]:
+    import re
+
+    match = re.search(r"([\d,]+)\s*(?:sq ft|sqft|square feet)", markdown.lower())
+    return int(match.group(1).replace(",", "")) if match else None
+
+
+def _legacy_lot_size(markdown: str) -> Optional[str]:
+    import re
+
+    match = re.search(r"([\d,.]+)\s*(?:acres?|sq ft lot)", markdown.lower())
+    return match.group(0) if match else None
+
+
+def _legacy_year_built(markdown: str) -> Optional[int]:
+    import re
+
+    match = re.search(r"(?:built|year built).*?(\d{4})", markdown.lower())
+    return int(match.group(1)) if match else None
+
+
+def _legacy_property_type(markdown: str) -> Optional[str]:
+    types = ["single family", "condo", "townhouse", "multi-family", "land", "mobile"]
+    markdown_lower = markdown.lower()
+    for prop_type in types:
+        if prop_type in markdown_lower:
+            return prop_type.title()
+    return None
+
+
+# fixture name, markdown, metadata, rawHtml
+Page = Tuple[str, str, Dict[str, Any], Optional[str]]
+
+
+def load_corpus(scale: int) -> List[Page]:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.json"))):
+        with open(path) as f:
+            page = json.load(f)
+        markdown = page["markdown"]
+        # repeat everything after the header so the first matches stay where they were
+        markdown = markdown + markdown[len(markdown) // 3 :] * (scale - 1)
+        corpus.append(
+            (
+                os.path.basename(path),
+                markdown,
+                page.get("metadata", {}),
+                page.get("rawHtml"),
+            )
+        )
+    return corpus
+
+
+def throughput(
+    extract: Callable[..., Dict[str, Any]], corpus: Sequence[Page], seconds: float
+) -> Tuple[float, float]:
+    pages = 0
+    size = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _, markdown, metadata, html in corpus:
+            extract(markdown, metadata, html)
+            pages += 1
+            size += len(markdown)
+    elapsed = time.perf_counter() - start
+    return pages / elapsed, size / elapsed / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.scale)
+    if not corpus:
+        sys.exit(f"No fixtures found in {FIXTURES}")
+
+    mismatches = 0
+    for name, markdown, metadata, _ in corpus:
+        expected = legacy_extract(markdown, metadata)
+        # the engine adds structured-only fields (zestimate, latitude, ...); compare the original ones
+        actual = extract_property_fields(markdown, metadata)
+        actual = {key: actual[key] for key in expected}
+        if json.dumps(expected, sort_keys=True) != json.dumps(actual, sort_keys=True):
+            mismatches += 1
+            print(f"MISMATCH {name}:\n  legacy: {expected}\n  engine: {actual}")
+
+    average_kb = sum(len(page[1]) for page in corpus) / len(corpus) / 1024
+    print(
+        f"{len(corpus)} fixtures, average {average_kb:.0f} KB markdown, {mismatches} mismatches"
+    )
+
+    markdown_only = [
+        (name, markdown, metadata, None) for name, markdown, metadata, _ in corpus
+    ]
+    legacy_pages, legacy_mb = throughput(
+        lambda md, meta, html: legacy_extract(md, meta), markdown_only, args.seconds
+    )
+    engine_pages, engine_mb = throughput(
+        extract_property_fields, markdown_only, args.seconds
+    )
+    print(f"legacy:   {legacy_pages:10.1f} pages/s {legacy_mb:8.1f} MB/s")
+    print(f"engine:   {engine_pages:10.1f} pages/s {engine_mb:8.1f} MB/s")
+    print(f"speedup: {engine_pages / legacy_pages:.2f}x")
+
+    with_html = [page for page in corpus if page[3]]
+    if with_html:
+        legacy_pages, _ = throughput(
+            lambda md, meta, html: legacy_extract(md, meta), with_html, args.seconds
+        )
+        structured_pages, _ = throughput(
+            extract_property_fields, with_html, args.seconds
+        )
+        print(
+            f"pages with embedded JSON ({len(with_html)}): legacy {legacy_pages:.1f} pages/s, "
+            f"structured {structured_pages:.1f} pages/s"
+        )
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the Firecrawl API that replays the recorded responses in
+benchmarks/fixtures/zillow/ instead of scraping, so the service can be load
+tested without spending credits.
+
+It answers POST /v1/scrape like Firecrawl does:
+  - a homedetails .../<zpid>_zpid/ URL gets one of the property-page fixtures
+    (picked by zpid, so the same property always gets the same page)
+  - the zillow.com homepage with search actions lands on a property page
+  - a /homes/..._rb/ search URL gets the search-results fixture, with a link
+    to a property page in its html
+
+and POST /v1/map with the search fixture's listing links, plus a few listings
+the results pages don't show and one outside the area.
+
+Latency is log-normal with the given median and p95, and calls can fail:
+--error-rate answers HTTP 500, --blocked-rate answers 200 with a 403 page.
+
+In-process (what benchmarks/api_benchmark.py does):
+
+    fake = FakeFirecrawl(latency_median=0.2, latency_p95=0.8, error_rate=0.02)
+    transport = fake.transport()   # an HttpxFirecrawlTransport talking to it
+
+Standalone, for a service running elsewhere (FIRECRAWL_API_URL=http://localhost:3002):
+
+    python benchmarks/fake_firecrawl.py --port 3002 --latency-median 0.2
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+if TYPE_CHECKING:
+    from services.transport import HttpxFirecrawlTransport
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "zillow")
+ZPID_RE = re.compile(r"(\d+)_zpid")
+LISTING_LINK_RE = re.compile(r"\((https://www\.zillow\.com/homedetails/[^)]+_zpid/)\)")
+
+
+def load_fixtures() -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    pages: Dict[str, Dict[str, Any]] = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.json"))):
+        with open(path) as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    detail_pages = [page for name, page in pages.items() if name != "search_results"]
+    return detail_pages, pages.get("search_results", {})
+
+
+class FakeFirecrawl:
+    def __init__(
+        self,
+        latency_median: float = 0.1,
+        latency_p95: float = 0.3,
+        error_rate: float = 0.0,
+        blocked_rate: float = 0.0,
+        action_wait_factor: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_median = latency_median
+        # log-normal: p95 = median * exp(1.645 * sigma)
+        self.sigma = (
+            math.log(latency_p95 / latency_median) / 1.645
+            if latency_p95 > latency_median > 0
+            else 0.0
+        )
+        self.error_rate = error_rate
+        self.blocked_rate = blocked_rate
+        # how much of the requested wait actions to actually wait (0 keeps runs short)
+        self.action_wait_factor = action_wait_factor
+        self.random = random.Random(seed)
+        self.detail_pages, self.search_page = load_fixtures()
+        self.calls = 0
+        self.app = Starlette(
+            routes=[
+                Route("/v1/scrape", self.scrape, methods=["POST"]),
+                Route("/v1/map", self.map, methods=["POST"]),
+            ]
+        )
+
+    def transport(self, **kwargs: Any) -> "HttpxFirecrawlTransport":
+        # an HttpxFirecrawlTransport whose requests are served by this fake, in-process
+        from services.transport import HttpxFirecrawlTransport
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app), timeout=None
+        )
+        return HttpxFirecrawlTransport(
+            api_key="fc-benchmark",
+            api_url="http://fake-firecrawl",
+            client=client,
+            **kwargs,
+        )
+
+    def latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self.latency_median * math.exp(self.sigma * self.random.gauss(0, 1))
+
+    async def scrape(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        self.calls += 1
+        url = body["url"]
+        formats = body.get("formats", ["markdown"])
+        actions = body.get("actions") or []
+
+        delay = self.latency()
+        delay += (
+            self.action_wait_factor
+            * sum(action.get("milliseconds", 0) for action in actions)
+            / 1000
+        )
+        await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.error_rate:
+            return JSONResponse(
+                {"success": False, "error": "Internal server error (fake)"},
+                status_code=500,
+            )
+
+        match = ZPID_RE.search(url)
+        if match:
+            page = self._property_page(url, match.group(1))
+        elif "/homes/" in url:
+            page = self._search_page(url)
+        else:
+            # a search from the homepage lands on a property page
+            zpid = str(
+                int(
+                    hashlib.md5(
+                        url.encode() + json.dumps(actions).encode()
+                    ).hexdigest()[:7],
+                    16,
+                )
+            )
+            page = self._property_page(
+                f"https://www.zillow.com/homedetails/fake/{zpid}_zpid/", zpid
+            )
+
+        if roll < self.error_rate + self.blocked_rate:
+            page["metadata"]["statusCode"] = 403
+            page["markdown"] = "Access to this page has been denied."
+            page.pop("rawHtml", None)
+
+        data = {"metadata": page["metadata"]}
+        for format in formats:
+            if format in page:
+                data[format] = page[format]
+            elif format == "html":
+                data["html"] = page.get("rawHtml", "")
+        return JSONResponse({"success": True, "data": data})
+
+    async def map(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        self.calls += 1
+        await asyncio.sleep(self.latency())
+        links = list(
+            dict.fromkeys(LISTING_LINK_RE.findall(self.search_page["markdown"]))
+        )
+        links += [
+            f"https://www.zillow.com/homedetails/{n}-Side-St-Austin-TX-78701/{41000000 + n}_zpid/"
+            for n in range(5)
+        ]
+        links.append(
+            "https://www.zillow.com/homedetails/9-Elm-St-Dallas-TX-75201/42000000_zpid/"
+        )
+        return JSONResponse(
+            {"success": True, "links": links[: body.get("limit") or len(links)]}
+        )
+
+    def _property_page(self, url: str, zpid: str) -> dict:
+        page = dict(self.detail_pages[int(zpid) % len(self.detail_pages)])
+        page["metadata"] = dict(page.get("metadata", {}), sourceURL=url, statusCode=200)
+        return page
+
+    def _search_page(self, url: str) -> dict:
+        page = dict(self.search_page)
+        zpid = int(hashlib.md5(url.encode()).hexdigest()[:7], 16)
+        page["metadata"] = dict(page.get("metadata", {}), sourceURL=url, statusCode=200)
+        page["html"] = (
+            f'<a href="https://www.zillow.com/homedetails/fake/{zpid}_zpid/">listing</a>'
+        )
+        return page
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=3002)
+    parser.add_argument("--latency-median", type=float, default=0.1)
+    parser.add_argument("--latency-p95", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--blocked-rate", type=float, default=0.0)
+    parser.add_argument("--action-wait-factor", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    fake = FakeFirecrawl(
+        args.latency_median,
+        args.latency_p95,
+        args.error_rate,
+        args.blocked_rate,
+        args.action_wait_factor,
+        args.seed,
+    )
+    uvicorn.run(fake.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Load test for the Firecrawl transports.
+
+Fires N concurrent /api/scrape/zillow/url requests at the FastAPI app with
+Firecrawl replaced by a fake that takes LATENCY seconds per scrape, and checks
+/health latency while the scrapes are in flight. No credits are spent.
+
+    python benchmarks/load_transport.py --requests 20 --latency 0.5
+
+With the old blocking client the wall time is ~requests * latency; with the
+httpx or executor transport it should be close to a single latency.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("FIRECRAWL_API_KEY", "fc-benchmark")
+# measure the transport: every request is a different property, and nothing answers
+# from a cache, waits on a cross-worker lock or learns waits in the background
+os.environ.setdefault("RESULT_CACHE_ENABLED", "false")
+os.environ.setdefault("ZPID_CACHE_BACKEND", "none")
+os.environ.setdefault("CHANGE_DETECTION_ENABLED", "false")
+os.environ.setdefault("SHARED_STATE_BACKEND", "memory")
+os.environ.setdefault("WAIT_TUNING_ENABLED", "false")
+os.environ.setdefault("FIRECRAWL_CALLS_PER_MINUTE", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+
+import httpx
+
+from config.settings import settings
+from firecrawl.firecrawl import ScrapeResponse
+from services.transport import HttpxFirecrawlTransport, ExecutorFirecrawlTransport
+
+
+def property_url(number: int) -> str:
+    # a different zpid per request, so no two requests coalesce into one scrape
+    return f"https://www.zillow.com/homedetails/123-Main-St-Austin-TX-78701/{12345678 + number}_zpid/"
+
+
+def property_page(url: str) -> dict:
+    return {
+        "markdown": "# 123 Main St\n$500,000\n3 bd 2 ba 1,800 sqft\nSingle Family\nBuilt in 1999",
+        "metadata": {
+            "title": "123 Main St, Austin, TX 78701 | Zillow",
+            "sourceURL": url,
+            "statusCode": 200,
+        },
+    }
+
+
+def mock_httpx_transport(latency: float) -> HttpxFirecrawlTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        url = json.loads(request.content)["url"]
+        return httpx.Response(200, json={"success": True, "data": property_page(url)})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return HttpxFirecrawlTransport(api_key="fc-benchmark", client=client)
+
+
+class SlowSyncApp:
+    # stands in for FirecrawlApp: a blocking call that takes `latency` seconds
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def scrape_url(self, url: str, **params: Any) -> ScrapeResponse:
+        time.sleep(self.latency)
+        return ScrapeResponse(**property_page(url))
+
+
+class BlockingTransport:
+    # the pre-transport behaviour: the sync SDK called directly on the event loop
+    def __init__(self, latency: float):
+        self.app = SlowSyncApp(latency)
+
+    async def scrape_url(self, url: str, **params: Any) -> ScrapeResponse:
+        return self.app.scrape_url(url, **params)
+
+    async def aclose(self) -> None:
+        pass
+
+
+async def run(label: str, transport: Any, requests: int) -> dict:
+    from main import app
+    from routers import scraping
+    from services.firecrawl import ZillowScrapingService
+
+    scraping.scraper = ZillowScrapingService(transport=transport)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+
+        async def scrape(number: int) -> int:
+            response = await client.post(
+                "/api/scrape/zillow/url", json={"zillow_url": property_url(number)}
+            )
+            return response.status_code
+
+        async def health() -> float:
+            # ask for /health 50ms after the scrapes start; a blocked loop delays the answer
+            start = time.perf_counter()
+            await asyncio.sleep(0.05)
+            await client.get("/health")
+            return time.perf_counter() - start - 0.05
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            health(), *[scrape(number) for number in range(requests)]
+        )
+        wall = time.perf_counter() - start
+
+    await transport.aclose()
+    return {
+        "transport": label,
+        "requests": requests,
+        "ok": sum(1 for status in results[1:] if status == 200),
+        "wall_seconds": round(wall, 3),
+        "health_seconds": round(results[0], 3),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    workers = max(args.requests, 1)
+    # every request gets a scrape slot; the transport is what's being measured. The
+    # settings were read when services.transport was imported, so this sets them
+    # directly: each run's service sizes its limiter and credit queue from them.
+    settings.max_concurrent_scrapes = workers
+    transports = [
+        ("blocking", BlockingTransport(args.latency)),
+        (
+            "executor",
+            ExecutorFirecrawlTransport(SlowSyncApp(args.latency), max_workers=workers),
+        ),
+        ("httpx", mock_httpx_transport(args.latency)),
+    ]
+    for label, transport in transports:
+        print(json.dumps(await run(label, transport, args.requests)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Multi-worker scaling benchmark.
+
+Starts benchmarks/fake_firecrawl.py as a server, then for each worker count
+runs the app under gunicorn (gunicorn.conf.py, WEB_CONCURRENCY=N) with shared
+state on, and loads /api/scrape/zillow/url from several client processes.
+Reports throughput, p50/p95 and the speedup and per-worker efficiency against
+the first worker count. Scaling should be close to linear up to the number of
+cores left over after the clients and the fake.
+
+Every request is a different zpid and the result cache is off, so each one
+is a full scrape: shared rate-limit token, coalescing lock, Firecrawl call and
+extraction. The rate limit is set high enough never to bind, so the shared
+bucket is exercised without throttling anything.
+
+    python benchmarks/scaling_benchmark.py --workers 1,2,4 --duration 10
+    python benchmarks/scaling_benchmark.py --shared-state redis   # CACHE_REDIS_URL
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def drive(
+    base_url: str, first_zpid: int, concurrency: int, warmup: float, duration: float
+) -> Tuple[List[float], int]:
+    # one client process: `concurrency` connections for warmup + duration seconds,
+    # counting only requests that start after the warmup
+    async def run() -> Tuple[List[float], int]:
+        latencies: List[float] = []
+        errors = 0
+        started = time.monotonic()
+        measure_from, stop_at = started + warmup, started + warmup + duration
+        zpid = [first_zpid]
+
+        async def connection(client: httpx.AsyncClient) -> None:
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                zpid[0] += 1
+                url = f"https://www.zillow.com/homedetails/{zpid[0]}-Bench-St-Austin-TX-78701/{zpid[0]}_zpid/"
+                sent = time.monotonic()
+                try:
+                    response = await client.post(
+                        "/api/scrape/zillow/url", json={"zillow_url": url}
+                    )
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if sent >= measure_from:
+                    latencies.append(time.monotonic() - sent)
+                    errors += not ok
+
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(
+            base_url=base_url, timeout=120, limits=limits
+        ) as client:
+            await asyncio.gather(*[connection(client) for _ in range(concurrency)])
+        return latencies, errors
+
+    return asyncio.run(run())
+
+
+def measure(
+    args: argparse.Namespace, workers: int, fake_url: str, state_dir: str
+) -> dict:
+    port = args.port
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(port),
+        FIRECRAWL_API_KEY=os.environ.get("FIRECRAWL_API_KEY", "fc-benchmark"),
+        FIRECRAWL_API_URL=fake_url,
+        FIRECRAWL_CALLS_PER_MINUTE="100000000",
+        FIRECRAWL_BURST="1000000",
+        MAX_CONCURRENT_SCRAPES="1000",
+        RESULT_CACHE_ENABLED="false",
+        WAIT_TUNING_ENABLED="false",
+        JOB_WORKERS="0",
+        SHARED_STATE_BACKEND=args.shared_state,
+        CACHE_SQLITE_PATH=os.path.join(state_dir, f"state-{workers}.sqlite3"),
+        JOBS_SQLITE_PATH=os.path.join(state_dir, f"jobs-{workers}.sqlite3"),
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "--log-level",
+            "warning",
+            "main:app",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(f"{base_url}/health")
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [
+                pool.submit(
+                    drive,
+                    base_url,
+                    10_000_000 * (workers * 100 + index + 1),
+                    args.concurrency,
+                    args.warmup,
+                    args.duration,
+                )
+                for index in range(args.clients)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    latencies = [value for client_latencies, _ in results for value in client_latencies]
+    errors = sum(client_errors for _, client_errors in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / args.duration, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--workers", default="1,2,4", help="comma-separated gunicorn worker counts"
+    )
+    parser.add_argument(
+        "--clients", type=int, default=2, help="load-generating processes"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="connections per client process"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10, help="measured seconds per worker count"
+    )
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=2,
+        help="unmeasured seconds before each measurement",
+    )
+    parser.add_argument(
+        "--latency-median",
+        type=float,
+        default=0.02,
+        help="fake Firecrawl median latency, seconds",
+    )
+    parser.add_argument("--latency-p95", type=float, default=0.05)
+    parser.add_argument(
+        "--shared-state", default="sqlite", help="SHARED_STATE_BACKEND for the app"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=8766)
+    args = parser.parse_args()
+
+    fake = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(ROOT, "benchmarks", "fake_firecrawl.py"),
+            "--port",
+            str(args.fake_port),
+            "--latency-median",
+            str(args.latency_median),
+            "--latency-p95",
+            str(args.latency_p95),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    print(
+        f"cores available: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}"
+    )
+    try:
+        # the fake only answers POST /v1/scrape; any response means it is listening
+        wait_until_up(f"{fake_url}/v1/scrape")
+        baseline = None
+        with tempfile.TemporaryDirectory() as state_dir:
+            for workers in [int(count) for count in args.workers.split(",")]:
+                result = measure(args, workers, fake_url, state_dir)
+                baseline = baseline or result
+                speedup = (
+                    result["throughput_rps"] / baseline["throughput_rps"]
+                    if baseline["throughput_rps"]
+                    else 0
+                )
+                efficiency = speedup / (workers / baseline["workers"])
+                print(
+                    f"workers={workers:<3} {result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']:>7.1f}ms  "
+                    f"p95 {result['p95_ms']:>7.1f}ms  errors {result['errors']:<4} "
+                    f"speedup {speedup:.2f}x  efficiency {efficiency:.0%}"
+                )
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
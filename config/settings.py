@@ -1,14 +1,183 @@
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     firecrawl_api_key: str
+    firecrawl_api_url: str = "https://api.firecrawl.dev"
     allowed_origins: list[str] = ["http://localhost:3000"]
-    
+
     # FireCrawl specific settings
     use_stealth_mode: bool = True
     use_premium_proxies: bool = True
-    
+
+    # FireCrawl transport: "httpx" (shared async connection pool) or "executor" (sync SDK in a thread pool)
+    firecrawl_transport: str = "httpx"
+    firecrawl_max_connections: int = 20
+    firecrawl_executor_workers: int = 8
+    firecrawl_request_timeout: float = 60.0  # seconds, used when a call sets no timeout
+
+    # Concurrency budget shared by every request in a worker
+    max_concurrent_scrapes: int = 10  # properties scraped at once
+    firecrawl_calls_per_minute: int = 100  # per API key, 0 disables the limit
+    firecrawl_burst: int = 10
+    max_batch_size: int = 500
+    stream_heartbeat_seconds: float = 15.0  # idle gap before /zillow/batch/stream sends a heartbeat
+
+    # Address search: "sequential" tries primary -> fallback -> direct URL in order,
+    # "hedged" starts the direct URL search first and races the others after a delay
+    search_mode: str = "sequential"
+    search_hedge_delay_seconds: float = 5.0
+
+    # Caches: "memory" (per worker), "sqlite" (shared file on this host), "redis" or "none"
+    cache_sqlite_path: str = "cache/property_cache.sqlite3"
+    cache_redis_url: str = "redis://localhost:6379/0"
+
+    # address -> zpid cache, so repeat addresses skip the search
+    zpid_cache_backend: str = "sqlite"
+    zpid_cache_ttl_seconds: float = 30 * 24 * 3600
+    zpid_cache_negative_ttl_seconds: float = 600  # addresses the search could not resolve
+    zpid_cache_max_entries: int = 10000
+
+    # zpid -> parsed result cache in front of direct scrapes: a per-worker memory
+    # tier plus a shared tier; stale entries are served while refreshing in the background
+    result_cache_enabled: bool = True
+    result_cache_backend: str = "sqlite"
+    result_cache_memory_entries: int = 1000
+    result_cache_max_entries: int = 50000
+    result_cache_fresh_seconds: float = 6 * 3600
+    result_cache_stale_seconds: float = 7 * 24 * 3600  # matches Firecrawl's maxAge
+    result_cache_store_raw: bool = False  # keep zlib-compressed markdown with each entry
+
+    # read listing fields from the page's embedded __NEXT_DATA__ / JSON-LD, with markdown as fallback
+    structured_extraction: bool = True
+
+    # where large pages are parsed: "inline" (event loop), "thread" or "process" pool
+    parse_executor: str = "thread"
+    parse_workers: int = 2
+    parse_offload_threshold_bytes: int = 256 * 1024
+
+    # background scrape jobs (/api/scrape/jobs), queued in a SQLite file shared by workers
+    jobs_sqlite_path: str = "cache/jobs.sqlite3"
+    job_workers: int = 4  # per worker process, 0 only accepts jobs
+    job_visibility_timeout_seconds: float = 300  # a job whose lease runs out is retried elsewhere
+    job_max_attempts: int = 3
+    job_retry_base_seconds: float = 10
+    job_poll_interval_seconds: float = 1.0
+    job_webhook_allow_private: bool = False  # let webhook_url point at private/loopback hosts
+
+    # scrape profiles run in debug mode (screenshots back on), comma-separated or "*"
+    scrape_debug_profiles: str = ""
+
+    # resilience around Firecrawl calls: retries per request (after basic -> stealth),
+    # backoff with jitter between them, and a circuit breaker per proxy mode
+    firecrawl_retry_budget: int = 1
+    retry_backoff_base_seconds: float = 1.0
+    retry_backoff_max_seconds: float = 10.0
+    breaker_failure_threshold: int = 5  # failed calls in a row that open a breaker
+    breaker_reset_seconds: float = 30  # open time before a trial call is let through
+
+    # search strategy scheduling: order by recent success/latency, skip a strategy after
+    # strategy_breaker_failures failures in a row and probe it again in the background
+    strategy_scheduling: bool = True
+    strategy_window: int = 50  # recent outcomes kept per strategy
+    strategy_min_samples: int = 5
+    strategy_breaker_failures: int = 5
+    strategy_probe_interval_seconds: float = 300
+
+    # adaptive waits: each profile's wait actions, waitFor and timeout are scaled between
+    # min and max scale, tightened while the success rate holds (learned values persist in the
+    # shared state backend, or in the file when it is "memory")
+    wait_tuning_enabled: bool = True
+    wait_tuning_path: str = "cache/wait_tuning.json"
+    wait_tuning_window: int = 20  # attempts per decision
+    wait_tuning_min_scale: float = 0.5
+    wait_tuning_max_scale: float = 1.5
+    wait_tuning_tolerance: float = 0.05  # success-rate drop that triggers a back-off
+    wait_tuning_sync_seconds: float = 5  # how often a worker merges its outcomes into the shared tuning state
+    # base waits per scrape profile in milliseconds, the values a scale of 1.0 sends:
+    # waitFor, timeout and the pauses between a search's browser actions. An override
+    # only needs the values it changes, e.g. {"property": {"waitFor": 1000}}
+    scrape_waits: dict[str, dict[str, int]] = {
+        "search_primary": {"waitFor": 2000, "timeout": 35000, "page_load": 3000, "after_click": 800, "after_typing": 1500, "after_submit": 6000},
+        "search_fallback": {"waitFor": 2000, "timeout": 30000, "page_load": 3000, "after_click": 800, "after_typing": 1500, "after_submit": 6000},
+        "search_direct_url": {"waitFor": 3000, "timeout": 25000},
+        "property": {"waitFor": 2000},
+    }
+
+    # optional OpenTelemetry tracing (pip install opentelemetry-sdk); "otlp" sends to a
+    # collector over HTTP (also needs opentelemetry-exporter-otlp-proto-http), "file" appends JSON lines
+    tracing_enabled: bool = False
+    tracing_exporter: str = "file"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "traces.jsonl"
+    tracing_service_name: str = "property-firecrawl"
+
+    # bulk ingestion (ingest.py, /api/scrape/ingest); the endpoint only reads and writes inside ingest_dir
+    ingest_dir: str = "data/ingest"
+    ingest_concurrency: int = 10  # rows in flight; scrapes still share the limiter above
+    ingest_checkpoint_every: int = 100
+    ingest_throttle_retries: int = 20  # a row the credit scheduler keeps throttling is written out as failed after this
+
+    # state shared between worker processes: Firecrawl rate-limit tokens, coalescing
+    # locks and strategy outcomes. "sqlite" shares them between the workers on this host
+    # (WAL file at cache_sqlite_path), "redis" between hosts (cache_redis_url), "memory"
+    # keeps them per worker
+    shared_state_backend: str = "sqlite"
+    shared_lock_ttl_seconds: float = 180  # a crashed worker's lock is taken over after this
+    shared_lock_poll_seconds: float = 0.25
+    strategy_sync_seconds: float = 5  # how often a worker reloads everyone's strategy outcomes
+
+    # responses: bodies of at least this many bytes are gzip/br-compressed for clients
+    # that accept it (0 disables); raw markdown is only returned with include_raw=true
+    response_compression_min_bytes: int = 1024
+
+    # area crawls (/api/scrape/zillow/area): results pages per crawl (Zillow stops at 20),
+    # Firecrawl map links added on top, and the per-area index of seen listings
+    area_max_pages: int = 20
+    area_map_enabled: bool = True
+    area_map_limit: int = 5000
+    area_index_backend: str = "sqlite"
+    area_index_ttl_seconds: float = 90 * 24 * 3600
+    area_index_max_entries: int = 1000
+
+    # change detection: per zpid, a fingerprint of the page's listing sections and the data
+    # parsed from it; a page that fingerprints the same is not parsed again
+    change_detection_enabled: bool = True
+    fingerprint_backend: str = "sqlite"
+    fingerprint_ttl_seconds: float = 90 * 24 * 3600
+    fingerprint_max_entries: int = 100000
+
+    # credit-aware scheduling of Firecrawl work per API client (an API key in the
+    # X-API-Key header, mapped to a client by tenant_api_keys; X-Priority may lower
+    # its priority): weighted fair queuing over the scrape slots, a credit bucket per
+    # client (0 = unlimited, waits past tenant_max_wait_seconds get a 429), and an
+    # hourly credit budget that priority < 0 work is shed from (HTTP 429) or deferred
+    # from (jobs) once less than credit_budget_reserve of it is left. Requests without
+    # a configured key all share the anonymous client, at priority 0.
+    credit_scheduling: bool = True
+    tenant_header: str = "X-API-Key"
+    tenant_api_keys: dict[str, str] = {}  # {"<api key>": "acme"}
+    tenant_weight: float = 1.0
+    tenant_credits_per_minute: float = 0
+    tenant_quotas: dict[str, dict[str, float]] = {}  # {"acme": {"weight": 3, "credits_per_minute": 300}}
+    tenant_max_wait_seconds: float = 10
+    credit_budget_per_hour: float = 0  # every client together, 0 = no budget
+    credit_budget_reserve: float = 0.2
+    credit_estimate_alpha: float = 0.2
+    ingest_priority: int = -1  # bulk ingestion yields to interactive requests
+
+    # more Firecrawl API keys to spread calls over, comma-separated (FIRECRAWL_API_KEY is
+    # always in the pool); a key answering 401/402/429 sits out the cooldown
+    firecrawl_api_keys: str = ""
+    firecrawl_key_cooldown_seconds: float = 300
+
+    @field_validator("scrape_waits")
+    @classmethod
+    def _fill_scrape_waits(cls, waits: dict[str, dict[str, int]]) -> dict[str, dict[str, int]]:
+        defaults = cls.model_fields["scrape_waits"].default
+        return {name: {**defaults.get(name, {}), **waits.get(name, {})} for name in {**defaults, **waits}}
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
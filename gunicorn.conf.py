@@ -1,11 +1,23 @@
 # Gunicorn configuration for Render deployment
 import os
 
+
+def default_workers():
+    # one async worker per core this process may run on (respects CPU affinity / cpusets)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
 # Basic configuration for Render
 bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
-workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+workers = int(os.environ.get('WEB_CONCURRENCY', default_workers()))
 worker_class = "uvicorn.workers.UvicornWorker"
 timeout = 120
 keepalive = 5
 max_requests = 1000
-preload_app = True 
\ No newline at end of file
+# each worker imports the app itself: SQLite connections and HTTP clients must not be
+# inherited across fork. Rate limits, coalescing locks, caches and strategy stats are
+# shared through SHARED_STATE_BACKEND and the cache backends instead.
+preload_app = False
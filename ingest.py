@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Scrape every row of a CSV or JSONL file of properties.
+
+Each row needs address, city, state and zip (the /zillow request body).
+Results are appended to OUTPUT as they finish: a .jsonl file, or a Parquet
+directory if OUTPUT ends in .parquet (needs pyarrow). Progress is saved to
+OUTPUT.checkpoint.json, so running the same command again after an
+interruption resumes where it stopped.
+
+    python ingest.py county.csv county.jsonl --concurrency 20
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Any, Dict
+
+from config.settings import settings
+from routers.ingest import scrape_row
+from routers.scraping import scraper
+from services.ingest import IngestRun
+
+
+async def ingest(args: argparse.Namespace) -> Dict[str, Any]:
+    run = IngestRun(
+        args.input,
+        args.output,
+        scrape_row,
+        args.concurrency,
+        args.checkpoint_every,
+        priority=settings.ingest_priority,
+        throttle_retries=settings.ingest_throttle_retries,
+    )
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(args.report_seconds)
+            progress = run.progress()
+            print(
+                f"{progress['rows_done']} rows done ({progress['succeeded']} ok, {progress['failed']} failed), "
+                f"{progress['in_flight']} in flight",
+                file=sys.stderr,
+            )
+
+    reporter = asyncio.create_task(report())
+    try:
+        return await run.run()
+    finally:
+        reporter.cancel()
+        await scraper.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--concurrency", type=int, default=settings.ingest_concurrency)
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=settings.ingest_checkpoint_every
+    )
+    parser.add_argument("--report-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    progress = asyncio.run(ingest(args))
+    print(
+        f"{progress['succeeded']} succeeded, {progress['failed']} failed, "
+        f"{progress['elapsed_seconds']}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import scraping
+from routers import scraping, jobs, ingest, admin
+from config.settings import settings
+from services.jobs import SQLiteJobQueue, JobWorkerPool
+from services import metrics, tracing, responses
+from services.credits import TenantMiddleware
 from dotenv import load_dotenv
 import os
 import logging
@@ -16,7 +21,9 @@ logging.basicConfig(
 )
 
 
-app = FastAPI(title="Property FireCrawl Middleware")
+tracing.configure(settings)
+
+app = FastAPI(title="Property FireCrawl Middleware", default_response_class=responses.TimedJSONResponse)
 
 allowed_origins = os.environ.get("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 
@@ -26,13 +33,63 @@ app.add_middleware(
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
+if settings.response_compression_min_bytes > 0:
+    app.add_middleware(responses.CompressionMiddleware, minimum_size=settings.response_compression_min_bytes)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(TenantMiddleware, keys=settings.tenant_api_keys, header=settings.tenant_header)
+app.add_middleware(tracing.TracingMiddleware)
 
 app.include_router(scraping.router, prefix="/api/scrape", tags=["scraping"])
+app.include_router(jobs.router, prefix="/api/scrape/jobs", tags=["jobs"])
+app.include_router(ingest.router, prefix="/api/scrape/ingest", tags=["ingest"])
+app.include_router(admin.router, prefix="/api/scrape/admin", tags=["admin"])
+
+job_workers = None
+
+@app.on_event("startup")
+async def start_job_workers():
+    # every worker process drains the shared job queue with its own scraper
+    global job_workers
+    jobs.queue = SQLiteJobQueue(settings.jobs_sqlite_path)
+    if settings.job_workers > 0:
+        job_workers = JobWorkerPool(
+            jobs.queue,
+            scraping.scraper,
+            workers=settings.job_workers,
+            visibility_timeout=settings.job_visibility_timeout_seconds,
+            retry_base_seconds=settings.job_retry_base_seconds,
+            poll_interval=settings.job_poll_interval_seconds,
+            allow_private_webhooks=settings.job_webhook_allow_private,
+        )
+        job_workers.start()
+
+@app.on_event("shutdown")
+async def close_scraper():
+    if job_workers is not None:
+        await job_workers.stop()
+    # interrupted ingest runs resume from their checkpoint
+    for run in ingest.runs.values():
+        run["task"].cancel()
+    # release the shared Firecrawl connection pool / executor
+    await scraping.scraper.aclose()
+    tracing.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Property FireCrawl API", "status": "running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Prometheus text format, for this worker process
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "property-scraping"}
\ No newline at end of file
+    # degraded while a Firecrawl proxy mode is failing fast
+    breakers = {mode: breaker.snapshot() for mode, breaker in scraping.scraper.breakers.items()}
+    degraded = any(breaker["state"] == "open" for breaker in breakers.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": "property-scraping",
+        "circuit_breakers": breakers
+    }
\ No newline at end of file
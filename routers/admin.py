@@ -0,0 +1,27 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException
+from routers import scraping
+
+router = APIRouter()
+
+
+@router.get("/tuning")
+async def wait_tuning() -> Dict[str, Any]:
+    # Current wait/timeout scale per scrape profile and its success curve
+    scraper = scraping.scraper
+    await scraper.sync_wait_tuning(force=True)
+    return scraper.wait_tuner.snapshot(scraper.profiles)
+
+
+@router.post("/tuning/{profile}/reset")
+async def reset_wait_tuning(profile: str) -> Dict[str, Any]:
+    # Forget what was learned for one profile and go back to the coded values
+    scraper = scraping.scraper
+    if profile not in scraper.profiles:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown scrape profile: {profile}"
+        )
+    scraper.wait_tuner.reset(profile)
+    await scraper.sync_wait_tuning(force=True)
+    return scraper.wait_tuner.snapshot({profile: scraper.profiles[profile]})
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Optional, Union
+from config.settings import settings
+from routers.scraping import ZillowScrapeRequest, _scrape_batch_item
+from services.ingest import IngestRun, load_checkpoint
+import asyncio
+import logging
+import os
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# runs started by this worker, keyed by output name
+runs: Dict[str, Dict[str, Any]] = {}
+
+
+class IngestRequest(BaseModel):
+    # file names inside INGEST_DIR; output ending in .parquet writes a Parquet directory
+    input: str
+    output: str
+    concurrency: Optional[int] = None
+
+
+async def scrape_row(row: Union[Dict[str, Any], Exception]) -> Dict[str, Any]:
+    # one input row -> one output record, never raising
+    if isinstance(row, Exception):
+        return {
+            "success": False,
+            "status": "invalid",
+            "error": f"Unreadable row: {str(row)}",
+        }
+    try:
+        prop_request = ZillowScrapeRequest(**row)
+    except (TypeError, ValidationError) as e:
+        return {
+            "success": False,
+            "status": "invalid",
+            "error": f"Invalid row: {str(e)}",
+        }
+    return await _scrape_batch_item(prop_request)
+
+
+def _resolve(name: str) -> str:
+    # keep requests inside the ingest directory
+    root = os.path.realpath(settings.ingest_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.dirname(path) != root:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name} must be a file name inside the ingest directory",
+        )
+    return path
+
+
+@router.post("", status_code=202)
+async def start_ingest(request: IngestRequest) -> Dict[str, Any]:
+    # Start (or resume) ingesting a CSV/JSONL file in the background
+    input_path = _resolve(request.input)
+    output_path = _resolve(request.output)
+    if not os.path.exists(input_path):
+        raise HTTPException(
+            status_code=404, detail=f"Input file not found: {request.input}"
+        )
+    current = runs.get(request.output)
+    if current is not None and not current["task"].done():
+        raise HTTPException(
+            status_code=409, detail=f"{request.output} is already being ingested"
+        )
+
+    try:
+        run = IngestRun(
+            input_path,
+            output_path,
+            scrape_row,
+            concurrency=request.concurrency or settings.ingest_concurrency,
+            checkpoint_every=settings.ingest_checkpoint_every,
+            priority=settings.ingest_priority,
+            throttle_retries=settings.ingest_throttle_retries,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    task = asyncio.create_task(run.run())
+    task.add_done_callback(lambda done: _log_finished(request.output, done))
+    runs[request.output] = {"run": run, "task": task}
+    return run.progress()
+
+
+def _log_finished(output: str, task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Ingest into {output} stopped: {str(task.exception())}")
+
+
+@router.get("/{output}")
+async def ingest_progress(output: str) -> Dict[str, Any]:
+    # Progress of a run in this worker, or the last checkpoint of one that isn't running here
+    current = runs.get(output)
+    if current is not None:
+        progress: Dict[str, Any] = current["run"].progress()
+        progress["running"] = not current["task"].done()
+        if (
+            current["task"].done()
+            and not current["task"].cancelled()
+            and current["task"].exception()
+        ):
+            progress["error"] = str(current["task"].exception())
+        return progress
+
+    checkpoint = load_checkpoint(_resolve(output))
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail=f"No ingest run for {output}")
+    return {"output": output, "running": False, **checkpoint}
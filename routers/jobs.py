@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from config.settings import settings
+from routers.scraping import build_zillow_search_url
+from services.jobs import SQLiteJobQueue, check_webhook_url, job_view
+from services.credits import client_priority, current_tenant
+import asyncio
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# set by main.py on startup
+queue: Optional[SQLiteJobQueue] = None
+
+
+class ZillowJobRequest(BaseModel):
+    # either a full Zillow URL or the address parts
+    zillow_url: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip: Optional[str] = None
+    priority: int = 0
+    max_attempts: Optional[int] = None
+    webhook_url: Optional[str] = None
+
+
+def _queue() -> SQLiteJobQueue:
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not ready")
+    return queue
+
+
+@router.post("", status_code=202)
+async def create_scrape_job(request: ZillowJobRequest) -> Dict[str, Any]:
+    # Queue a scrape and return its job id immediately
+    if request.zillow_url:
+        if "zillow.com" not in request.zillow_url:
+            raise HTTPException(status_code=400, detail="URL must be a Zillow URL")
+        zillow_url = request.zillow_url
+    elif request.address and request.city and request.state and request.zip:
+        zillow_url = build_zillow_search_url(
+            request.address, request.city, request.state, request.zip
+        )
+    else:
+        raise HTTPException(
+            status_code=400, detail="Provide zillow_url or address, city, state and zip"
+        )
+    if request.webhook_url:
+        try:
+            await check_webhook_url(
+                request.webhook_url, settings.job_webhook_allow_private
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # like X-Priority, a job's priority can only be lowered, and only by a known client
+    tenant = current_tenant.get()
+    priority = client_priority(request.priority, tenant)
+    job = await asyncio.to_thread(
+        _queue().enqueue,
+        {"zillow_url": zillow_url, "tenant": tenant},
+        priority=priority,
+        max_attempts=request.max_attempts or settings.job_max_attempts,
+        webhook_url=request.webhook_url,
+    )
+    logger.info(f"Queued job {job['id']} for {zillow_url} (priority {priority})")
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "url": f"/api/scrape/jobs/{job['id']}",
+    }
+
+
+@router.get("/{job_id}")
+async def get_scrape_job(job_id: str) -> Dict[str, Any]:
+    # Job status, plus the scrape result once it has succeeded
+    job = await asyncio.to_thread(_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
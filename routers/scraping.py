@@ -1,8 +1,18 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from services.firecrawl import ZillowScrapingService
+from services.area import build_zillow_results_url
+from services.resilience import CircuitOpenError
+from services.credits import CreditLimitError
+from services.responses import dumps
+from config.settings import settings
+import asyncio
 import logging
+import math
+import time
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 scraper = ZillowScrapingService()
@@ -13,16 +23,35 @@ class ZillowScrapeRequest(BaseModel):
     city: str
     state: str
     zip: str
+    since: Optional[str] = None  # mode=diff: the fingerprint the caller already has
 
 class ZillowScrapeResponse(BaseModel):
     success: bool
     url: str
-    property_data: dict
-    timestamp: str = None
+    property_data: Optional[dict] = None  # mode=diff leaves it out when the changes say it all
+    timestamp: Optional[str] = None
+    raw_content: Optional[str] = None  # only with include_raw=true
+    fingerprint: Optional[str] = None
+    previous_fingerprint: Optional[str] = None
+    changed: Optional[bool] = None
+    changes: Optional[dict] = None
 
 class ZillowBatchRequest(BaseModel):
     properties: list[ZillowScrapeRequest]
 
+class ZillowSearchPageRequest(BaseModel):
+    location: Optional[str] = None  # ZIP, neighborhood or "City, ST"
+    search_url: Optional[str] = None  # or a Zillow results page URL as-is
+    page: int = 1
+    details: bool = False  # also scrape each listing's property page
+    max_details: Optional[int] = None
+
+class ZillowAreaRequest(BaseModel):
+    location: str  # ZIP, neighborhood or "City, ST"
+    max_pages: Optional[int] = None  # default AREA_MAX_PAGES
+    details: bool = False  # scrape the property pages of new and changed listings
+    max_details: Optional[int] = None
+
 def build_zillow_search_url(address: str, city: str, state: str, zip_code: str) -> str:
     # Format address for URL: replace spaces with hyphens, handle special characters
     formatted_address = address.replace(" ", "-").replace(",", "")
@@ -32,9 +61,10 @@ def build_zillow_search_url(address: str, city: str, state: str, zip_code: str)
     search_url = f"https://www.zillow.com/homedetails/{formatted_address}-{formatted_city}-{state}-{zip_code}"
     return search_url
 
-@router.post("/zillow", response_model=ZillowScrapeResponse)
-async def scrape_zillow_property(request: ZillowScrapeRequest):
+@router.post("/zillow", response_model=ZillowScrapeResponse, response_model_exclude_unset=True)
+async def scrape_zillow_property(request: ZillowScrapeRequest, include_raw: bool = False, mode: str = "full"):
     # Scrape a Zillow property page using FireCrawl stealth mode
+    _check_mode(mode)
     zillow_url = build_zillow_search_url(request.address, request.city, request.state, request.zip)
 
     try:
@@ -47,57 +77,341 @@ async def scrape_zillow_property(request: ZillowScrapeRequest):
         
         logger.info(f"Attempting to scrape: {zillow_url}") 
 
-        result = await scraper.scrape_zillow_property(zillow_url)
+        result = await scraper.scrape_zillow_property(zillow_url, include_raw)
 
-        return ZillowScrapeResponse(
-            success=result["success"],
-            url=result.get("final_url", zillow_url),
-            property_data=result["property_data"],
-            timestamp=datetime.utcnow().isoformat()
-        )
+        response = await _shape_response({
+            "success": result.success,
+            "url": result.final_url or zillow_url,
+            "property_data": result.property_data,
+            "timestamp": datetime.utcnow().isoformat()
+        }, result, mode, request.since)
+        if include_raw:
+            response["raw_content"] = result.raw_content()
+        return ZillowScrapeResponse(**response)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except CreditLimitError as e:
+        raise _throttled(e)
     except Exception as e:
         logger.error(f"Zillow scraping failed for {request.address}, {request.city}, {request.state} {request.zip}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
+@router.post("/zillow/search")
+async def scrape_zillow_search_page(request: ZillowSearchPageRequest, include_raw: bool = False):
+    # Every listing on one results page from a single Firecrawl call. Each listing's
+    # address goes into the zpid cache; with details=true the property pages are then
+    # scraped concurrently, under the same limits as a batch.
+    if request.search_url:
+        if "zillow.com" not in request.search_url:
+            raise HTTPException(status_code=400, detail="URL must be a Zillow URL")
+        search_url = request.search_url
+    elif request.location and request.location.strip():
+        search_url = build_zillow_results_url(request.location, max(1, request.page))
+    else:
+        raise HTTPException(status_code=400, detail="Provide location or search_url")
+
+    started = time.perf_counter()
+    try:
+        page = await scraper.scrape_zillow_search_page(search_url)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except CreditLimitError as e:
+        raise _throttled(e)
+    except Exception as e:
+        logger.error(f"Zillow search page scraping failed for {search_url}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    listings = page["listings"]
+    response = {
+        "success": True,
+        "url": page["url"],
+        "listings": listings,
+        "total": len(listings),
+        "search_credits": page["credits"],
+    }
+    if request.details:
+        limit = settings.max_batch_size if request.max_details is None else min(request.max_details, settings.max_batch_size)
+        details = await asyncio.gather(*[_scrape_listing_item(listing, include_raw) for listing in listings[:max(0, limit)]])
+        response["details"] = details
+        response["details_succeeded"] = sum(1 for item in details if item["success"])
+    response["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return response
+
+@router.post("/zillow/area")
+async def crawl_zillow_area(request: ZillowAreaRequest):
+    # Every listing in an area, deduped by zpid. Each listing is marked new, changed or
+    # unchanged against the previous crawl of the same area, and with details=true only
+    # the new and changed ones have their property pages scraped.
+    if not request.location.strip():
+        raise HTTPException(status_code=400, detail="Provide a location")
+    max_pages = min(request.max_pages or settings.area_max_pages, settings.area_max_pages)
+    max_details = settings.max_batch_size if request.max_details is None else min(request.max_details, settings.max_batch_size)
+
+    started = time.perf_counter()
+    try:
+        crawl = await scraper.crawl_zillow_area(request.location, max(1, max_pages), request.details, max(0, max_details))
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except CreditLimitError as e:
+        raise _throttled(e)
+    except Exception as e:
+        logger.error(f"Zillow area crawl failed for {request.location}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    changes = [listing["change"] for listing in crawl["listings"]]
+    crawl.update(
+        success=True,
+        total=len(changes),
+        new=changes.count("new"),
+        changed=changes.count("changed"),
+        unchanged=changes.count("unchanged"),
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
+    return crawl
+
 @router.post("/zillow/batch")
-async def scrape_multiple_zillow_properties(request: ZillowBatchRequest):
-    # Scrape multiple Zillow properties (with rate limiting)
-    results = []
-    
-    # Limit to 3 properties per request to avoid overwhelming the service
-    properties_to_process = request.properties[:3]
-    
-    for prop_request in properties_to_process:
-        try:
-            # Build URL for this property
-            zillow_url = build_zillow_search_url(
-                prop_request.address,
-                prop_request.city, 
-                prop_request.state,
-                prop_request.zip
+async def scrape_multiple_zillow_properties(request: ZillowBatchRequest, include_raw: bool = False, mode: str = "full"):
+    # Scrape multiple Zillow properties concurrently; the scraper's shared limiter
+    # caps how many run at once and how fast Firecrawl is called
+    _check_batch_size(request)
+    _check_mode(mode)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[_scrape_batch_item(prop, include_raw, mode) for prop in request.properties])
+
+    succeeded = sum(1 for item in results if item["success"])
+    return {
+        "results": results,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+@router.post("/zillow/batch/stream")
+async def stream_multiple_zillow_properties(request: ZillowBatchRequest, format: str = "ndjson",
+                                            include_raw: bool = False, mode: str = "full"):
+    # Same as /zillow/batch, but each result is sent as soon as its scrape finishes.
+    # format=ndjson sends one JSON object per line, format=sse sends Server-Sent Events.
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    _check_batch_size(request)
+    _check_mode(mode)
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(
+        _stream_batch(request.properties, format, include_raw, mode),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _unavailable(error: CircuitOpenError) -> HTTPException:
+    # fast-fail while a circuit breaker is open; clients should come back later
+    logger.warning(f"Rejected scrape, circuit open: {str(error)}")
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+def _throttled(error: CreditLimitError) -> HTTPException:
+    # the client's credit quota (or, for low-priority work, the credit budget) is used up
+    logger.warning(f"Rejected scrape: {str(error)}")
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+def _check_batch_size(request: ZillowBatchRequest):
+    if len(request.properties) > settings.max_batch_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(request.properties)} properties (max {settings.max_batch_size})"
+        )
+
+def _check_mode(mode: str):
+    if mode not in ("full", "diff"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'diff'")
+
+async def _shape_response(response: dict, result, mode: str, since: Optional[str] = None) -> dict:
+    # every response carries the page fingerprint; mode=diff swaps property_data for
+    # the fields that changed since `since` (or since the previous version of the page)
+    if result.fingerprint:
+        response["fingerprint"] = result.fingerprint
+    if mode == "diff":
+        response.pop("property_data", None)
+        response.update(await scraper.describe_changes(result, since))
+    return response
+
+def _format_frame(frame: dict, format: str) -> str:
+    payload = dumps(frame, default=str).decode("utf-8")
+    if format == "sse":
+        return f"event: {frame['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+async def _stream_batch(properties: list[ZillowScrapeRequest], format: str, include_raw: bool = False,
+                        mode: str = "full"):
+    # yield result frames in completion order, each followed by a progress frame,
+    # and a heartbeat whenever nothing finished for stream_heartbeat_seconds
+    started = time.perf_counter()
+    total = len(properties)
+    completed = 0
+    succeeded = 0
+
+    async def run(index: int, prop_request: ZillowScrapeRequest):
+        return index, await _scrape_batch_item(prop_request, include_raw, mode)
+
+    pending = {asyncio.create_task(run(index, prop)) for index, prop in enumerate(properties)}
+    try:
+        yield _format_frame({"type": "progress", "completed": 0, "total": total}, format)
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=settings.stream_heartbeat_seconds,
+                return_when=asyncio.FIRST_COMPLETED
             )
-            
-            result = await scraper.scrape_zillow_property(zillow_url)
-            results.append({
-                "success": result["success"],
-                "address": f"{prop_request.address}, {prop_request.city}, {prop_request.state} {prop_request.zip}",
-                "url": result.get("final_url", zillow_url),
-                "property_data": result["property_data"]
-            })
-            
-        except Exception as e:
-            results.append({
-                "success": False,
-                "address": f"{prop_request.address}, {prop_request.city}, {prop_request.state} {prop_request.zip}",
-                "url": None,
-                "error": str(e)
-            })
-    
-    return {"results": results}
+
+            if not done:
+                yield _format_frame({
+                    "type": "heartbeat",
+                    "completed": completed,
+                    "total": total,
+                    "elapsed_seconds": round(time.perf_counter() - started, 3)
+                }, format)
+                continue
+
+            for task in done:
+                index, item = task.result()
+                completed += 1
+                succeeded += 1 if item["success"] else 0
+                yield _format_frame({"type": "result", "index": index, **item}, format)
+
+            yield _format_frame({"type": "progress", "completed": completed, "total": total}, format)
+
+        yield _format_frame({
+            "type": "done",
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }, format)
+
+    finally:
+        # client went away: stop spending credits on scrapes nobody will read
+        for task in pending:
+            task.cancel()
+
+async def _scrape_batch_item(prop_request: ZillowScrapeRequest, include_raw: bool = False, mode: str = "full") -> dict:
+    # scrape one batch entry, never raising so one failure can't sink the batch
+    address = f"{prop_request.address}, {prop_request.city}, {prop_request.state} {prop_request.zip}"
+    started = time.perf_counter()
+
+    try:
+        # Build URL for this property
+        zillow_url = build_zillow_search_url(
+            prop_request.address,
+            prop_request.city,
+            prop_request.state,
+            prop_request.zip
+        )
+
+        result = await scraper.scrape_zillow_property(zillow_url, include_raw)
+        item = await _shape_response({
+            "success": result.success,
+            "status": "ok" if result.success else "failed",
+            "address": address,
+            "url": result.final_url or zillow_url,
+            "property_data": result.property_data,
+        }, result, mode, prop_request.since)
+        item["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        if include_raw:
+            item["raw_content"] = result.raw_content()
+        return item
+
+    except CreditLimitError as e:
+        return {
+            "success": False,
+            "status": "throttled",
+            "address": address,
+            "url": None,
+            "error": str(e),
+            "retry_after": math.ceil(e.retry_after * 10) / 10,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+    except Exception as e:
+        logger.error(f"Batch item failed for {address}: {str(e)}")
+        return {
+            "success": False,
+            "status": "error",
+            "address": address,
+            "url": None,
+            "error": str(e),
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+async def _scrape_listing_item(listing: dict, include_raw: bool = False) -> dict:
+    # scrape one harvested listing's property page, never raising
+    started = time.perf_counter()
+    try:
+        result = await scraper.scrape_zillow_property(listing["url"], include_raw)
+        item = {
+            "success": result.success,
+            "status": "ok" if result.success else "failed",
+            "zpid": listing["zpid"],
+            "url": result.final_url or listing["url"],
+            "property_data": result.property_data,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+        if include_raw:
+            item["raw_content"] = result.raw_content()
+        return item
+
+    except CreditLimitError as e:
+        return {
+            "success": False,
+            "status": "throttled",
+            "zpid": listing["zpid"],
+            "url": listing["url"],
+            "error": str(e),
+            "retry_after": math.ceil(e.retry_after * 10) / 10,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+    except Exception as e:
+        logger.error(f"Listing scrape failed for {listing['url']}: {str(e)}")
+        return {
+            "success": False,
+            "status": "error",
+            "zpid": listing["zpid"],
+            "url": listing["url"],
+            "error": str(e),
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+@router.get("/stats")
+async def scraper_stats():
+    # Counters for search, limiter, caches, coalescing and parsing in this worker
+    return scraper.stats()
+
+@router.get("/zillow/search/stats")
+async def zillow_search_stats():
+    # Latency percentiles, win counts and credits spent per search mode and strategy
+    return {
+        "search_mode": scraper.search_mode,
+        "zpid_cache": scraper.zpid_cache.stats(),
+        "result_cache": scraper.result_cache.stats(),
+        "coalescing": scraper.single_flight.stats(),
+        "scheduler": scraper.strategy_scheduler.snapshot(),
+        **scraper.search_stats.snapshot()
+    }
 
 @router.post("/zillow/url")
-async def scrape_zillow_by_url(request: dict):
+async def scrape_zillow_by_url(request: dict, include_raw: bool = False, mode: str = "full"):
     # Scrape using a direct Zillow URL (fallback method)
+    _check_mode(mode)
 
     zillow_url = request.get("zillow_url")
     if not zillow_url:
@@ -114,13 +428,20 @@ async def scrape_zillow_by_url(request: dict):
         )
     
     try:
-        result = await scraper.scrape_zillow_property(zillow_url)
-        return {
-            "success": result["success"],
-            "url": result["url"],
-            "property_data": result["property_data"],
+        result = await scraper.scrape_zillow_property(zillow_url, include_raw)
+        response = await _shape_response({
+            "success": result.success,
+            "url": result.url,
+            "property_data": result.property_data,
             "timestamp": datetime.utcnow().isoformat()
-        }
+        }, result, mode, request.get("since"))
+        if include_raw:
+            response["raw_content"] = result.raw_content()
+        return response
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except CreditLimitError as e:
+        raise _throttled(e)
     except Exception as e:
         logger.error(f"Zillow URL scraping failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
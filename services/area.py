@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from services.cache import CacheBackend, normalize_address
+
+logger = logging.getLogger(__name__)
+
+# Area crawls: every listing in a ZIP, neighborhood or city. Each area keeps an index
+# of the listings its crawls have seen, zpid -> {url, hash, first_seen, last_seen,
+# scraped_hash}. `hash` fingerprints the listing's card on the results page (price,
+# beds, baths, sqft, status, address), so a re-crawl can tell new and changed listings
+# from unchanged ones without opening their pages; `scraped_hash` is the card hash as
+# of the last successful detail scrape, so only listings whose card moved since then
+# are scraped again.
+
+CARD_HASH_FIELDS = (
+    "address",
+    "price",
+    "bedrooms",
+    "bathrooms",
+    "square_feet",
+    "status",
+)
+
+
+def build_zillow_results_url(location: str, page: int = 1) -> str:
+    # Zillow's results page for a free-text location, e.g. /homes/78701_rb/2_p/
+    url = f"https://www.zillow.com/homes/{quote(location.strip(), safe='')}_rb/"
+    return f"{url}{page}_p/" if page > 1 else url
+
+
+def area_key(location: str) -> str:
+    return normalize_address(location)
+
+
+def listing_hash(card: Dict[str, Any]) -> Optional[str]:
+    # None for listings known only by their link (from the map), which carry no summary
+    summary = [card.get(field) for field in CARD_HASH_FIELDS]
+    if all(value is None for value in summary):
+        return None
+    return hashlib.sha1(json.dumps(summary).encode("utf-8")).hexdigest()[:16]
+
+
+def in_area(url: str, location: str) -> bool:
+    # a mapped link belongs to the area when its slug contains the location's words
+    # ("austin tx", "78701"); Firecrawl's map search is fuzzy and returns neighbours too
+    slug = url.split("/homedetails/", 1)[-1].split("/", 1)[0]
+    return f" {area_key(location)} " in f" {normalize_address(slug)} "
+
+
+class AreaIndex:
+    # per-area listing index on one of the cache backends (see services/cache.py)
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def load(self, location: str) -> Dict[str, Dict[str, Any]]:
+        if self.backend is None:
+            return {}
+        try:
+            entry = await self.backend.get(area_key(location))
+        except Exception as e:
+            logger.warning(f"area index lookup failed for {location}: {str(e)}")
+            return {}
+        return entry["listings"] if entry else {}
+
+    async def save(self, location: str, listings: Dict[str, Dict[str, Any]]) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(
+                area_key(location),
+                {"listings": listings, "crawled_at": time.time()},
+                self.ttl,
+            )
+        except Exception as e:
+            logger.warning(f"area index write failed for {location}: {str(e)}")
+
+
+def classify(
+    cards: List[Dict[str, Any]], index: Dict[str, Dict[str, Any]], now: float
+) -> Dict[str, Dict[str, Any]]:
+    # mark each card new / changed / unchanged against the index, and return the
+    # index entries for this crawl (unseen listings are left to the caller)
+    entries = {}
+    for card in cards:
+        previous = index.get(card["zpid"])
+        digest = listing_hash(card)
+        if previous is None:
+            card["change"] = "new"
+        elif digest is not None and digest != previous.get("hash"):
+            card["change"] = "changed"
+        else:
+            card["change"] = "unchanged"
+            # a link-only sighting keeps the last known fingerprint
+            digest = digest or previous.get("hash")
+        entries[card["zpid"]] = {
+            "url": card["url"],
+            "hash": digest,
+            "first_seen": previous["first_seen"] if previous else now,
+            "last_seen": now,
+            "scraped_hash": previous.get("scraped_hash") if previous else None,
+            "scraped_at": previous.get("scraped_at") if previous else None,
+        }
+        card["first_seen"] = entries[card["zpid"]]["first_seen"]
+    return entries
+
+
+def needs_scrape(entry: Dict[str, Any]) -> bool:
+    # never scraped, or its card changed since the last scrape
+    return entry.get("scraped_at") is None or entry.get("hash") != entry.get(
+        "scraped_hash"
+    )
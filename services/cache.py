@@ -0,0 +1,350 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+from config.settings import Settings
+from services.results import ScrapeResult
+
+logger = logging.getLogger(__name__)
+
+# Key/value cache backends with per-entry TTL and an LRU size bound.
+# Every backend exposes the same coroutines:
+#   await backend.get(key) -> value or None
+#   await backend.set(key, value, ttl)
+#   await backend.delete(key)
+# Values are JSON-serialisable dicts.
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class MemoryBackend:
+    # in-process LRU dict, private to one worker
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        self.entries[key] = (time.time() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+
+class SQLiteBackend:
+    # single-file cache that survives restarts and is shared by every worker on the host
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 10000):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)"
+        )
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            await self.delete(key)
+            return None
+        self.conn.execute(
+            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, key),
+        )
+        value: Dict[str, Any] = json.loads(row[0])
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), now + ttl, now),
+        )
+        self._evict()
+
+    async def delete(self, key: str) -> None:
+        self.conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
+
+    def _evict(self) -> None:
+        # drop expired rows, then the least recently used ones beyond max_entries
+        self.conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time()),
+        )
+        count = self.conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, self.namespace, count - self.max_entries),
+            )
+
+
+class RedisBackend:
+    # Redis-compatible store (Redis, Valkey, KeyDB, or a local stand-in like fakeredis);
+    # `client` only needs async get/set/delete/zadd/zcard/zrange/zrem
+
+    def __init__(self, client: Any, namespace: str, max_entries: int = 10000):
+        self.client = client
+        self.prefix = f"property-firecrawl:{namespace}:"
+        self.lru_key = f"property-firecrawl:{namespace}:__lru__"
+        self.max_entries = max_entries
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            await self.client.zrem(self.lru_key, key)
+            return None
+        await self.client.zadd(self.lru_key, {key: time.time()})
+        value: Dict[str, Any] = json.loads(raw)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+        await self.client.zadd(self.lru_key, {key: time.time()})
+        overflow = await self.client.zcard(self.lru_key) - self.max_entries
+        if overflow > 0:
+            for stale in await self.client.zrange(self.lru_key, 0, overflow - 1):
+                stale = stale.decode() if isinstance(stale, bytes) else stale
+                await self.client.delete(self.prefix + stale)
+                await self.client.zrem(self.lru_key, stale)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+        await self.client.zrem(self.lru_key, key)
+
+
+def build_cache_backend(
+    kind: str, namespace: str, max_entries: int, settings: Settings
+) -> Optional[CacheBackend]:
+    # build the backend named in settings; "none" disables the cache
+    kind = kind.lower()
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return MemoryBackend(max_entries)
+    if kind == "sqlite":
+        return SQLiteBackend(settings.cache_sqlite_path, namespace, max_entries)
+    if kind == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError(
+                "The redis cache backend needs the redis package: pip install redis"
+            )
+        return RedisBackend(
+            redis.Redis.from_url(settings.cache_redis_url), namespace, max_entries
+        )
+    raise ValueError(
+        f"Unknown cache backend: {kind} (expected 'memory', 'sqlite', 'redis' or 'none')"
+    )
+
+
+def extract_zpid(url: str) -> Optional[str]:
+    match = re.search(r"(\d+)_zpid", url or "")
+    return match.group(1) if match else None
+
+
+def normalize_address(address: str) -> str:
+    # "123 Main St., Austin, TX 78701" and "123-main-st-austin-tx-78701" share one key
+    address = address.lower().replace("-", " ")
+    address = re.sub(r"[^a-z0-9 ]", " ", address)
+    return " ".join(address.split())
+
+
+class ZpidCache:
+    # address -> zpid / final property URL, with a shorter TTL for addresses that
+    # could not be resolved so we don't hammer Zillow for them either
+
+    def __init__(
+        self, backend: Optional[CacheBackend], ttl: float, negative_ttl: float
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    async def lookup(self, address: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        try:
+            entry = await self.backend.get(normalize_address(address))
+        except Exception as e:
+            logger.warning(f"zpid cache lookup failed for {address}: {str(e)}")
+            return None
+
+        if entry is None:
+            self.misses += 1
+        elif entry.get("not_found"):
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def store(self, address: str, final_url: str) -> None:
+        await self._set(
+            address,
+            {
+                "zpid": extract_zpid(final_url),
+                "final_url": final_url,
+                "resolved_at": time.time(),
+            },
+            self.ttl,
+        )
+
+    async def store_not_found(self, address: str, reason: str) -> None:
+        await self._set(
+            address,
+            {"not_found": True, "reason": reason, "resolved_at": time.time()},
+            self.negative_ttl,
+        )
+
+    async def invalidate(self, address: str) -> None:
+        if self.backend is not None:
+            await self.backend.delete(normalize_address(address))
+
+    async def _set(self, address: str, value: Dict[str, Any], ttl: float) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(normalize_address(address), value, ttl)
+        except Exception as e:
+            logger.warning(f"zpid cache write failed for {address}: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+class ResultCache:
+    # zpid -> ScrapeResult (plus optionally the compressed markdown), stored as JSON
+    # entries in two tiers: a per-worker memory LRU in front of a shared disk/Redis store.
+    # Entries younger than fresh_ttl are served as-is; older ones up to stale_ttl
+    # are served immediately while the caller refreshes them in the background.
+
+    def __init__(
+        self,
+        memory: CacheBackend,
+        shared: Optional[CacheBackend],
+        fresh_ttl: float,
+        stale_ttl: float,
+        store_raw: bool = False,
+    ):
+        self.memory = memory
+        self.shared = shared
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.store_raw = store_raw
+        self.counters = {"fresh": 0, "stale": 0, "miss": 0}
+
+    async def get(self, zpid: str, need_raw: bool = False) -> Optional[Dict[str, Any]]:
+        # returns {"result": ScrapeResult, "fresh": bool} or None; with need_raw, an
+        # entry stored without the markdown (store_raw off) is a miss
+        entry = await self._get_entry(zpid)
+        if entry is not None and need_raw and "raw_content_z" not in entry:
+            entry = None
+        if entry is None:
+            self.counters["miss"] += 1
+            return None
+
+        fresh = time.time() - entry["stored_at"] < self.fresh_ttl
+        self.counters["fresh" if fresh else "stale"] += 1
+
+        return {"result": ScrapeResult.from_dict(entry), "fresh": fresh}
+
+    async def put(self, zpid: str, result: ScrapeResult) -> None:
+        # cache annotations describe one answer, not the property
+        entry = result.to_dict()
+        entry.pop("zpid_cache", None)
+        entry.pop("result_cache", None)
+        entry.pop("content_changed", None)
+        entry["stored_at"] = time.time()
+        if self.store_raw and result.raw is not None:
+            entry["raw_content_z"] = result.raw.stored()
+
+        await self.memory.set(zpid, entry, self.stale_ttl)
+        if self.shared is not None:
+            try:
+                await self.shared.set(zpid, entry, self.stale_ttl)
+            except Exception as e:
+                logger.warning(f"result cache write failed for zpid {zpid}: {str(e)}")
+
+    async def invalidate(self, zpid: str) -> None:
+        # this worker's memory tier and the shared tier; other workers' memory tiers age out
+        await self.memory.delete(zpid)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(zpid)
+            except Exception as e:
+                logger.warning(f"result cache delete failed for zpid {zpid}: {str(e)}")
+
+    async def _get_entry(self, zpid: str) -> Optional[Dict[str, Any]]:
+        entry = await self.memory.get(zpid)
+        if entry is not None or self.shared is None:
+            return entry
+
+        try:
+            entry = await self.shared.get(zpid)
+        except Exception as e:
+            logger.warning(f"result cache lookup failed for zpid {zpid}: {str(e)}")
+            return None
+
+        if entry is not None:
+            # promote to the memory tier for the rest of its lifetime
+            remaining = self.stale_ttl - (time.time() - entry["stored_at"])
+            if remaining > 0:
+                await self.memory.set(zpid, entry, remaining)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
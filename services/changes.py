@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+from services.cache import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+# Change detection for property pages. A page's fingerprint hashes only the sections
+# that describe the listing: from the address heading down, minus photos, the
+# neighbourhood sections (schools, similar and nearby homes) and lines that change
+# on every visit (views, saves, time on Zillow, payment estimates). Per zpid, the
+# index keeps the latest fingerprint with the property_data parsed from that page,
+# plus the fingerprint before it and which fields changed between the two, so an
+# unchanged page skips extraction and a "diff" response can name what moved.
+
+# bump when extraction changes, so pages parsed by the old code are parsed again
+EXTRACTION_VERSION = "1"
+IGNORED_SECTIONS = (
+    "nearby schools",
+    "similar homes",
+    "nearby homes",
+    "homes for you",
+    "neighborhood",
+    "getting around",
+    "climate risks",
+    "mortgage",
+    "monthly cost",
+)
+VOLATILE_LINE_RE = re.compile(
+    r"\b\d[\d,]*\s+(?:views?|saves?)\b|\bon zillow\b|\best\. payment\b|\bupdated\b.*\bago\b|^!\[",
+    re.I,
+)
+
+
+def page_fingerprint(markdown: str) -> str:
+    heading = markdown.find("\n# ")
+    text = markdown[heading + 1 :] if heading != -1 else markdown
+    kept = [EXTRACTION_VERSION]
+    skipping = False
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            title = line[3:].lower()
+            skipping = any(title.startswith(section) for section in IGNORED_SECTIONS)
+        if skipping or not line or VOLATILE_LINE_RE.search(line):
+            continue
+        kept.append(line)
+    return hashlib.blake2b("\n".join(kept).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def diff_fields(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    # {"price": {"old": "$849,000", "new": "$829,000"}, ...}
+    return {
+        field: {"old": old.get(field), "new": new.get(field)}
+        for field in dict.fromkeys([*old, *new])
+        if old.get(field) != new.get(field)
+    }
+
+
+def describe_changes(
+    fingerprint: Optional[str],
+    entry: Optional[Dict[str, Any]],
+    since: Optional[str],
+    property_data: Dict[str, Any],
+    content_changed: Optional[bool] = None,
+) -> Dict[str, Any]:
+    # the body of a "diff" response: what changed between `since` (a fingerprint the
+    # caller already has) and now. Without `since` the baseline is the version stored
+    # before this request: unchanged when this fetch matched it (or was served from a
+    # cache), else the version this fetch replaced. When the baseline isn't the one
+    # the index knows, the full property_data is sent.
+    current = entry if entry is not None and entry["hash"] == fingerprint else None
+    if since is None and content_changed is not True:
+        baseline = fingerprint
+    else:
+        baseline = since or (current or {}).get("previous_hash")
+    if fingerprint is not None and baseline == fingerprint:
+        return {"previous_fingerprint": baseline, "changed": False, "changes": {}}
+    if (
+        current is not None
+        and baseline is not None
+        and baseline == current.get("previous_hash")
+    ):
+        return {
+            "previous_fingerprint": baseline,
+            "changed": bool(current["changes"]),
+            "changes": current["changes"],
+        }
+    return {
+        "previous_fingerprint": baseline,
+        "changed": True,
+        "changes": None,
+        "property_data": property_data,
+    }
+
+
+class FingerprintIndex:
+    # zpid -> {hash, property_data, changed_at, previous_hash, changes} on a cache backend
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.counters = {"unchanged": 0, "changed": 0, "new": 0}
+
+    async def get(self, zpid: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        try:
+            return await self.backend.get(zpid)
+        except Exception as e:
+            logger.warning(f"fingerprint lookup failed for zpid {zpid}: {str(e)}")
+            return None
+
+    async def lookup(self, zpid: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        # the entry for a freshly fetched page; counts it when the page is unchanged
+        entry = await self.get(zpid)
+        if entry is not None and entry["hash"] == fingerprint:
+            self.counters["unchanged"] += 1
+        return entry
+
+    async def record(
+        self,
+        zpid: str,
+        fingerprint: str,
+        property_data: Dict[str, Any],
+        previous: Optional[Dict[str, Any]],
+    ) -> None:
+        # a page that differs from the last one seen (or the first one seen)
+        self.counters["changed" if previous else "new"] += 1
+        if self.backend is None:
+            return
+        entry = {
+            "hash": fingerprint,
+            "property_data": property_data,
+            "changed_at": time.time(),
+            "previous_hash": previous["hash"] if previous else None,
+            "changes": (
+                diff_fields(previous["property_data"], property_data)
+                if previous
+                else None
+            ),
+        }
+        try:
+            await self.backend.set(zpid, entry, self.ttl)
+        except Exception as e:
+            logger.warning(f"fingerprint write failed for zpid {zpid}: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
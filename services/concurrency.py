@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    # async token bucket: `rate` tokens per second, bursts up to `capacity`
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # the lock keeps waiters in FIFO order so nobody starves under load
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class ScrapeLimiter:
+    # process-wide budget shared by every request in the worker:
+    # - a semaphore capping how many properties are being scraped at once
+    # - a token bucket per Firecrawl API key capping calls per minute; with shared
+    #   state (services/shared.py) the bucket is shared by every worker
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        calls_per_minute: int,
+        burst: int,
+        shared: Optional[Any] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.calls_per_minute = calls_per_minute
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.shared = shared
+        self.in_flight = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        # hold one of the concurrent property-scrape slots
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    async def throttle(self, api_key: str) -> None:
+        # wait for the rate limit of the API key a Firecrawl call is about to use
+        if self.calls_per_minute <= 0:
+            return
+        if self.shared is not None:
+            # keyed by a digest so the API key itself never lands in the store
+            key = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+            try:
+                wait = await self.shared.reserve_token(
+                    key, self.calls_per_minute / 60.0, self.burst
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Shared rate limit unavailable, using this worker's own: {str(e)}"
+                )
+            else:
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                return
+        bucket = self.buckets.get(api_key)
+        if bucket is None:
+            bucket = self.buckets[api_key] = TokenBucket(
+                self.calls_per_minute / 60.0, self.burst
+            )
+        await bucket.acquire()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "calls_per_minute": self.calls_per_minute,
+            "shared": self.shared is not None,
+        }
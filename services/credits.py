@@ -0,0 +1,369 @@
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.settings import Settings
+from services import metrics
+from services.stats import CreditMeter, current_credit_meter
+
+logger = logging.getLogger(__name__)
+
+# Credit-aware scheduling of Firecrawl work, per API client ("tenant", from the API
+# key in the X-API-Key header; jobs and ingest runs carry their own):
+#   - each scrape is priced up front: the running average of what scrapes of its kind
+#     actually cost ("direct" = a zpid URL, plain basic scrape; "search" = an address,
+#     stealth scrapes with browser actions; "search_page" = one results page; "map" =
+#     an area's listing links), seeded from the scrape profiles
+#   - the price is taken from the tenant's credit bucket (shared between workers like
+#     the Firecrawl rate limit), waiting up to tenant_max_wait_seconds, else 429;
+#     once the scrape is done the bucket is settled with what it really cost
+#   - with a credit budget, work with priority < 0 is shed (HTTP) or deferred (jobs)
+#     while less than credit_budget_reserve of the budget is left
+#   - the worker's scrape slots go to waiting scrapes by weighted fair queuing
+#     (start-time fair queuing, costs scaled by the tenant's weight), so a tenant with
+#     a thousand queued scrapes can't push everyone else to the back
+#   - Firecrawl calls are spread over a pool of API keys (KeyPool)
+
+DEFAULT_TENANT = "anonymous"
+
+current_tenant: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_tenant", default=DEFAULT_TENANT
+)
+current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "current_priority", default=0
+)
+
+
+class CreditLimitError(Exception):
+    # a scrape that the tenant's quota or the credit budget can't cover right now;
+    # deferrable work (priority < 0) can simply be tried again after retry_after
+    def __init__(
+        self, reason: str, tenant: str, retry_after: float, deferrable: bool = False
+    ):
+        super().__init__(f"{reason} for client '{tenant}', retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.tenant = tenant
+        self.retry_after = retry_after
+        self.deferrable = deferrable
+
+
+def client_priority(requested: int, tenant: str) -> int:
+    # what a client may ask for: a configured client can lower its own priority, never
+    # raise it past the default; everyone else runs at the default
+    return min(requested, 0) if tenant != DEFAULT_TENANT else 0
+
+
+class TenantMiddleware:
+    # ASGI middleware: the client whose API key the request carries, and the priority
+    # it asks for, into current_tenant / current_priority for everything the request
+    # runs. Headers are not trusted on their own: an unknown or missing key is the
+    # anonymous client, so nobody can spend another client's quota by naming it.
+    def __init__(
+        self, app: ASGIApp, keys: Dict[str, str], header: str = "X-API-Key"
+    ) -> None:
+        self.app = app
+        self.keys = keys
+        self.header = header.lower()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        tenant = self.keys.get(headers.get(self.header, "")) or DEFAULT_TENANT
+        try:
+            priority = client_priority(int(headers.get("x-priority", 0)), tenant)
+        except ValueError:
+            priority = 0
+        tenant_token = current_tenant.set(tenant)
+        priority_token = current_priority.set(priority)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_priority.reset(priority_token)
+            current_tenant.reset(tenant_token)
+
+
+class LocalBuckets:
+    # the shared state's reserve_token for one worker, when there is no shared state
+
+    def __init__(self) -> None:
+        self.buckets: Dict[str, List[float]] = {}
+
+    async def reserve_token(
+        self, key: str, rate: float, capacity: float, tokens: float = 1.0
+    ) -> float:
+        now = time.monotonic()
+        level, updated = self.buckets.get(key, (capacity, now))
+        level = min(capacity, level + max(0.0, now - updated) * rate) - tokens
+        self.buckets[key] = [level, now]
+        return max(0.0, -level / rate)
+
+
+class CreditEstimator:
+    # expected credits per scrape of each kind: an exponential moving average of what
+    # they cost, starting from the profile-based priors
+
+    def __init__(self, priors: Dict[str, float], alpha: float = 0.2):
+        self.estimates = dict(priors)
+        self.alpha = alpha
+        self.observed: Dict[str, int] = {kind: 0 for kind in priors}
+
+    def estimate(self, kind: str) -> float:
+        return self.estimates[kind]
+
+    def observe(self, kind: str, credits: float) -> None:
+        self.observed[kind] += 1
+        self.estimates[kind] += self.alpha * (credits - self.estimates[kind])
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            kind: {"estimate": round(value, 2), "observed": self.observed[kind]}
+            for kind, value in self.estimates.items()
+        }
+
+
+class FairQueue:
+    # weighted fair queuing over `capacity` concurrent slots. Each scrape gets a start
+    # tag max(virtual time, its tenant's last finish tag) and a finish tag start +
+    # cost / weight; free slots go to the smallest finish tag, and the virtual time
+    # follows the start tag of the scrape last let through
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.running = 0
+        self.virtual_time = 0.0
+        self.finish: Dict[str, float] = {}
+        self.waiting: List[Any] = []
+        self.order = itertools.count()
+
+    def _tags(self, tenant: str, weight: float, cost: float) -> Tuple[float, float]:
+        start = max(self.virtual_time, self.finish.get(tenant, 0.0))
+        # free (cached) scrapes still take a turn
+        self.finish[tenant] = start + max(cost, 0.1) / weight
+        return start, self.finish[tenant]
+
+    async def acquire(self, tenant: str, weight: float, cost: float) -> None:
+        start, finish = self._tags(tenant, weight, cost)
+        if self.running < self.capacity and not self.waiting:
+            self.virtual_time = start
+            self.running += 1
+            return
+
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (finish, next(self.order), start, turn))
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if turn.done() and not turn.cancelled():
+                # given a slot just as the caller went away: pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.running -= 1
+        while self.waiting and self.running < self.capacity:
+            _, _, start, turn = heapq.heappop(self.waiting)
+            if turn.done():
+                continue
+            self.virtual_time = start
+            self.running += 1
+            turn.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "waiting": len(self.waiting),
+        }
+
+
+class KeyPool:
+    # Firecrawl API keys calls are spread over: each call takes the key with the fewest
+    # calls in flight in this worker. A key that answers 401 / 402 (out of credits) /
+    # 429 sits out `cooldown` seconds unless every key is cooling down.
+
+    def __init__(self, keys: List[str], cooldown: float = 300):
+        self.keys = list(dict.fromkeys(key for key in keys if key))
+        self.cooldown = cooldown
+        self.in_flight = {key: 0 for key in self.keys}
+        self.calls = {key: 0 for key in self.keys}
+        self.cooling_until = {key: 0.0 for key in self.keys}
+
+    def acquire(self) -> str:
+        now = time.monotonic()
+        ready = [
+            key for key in self.keys if self.cooling_until[key] <= now
+        ] or self.keys
+        key = min(
+            ready,
+            key=lambda candidate: (self.in_flight[candidate], self.calls[candidate]),
+        )
+        self.in_flight[key] += 1
+        self.calls[key] += 1
+        return key
+
+    def release(self, key: str, status_code: Optional[int] = None) -> None:
+        self.in_flight[key] -= 1
+        if status_code in (401, 402, 429) and len(self.keys) > 1:
+            self.cooling_until[key] = time.monotonic() + self.cooldown
+            logger.warning(
+                f"Firecrawl key {self.label(key)} answered {status_code}, cooling down for {self.cooldown:.0f}s"
+            )
+
+    @staticmethod
+    def label(key: str) -> str:
+        # keys never appear in logs or stats, only a digest of them
+        return hashlib.sha256(key.encode()).hexdigest()[:8]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "key": self.label(key),
+                "in_flight": self.in_flight[key],
+                "calls": self.calls[key],
+                "cooling_down": self.cooling_until[key] > now,
+            }
+            for key in self.keys
+        ]
+
+
+class CreditScheduler:
+    # admission in front of each scrape or map: tenant quota, credit budget and a
+    # fair turn at the worker's scrape slots; see the top of this file
+
+    def __init__(
+        self,
+        settings: Settings,
+        estimator: CreditEstimator,
+        buckets: Optional[Any] = None,
+    ):
+        self.enabled = settings.credit_scheduling
+        self.settings = settings
+        self.estimator = estimator
+        self.buckets = buckets or LocalBuckets()
+        self.queue = FairQueue(settings.max_concurrent_scrapes)
+        self.tenants: Dict[str, Dict[str, float]] = {}
+
+    def _quota(self, tenant: str) -> Dict[str, float]:
+        quota = self.settings.tenant_quotas.get(tenant, {})
+        return {
+            "weight": max(quota.get("weight", self.settings.tenant_weight), 0.01),
+            "credits_per_minute": quota.get(
+                "credits_per_minute", self.settings.tenant_credits_per_minute
+            ),
+        }
+
+    def _counters(self, tenant: str) -> Dict[str, float]:
+        if tenant not in self.tenants:
+            self.tenants[tenant] = {
+                "admitted": 0,
+                "rejected": 0,
+                "shed": 0,
+                "estimated_credits": 0,
+                "credits": 0,
+            }
+        return self.tenants[tenant]
+
+    async def _reserve(
+        self, key: str, rate: float, capacity: float, credits: float
+    ) -> float:
+        # fails open like the Firecrawl rate limit
+        try:
+            return await self.buckets.reserve_token(key, rate, capacity, credits)
+        except Exception as e:
+            logger.warning(
+                f"Credit bucket {key} unavailable, not enforcing it: {str(e)}"
+            )
+            return 0.0
+
+    @asynccontextmanager
+    async def admit(self, kind: str) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        tenant, priority = current_tenant.get(), current_priority.get()
+        quota = self._quota(tenant)
+        counters = self._counters(tenant)
+        cost = self.estimator.estimate(kind)
+        budget = self.settings.credit_budget_per_hour
+        per_minute = quota["credits_per_minute"]
+        tenant_key = f"tenant:{hashlib.sha256(tenant.encode()).hexdigest()[:16]}"
+        # the budget holds an hour of credits, a tenant bucket a minute of them
+        budget_bucket = ("credit_budget", budget / 3600.0, budget)
+        tenant_bucket = (tenant_key, per_minute / 60.0, per_minute)
+
+        if budget > 0 and priority < 0:
+            # low-priority work may not dip into the reserve: ask for the reserve on top
+            # of the cost, then hand the reserve straight back
+            reserve = budget * self.settings.credit_budget_reserve
+            wait = await self._reserve(*budget_bucket, cost + reserve)
+            await self._reserve(
+                *budget_bucket, -(cost + reserve) if wait > 0 else -reserve
+            )
+            if wait > 0:
+                counters["shed"] += 1
+                metrics.count_scheduler(kind, "shed")
+                raise CreditLimitError(
+                    "Credit budget running low", tenant, wait, deferrable=True
+                )
+        elif budget > 0:
+            await self._reserve(*budget_bucket, cost)
+
+        if per_minute > 0:
+            wait = await self._reserve(*tenant_bucket, cost)
+            if wait > self.settings.tenant_max_wait_seconds:
+                await self._reserve(*tenant_bucket, -cost)
+                if budget > 0:
+                    await self._reserve(*budget_bucket, -cost)
+                counters["rejected"] += 1
+                metrics.count_scheduler(kind, "rejected")
+                raise CreditLimitError(
+                    "Credit quota exceeded", tenant, wait, deferrable=priority < 0
+                )
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        await self.queue.acquire(tenant, quota["weight"], cost)
+        counters["admitted"] += 1
+        counters["estimated_credits"] += cost
+        metrics.count_scheduler(kind, "admitted")
+        meter = CreditMeter(current_credit_meter.get())
+        token = current_credit_meter.set(meter)
+        try:
+            yield
+        finally:
+            current_credit_meter.reset(token)
+            self.queue.release()
+            # settle up: charge (or refund) the difference between estimate and spend
+            counters["credits"] += meter.credits
+            self.estimator.observe(kind, meter.credits)
+            if meter.credits != cost:
+                if per_minute > 0:
+                    await self._reserve(*tenant_bucket, meter.credits - cost)
+                if budget > 0:
+                    await self._reserve(*budget_bucket, meter.credits - cost)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queue": self.queue.stats(),
+            "estimates": self.estimator.snapshot(),
+            "tenants": {
+                tenant: {
+                    **self._quota(tenant),
+                    **{name: round(value, 2) for name, value in counters.items()},
+                }
+                for tenant, counters in self.tenants.items()
+            },
+        }
@@ -0,0 +1,617 @@
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Property field extraction. Listing JSON embedded in the raw HTML is used when the
+# page has it (see the bottom of this file); the markdown pass below fills the rest.
+#
+# The original per-field regexes all start with a number (r'(\d+)\s*(?:bd|bed|bedroom)'
+# and friends), so each one re-tried every digit on the page. Here one precompiled scan
+# walks the unit keywords (bd, ba, sq ft, acre, built, ...) in order, and each hit reads
+# its number by stepping backwards over the whitespace and digits in front of it. The
+# first hit with a valid number is exactly the leftmost match the old regex would find,
+# so the results are identical; the markdown is lowercased once and scanned once.
+
+PRICE_RE = re.compile(r"\$[\d,]+(?:\.\d{2})?")
+UNIT_KEYWORD_RE = re.compile(r"bd|bed|ba|built|sq ft|sqft|square feet|acre")
+FOUR_DIGITS_RE = re.compile(r"\d{4}")
+PROPERTY_LINK_RE = re.compile(r'href="([^"]*homedetails[^"]*_zpid[^"]*)"')
+QUOTED_PROPERTY_PATH_RE = re.compile(r'"(\/homedetails\/[^"]*_zpid[^"]*)"')
+
+# listed in priority order: the first type in this list that appears anywhere wins
+PROPERTY_TYPES = [
+    "single family",
+    "condo",
+    "townhouse",
+    "multi-family",
+    "land",
+    "mobile",
+]
+
+NUMERIC_FIELDS = ("bedrooms", "bathrooms", "square_feet", "lot_size", "year_built")
+
+
+# fields every result carries; the structured ones stay None when a page has no embedded JSON
+STRUCTURED_FIELDS = (
+    "zpid",
+    "zestimate",
+    "rent_zestimate",
+    "hoa_fee",
+    "latitude",
+    "longitude",
+    "tax_history",
+)
+CORE_FIELDS = (
+    "price",
+    "bedrooms",
+    "bathrooms",
+    "square_feet",
+    "lot_size",
+    "year_built",
+    "property_type",
+)
+
+
+def extract_property_fields(
+    markdown: str, metadata: Dict[str, Any], html: Optional[str] = None
+) -> Dict[str, Any]:
+    # extract structured property data from a page; the embedded JSON in the raw HTML
+    # wins when present and the markdown scan only fills the fields it didn't have
+    structured = extract_embedded_property(html) if html else None
+
+    property_data: Dict[str, Any] = {
+        "address": metadata.get("title", "").replace(" | Zillow", ""),
+        **dict.fromkeys(CORE_FIELDS),
+        "description": metadata.get("description", ""),
+        "images": metadata.get("ogImage", []),
+        **dict.fromkeys(STRUCTURED_FIELDS),
+        "data_source": "markdown",
+    }
+
+    if structured:
+        for key, value in structured.items():
+            if value is not None and value != "":
+                property_data[key] = value
+
+    if not structured or any(property_data[field] is None for field in CORE_FIELDS):
+        for key, value in _extract_markdown_fields(markdown).items():
+            if property_data[key] is None:
+                property_data[key] = value
+
+    return property_data
+
+
+def _extract_markdown_fields(markdown: str) -> Dict[str, Any]:
+    lowered = markdown.lower()
+    fields = _scan_units(lowered)
+    # "$" and digits are unchanged by lower(), so the lowered text gives the same match
+    fields["price"] = _group(PRICE_RE.search(lowered))
+    fields["property_type"] = _property_type(lowered)
+    return fields
+
+
+def _scan_units(text: str) -> Dict[str, Any]:
+    fields: Dict[str, Any] = dict.fromkeys(NUMERIC_FIELDS)
+    remaining = set(NUMERIC_FIELDS)
+
+    for match in UNIT_KEYWORD_RE.finditer(text):
+        keyword = match.group(0)
+        start, end = match.span()
+
+        if keyword in ("bd", "bed"):
+            # (\d+)\s*(?:bd|bed|bedroom)
+            if "bedrooms" in remaining:
+                number = _number_before(text, start, _is_digit)
+                if number:
+                    fields["bedrooms"] = int(number[0])
+                    remaining.discard("bedrooms")
+
+        elif keyword == "ba":
+            # (\d+(?:\.\d+)?)\s*(?:ba|bath|bathroom)
+            if "bathrooms" in remaining:
+                decimal = _decimal_before(text, start)
+                if decimal:
+                    fields["bathrooms"] = float(decimal)
+                    remaining.discard("bathrooms")
+
+        elif keyword == "built":
+            # (?:built|year built).*?(\d{4}), where . stops at a newline
+            if "year_built" in remaining:
+                line_end = text.find("\n", end)
+                year = FOUR_DIGITS_RE.search(
+                    text, end, len(text) if line_end == -1 else line_end
+                )
+                if year:
+                    fields["year_built"] = int(year.group(0))
+                    remaining.discard("year_built")
+
+        elif keyword == "acre":
+            # ([\d,.]+)\s*(?:acres?|sq ft lot)
+            if "lot_size" in remaining:
+                number = _number_before(text, start, _is_lot_char)
+                if number:
+                    stop = end + 1 if text.startswith("s", end) else end
+                    fields["lot_size"] = text[number[1] : stop]
+                    remaining.discard("lot_size")
+
+        else:
+            # ([\d,]+)\s*(?:sq ft|sqft|square feet)
+            if "square_feet" in remaining:
+                number = _number_before(text, start, _is_sqft_char)
+                if number:
+                    fields["square_feet"] = int(number[0].replace(",", ""))
+                    remaining.discard("square_feet")
+            if (
+                keyword == "sq ft"
+                and "lot_size" in remaining
+                and text.startswith(" lot", end)
+            ):
+                number = _number_before(text, start, _is_lot_char)
+                if number:
+                    fields["lot_size"] = text[number[1] : end + 4]
+                    remaining.discard("lot_size")
+
+        if not remaining:
+            break
+
+    return fields
+
+
+def _is_digit(char: str) -> bool:
+    # same set as \d in a str pattern
+    return char.isdecimal()
+
+
+def _is_sqft_char(char: str) -> bool:
+    return char == "," or char.isdecimal()
+
+
+def _is_lot_char(char: str) -> bool:
+    return char in ",." or char.isdecimal()
+
+
+def _skip_space_before(text: str, index: int) -> int:
+    while index > 0 and text[index - 1].isspace():
+        index -= 1
+    return index
+
+
+def _number_before(
+    text: str, index: int, accept: Callable[[str], bool]
+) -> Optional[Tuple[str, int]]:
+    # the run of `accept` characters that ends just before index (after optional
+    # whitespace), with the position it starts at; None if there is no such run
+    end = _skip_space_before(text, index)
+    start = end
+    while start > 0 and accept(text[start - 1]):
+        start -= 1
+    if start == end:
+        return None
+    return text[start:end], start
+
+
+def _decimal_before(text: str, index: int) -> Optional[str]:
+    # \d+(?:\.\d+)? ending just before index: fractional digits, then optionally
+    # ".", then the integer digits in front of them
+    number = _number_before(text, index, _is_digit)
+    if number is None:
+        return None
+    digits, start = number
+    if start >= 2 and text[start - 1] == "." and text[start - 2].isdecimal():
+        whole = start - 1
+        while whole > 0 and text[whole - 1].isdecimal():
+            whole -= 1
+        return text[whole:start] + digits
+    return digits
+
+
+def _group(match: Optional["re.Match[str]"]) -> Optional[str]:
+    return match.group(0) if match else None
+
+
+def _property_type(lowered: str) -> Optional[str]:
+    for prop_type in PROPERTY_TYPES:
+        if prop_type in lowered:
+            return prop_type.title()
+    return None
+
+
+def find_property_links(html: str) -> List[str]:
+    # homedetails/_zpid links on a search results page, in page order
+    matches = PROPERTY_LINK_RE.findall(html)
+    if not matches:
+        # try alternative pattern
+        matches = QUOTED_PROPERTY_PATH_RE.findall(html)
+    return matches
+
+
+# --- search results pages ---
+# One results page lists dozens of listings. Each listing card gives its zpid, link,
+# address and headline numbers without a detail scrape. They come from the page's
+# searchResults JSON when the html embeds it; otherwise from the markdown card blocks
+# ("- [![](photo)](homedetails link)", price, bds/ba/sqft, status, address link);
+# otherwise from the bare homedetails links.
+
+CARD_START_RE = re.compile(
+    r"^- \[!\[[^\]]*\]\([^)]*\)\]\(([^)\s]*homedetails[^)\s]*_zpid[^)\s]*)\)", re.M
+)
+CARD_PRICE_RE = re.compile(r"^[ \t]*(\$[\d,]+(?:\.\d{2})?)\+?[ \t]*$", re.M)
+CARD_BEDS_RE = re.compile(r"\*\*([\d.]+)\*\*\s*bds?\b")
+CARD_BATHS_RE = re.compile(r"\*\*([\d.]+)\*\*\s*ba\b")
+CARD_SQFT_RE = re.compile(r"\*\*([\d,]+)\*\*\s*sqft\b")
+CARD_STATUS_RE = re.compile(
+    r"^[ \t]*- ([A-Za-z /-]+ for (?:sale|rent)|Sold|Pending|Coming soon)[ \t]*$",
+    re.M | re.I,
+)
+CARD_ADDRESS_RE = re.compile(
+    r"^[ \t]*\[([^\]!][^\]]*)\]\([^)]*homedetails[^)]*\)", re.M
+)
+ZPID_PATH_RE = re.compile(r"/(\d+)_zpid")
+
+
+def extract_search_cards(
+    markdown: str, html: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    # every listing on a results page, in page order and one per zpid:
+    # {"zpid", "url", "address", "price", "bedrooms", "bathrooms", "square_feet", "status"}
+    cards = (_next_data_search_cards(html) if html else None) or _markdown_search_cards(
+        markdown or ""
+    )
+    if not cards and html:
+        cards = [listing_card(url) for url in find_property_links(html)]
+
+    seen = set()
+    unique = []
+    for card in cards:
+        if card["zpid"] and card["zpid"] not in seen:
+            seen.add(card["zpid"])
+            unique.append(card)
+    return unique
+
+
+def listing_card(
+    url: str,
+    address: Optional[str] = None,
+    price: Optional[str] = None,
+    bedrooms: Optional[int] = None,
+    bathrooms: Optional[float] = None,
+    square_feet: Optional[int] = None,
+    status: Optional[str] = None,
+) -> Dict[str, Any]:
+    # one listing as harvested from a results page; only zpid and url are always known
+    if url.startswith("/"):
+        url = f"https://www.zillow.com{url}"
+    zpid = ZPID_PATH_RE.search(url)
+    return {
+        "zpid": zpid.group(1) if zpid else None,
+        "url": url,
+        "address": address,
+        "price": price,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "square_feet": square_feet,
+        "status": status,
+    }
+
+
+def _markdown_search_cards(markdown: str) -> List[Dict[str, Any]]:
+    starts = list(CARD_START_RE.finditer(markdown))
+    cards = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1].start() if index + 1 < len(starts) else len(markdown)
+        block = markdown[start.end() : end]
+        beds, baths, sqft = (
+            CARD_BEDS_RE.search(block),
+            CARD_BATHS_RE.search(block),
+            CARD_SQFT_RE.search(block),
+        )
+        cards.append(
+            listing_card(
+                start.group(1),
+                address=_captured(CARD_ADDRESS_RE.search(block)),
+                price=_captured(CARD_PRICE_RE.search(block)),
+                bedrooms=_as_int(beds.group(1)) if beds else None,
+                bathrooms=_as_float(baths.group(1)) if baths else None,
+                square_feet=_as_int(sqft.group(1).replace(",", "")) if sqft else None,
+                status=_captured(CARD_STATUS_RE.search(block)),
+            )
+        )
+    return cards
+
+
+def _captured(match: Optional["re.Match[str]"]) -> Optional[str]:
+    return match.group(1) if match else None
+
+
+def _next_data_search_cards(html: str) -> Optional[List[Dict[str, Any]]]:
+    script = _script_body(html, NEXT_DATA_MARKER)
+    if script is None:
+        return None
+    try:
+        data = json.loads(script[0])
+    except ValueError:
+        return None
+
+    # props.pageProps.searchPageState.cat1.searchResults.listResults on current pages
+    results = _find_key(data, "listResults", depth=8)
+    if not isinstance(results, list):
+        return None
+    cards = []
+    for item in results:
+        if not isinstance(item, dict) or not item.get("detailUrl"):
+            continue
+        cards.append(
+            listing_card(
+                item["detailUrl"],
+                address=_as_str(item.get("address")),
+                price=_format_price(item.get("unformattedPrice"))
+                or _as_str(item.get("price")),
+                bedrooms=_as_int(item.get("beds")),
+                bathrooms=_as_float(item.get("baths")),
+                square_feet=_as_int(item.get("area")),
+                status=_as_str(item.get("statusText")),
+            )
+        )
+    return cards
+
+
+def _find_key(node: Any, key: str, depth: int) -> Any:
+    if depth <= 0:
+        return None
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        children: Iterable[Any] = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key, depth - 1)
+        if found is not None:
+            return found
+    return None
+
+
+# --- embedded JSON (__NEXT_DATA__ / JSON-LD) ---
+# The <script> block is located with plain string searches and only that bounded
+# window is parsed, so the rest of a multi-megabyte page is never tokenised.
+
+NEXT_DATA_MARKER = '<script id="__NEXT_DATA__"'
+JSON_LD_MARKER = '<script type="application/ld+json"'
+# never hand json.loads more than this from a single <script> block
+MAX_SCRIPT_CHARS = 4 * 1024 * 1024
+
+HOME_TYPES = {
+    "SINGLE_FAMILY": "Single Family",
+    "CONDO": "Condo",
+    "TOWNHOUSE": "Townhouse",
+    "MULTI_FAMILY": "Multi-Family",
+    "LOT": "Land",
+    "LAND": "Land",
+    "MANUFACTURED": "Mobile",
+    "MOBILE": "Mobile",
+}
+JSON_LD_RESIDENCE_TYPES = {"SingleFamilyResidence", "Residence", "House", "Apartment"}
+
+
+def extract_embedded_property(html: str) -> Optional[Dict[str, Any]]:
+    # property fields from the page's embedded JSON, or None if there is none
+    payload = _next_data_property(html)
+    if payload is not None:
+        fields = _fields_from_next_data(payload)
+        fields["data_source"] = "next_data"
+        return fields
+
+    payload = _json_ld_residence(html)
+    if payload is not None:
+        fields = _fields_from_json_ld(payload)
+        fields["data_source"] = "json_ld"
+        return fields
+
+    return None
+
+
+def _script_body(html: str, marker: str, start: int = 0) -> Optional[Tuple[str, int]]:
+    # the text of the first <script> starting with marker at or after start, found with
+    # plain string searches and capped at MAX_SCRIPT_CHARS, plus where the block ends
+    tag = html.find(marker, start)
+    if tag == -1:
+        return None
+    body_start = html.find(">", tag) + 1
+    body_end = html.find("</script>", body_start, body_start + MAX_SCRIPT_CHARS)
+    if body_start == 0 or body_end == -1:
+        return None
+    return html[body_start:body_end], body_end
+
+
+def _next_data_property(html: str) -> Optional[Dict[str, Any]]:
+    script = _script_body(html, NEXT_DATA_MARKER)
+    if script is None:
+        return None
+    try:
+        data = json.loads(script[0])
+    except ValueError:
+        return None
+
+    # current pages keep the listing in a JSON string: gdpClientCache -> {query: {"property": {...}}}
+    component_props = (
+        data.get("props", {}).get("pageProps", {}).get("componentProps", {})
+    )
+    cache = component_props.get("gdpClientCache")
+    if isinstance(cache, str):
+        try:
+            cache = json.loads(cache)
+        except ValueError:
+            cache = None
+    if isinstance(cache, dict):
+        for entry in cache.values():
+            if isinstance(entry, dict) and isinstance(entry.get("property"), dict):
+                listing: Dict[str, Any] = entry["property"]
+                return listing
+
+    # older layouts: look for the first object that looks like a listing
+    return _find_listing(data, depth=8)
+
+
+def _find_listing(node: Any, depth: int) -> Optional[Dict[str, Any]]:
+    if depth <= 0:
+        return None
+    if isinstance(node, dict):
+        if "zpid" in node and ("bedrooms" in node or "price" in node):
+            return node
+        children: Iterable[Any] = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_listing(child, depth - 1)
+        if found is not None:
+            return found
+    return None
+
+
+def _json_ld_residence(html: str) -> Optional[Dict[str, Any]]:
+    position = 0
+    while True:
+        script = _script_body(html, JSON_LD_MARKER, position)
+        if script is None:
+            return None
+        body, position = script
+        try:
+            data = json.loads(body)
+        except ValueError:
+            continue
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict) and _json_ld_type(item) & JSON_LD_RESIDENCE_TYPES:
+                return item
+
+
+def _json_ld_type(item: Dict[str, Any]) -> set:
+    types = item.get("@type", [])
+    return set(types) if isinstance(types, list) else {types}
+
+
+def _fields_from_next_data(listing: Dict[str, Any]) -> Dict[str, Any]:
+    address = listing.get("address") or {}
+    return {
+        "zpid": _as_str(listing.get("zpid")),
+        "address": _format_address(
+            address.get("streetAddress"),
+            address.get("city"),
+            address.get("state"),
+            address.get("zipcode"),
+        ),
+        "price": _format_price(listing.get("price")),
+        "bedrooms": _as_int(listing.get("bedrooms")),
+        "bathrooms": _as_float(listing.get("bathrooms")),
+        "square_feet": _as_int(listing.get("livingArea")),
+        "lot_size": _format_lot(
+            listing.get("lotAreaValue"),
+            listing.get("lotAreaUnits"),
+            listing.get("lotSize"),
+        ),
+        "year_built": _as_int(listing.get("yearBuilt")),
+        "property_type": _format_home_type(listing.get("homeType")),
+        "description": listing.get("description"),
+        "zestimate": _as_int(listing.get("zestimate")),
+        "rent_zestimate": _as_int(listing.get("rentZestimate")),
+        "hoa_fee": _as_float(listing.get("monthlyHoaFee")),
+        "latitude": _as_float(listing.get("latitude")),
+        "longitude": _as_float(listing.get("longitude")),
+        "tax_history": _format_tax_history(listing.get("taxHistory")),
+    }
+
+
+def _fields_from_json_ld(item: Dict[str, Any]) -> Dict[str, Any]:
+    address = item.get("address") or {}
+    geo = item.get("geo") or {}
+    floor_size = item.get("floorSize") or {}
+    offers = item.get("offers") or {}
+    return {
+        "address": _format_address(
+            address.get("streetAddress"),
+            address.get("addressLocality"),
+            address.get("addressRegion"),
+            address.get("postalCode"),
+        ),
+        "price": _format_price(
+            offers.get("price") if isinstance(offers, dict) else None
+        ),
+        "square_feet": (
+            _as_int(str(floor_size.get("value", "")).replace(",", ""))
+            if isinstance(floor_size, dict)
+            else None
+        ),
+        "description": item.get("description"),
+        "latitude": _as_float(geo.get("latitude")),
+        "longitude": _as_float(geo.get("longitude")),
+    }
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(float(value)) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_str(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def _format_price(value: Any) -> Optional[str]:
+    # same "$849,000" shape the markdown extractor returns
+    amount = _as_int(value)
+    return f"${amount:,}" if amount else None
+
+
+def _format_address(street: Any, city: Any, state: Any, zip_code: Any) -> Optional[str]:
+    if not street:
+        return None
+    return f"{street}, {city}, {state} {zip_code}".strip()
+
+
+def _format_lot(value: Any, units: Any, lot_size_sqft: Any) -> Optional[str]:
+    amount = _as_float(value)
+    if (
+        amount is not None
+        and isinstance(units, str)
+        and units.lower().startswith("acre")
+    ):
+        return f"{amount:g} acres"
+    if amount is not None:
+        return f"{int(amount):,} sq ft lot"
+    sqft = _as_int(lot_size_sqft)
+    return f"{sqft:,} sq ft lot" if sqft else None
+
+
+def _format_home_type(home_type: Any) -> Optional[str]:
+    if not isinstance(home_type, str) or not home_type:
+        return None
+    return HOME_TYPES.get(home_type.upper(), home_type.replace("_", " ").title())
+
+
+def _format_tax_history(history: Any) -> Optional[List[Dict[str, Any]]]:
+    if not isinstance(history, list):
+        return None
+    rows = []
+    for entry in history:
+        if not isinstance(entry, dict):
+            continue
+        rows.append(
+            {
+                "time": entry.get("time"),
+                "tax_paid": _as_float(entry.get("taxPaid")),
+                "assessed_value": _as_float(entry.get("value")),
+            }
+        )
+    return rows or None
@@ -1,52 +1,339 @@
-from firecrawl import FirecrawlApp
 from dotenv import load_dotenv
-import os
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 
 load_dotenv()
 
+from config.settings import settings
+from services.transport import build_transport
+from services.concurrency import ScrapeLimiter
+from services.stats import SearchStats, ProfileStats, CreditMeter, current_credit_meter, estimate_credits
+from services.credits import CreditEstimator, CreditLimitError, CreditScheduler, KeyPool
+from services.cache import ZpidCache, ResultCache, MemoryBackend, build_cache_backend, extract_zpid, normalize_address
+from services.singleflight import SingleFlight
+from services.extraction import extract_property_fields, extract_search_cards, listing_card
+from services.changes import FingerprintIndex, describe_changes, page_fingerprint
+from services.area import AreaIndex, build_zillow_results_url, classify, in_area, needs_scrape
+from services.parsing import ParseExecutor
+from services.profiles import build_profiles, debug_screenshot, named_wait, response_payload_bytes
+from services.tuning import WaitTuner
+from services.scheduler import StrategyScheduler
+from services.shared import build_shared_state, held_lock
+from services.results import PropertyNotFound, ScrapeResult, RawContent
+from services.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, current_retry_budget, backoff_delay
+from services import metrics, tracing
+
 class ZillowScrapingService:
-    def __init__(self):
-        self.app = FirecrawlApp(api_key=os.getenv("FIRECRAWL_API_KEY"))
-        print("FIRECRAWL_API_KEY", os.getenv("FIRECRAWL_API_KEY"))
+    def __init__(self, transport: Any = None) -> None:
+        # transport is any object with an async scrape_url(url, **params), see services/transport.py
+        self.transport = transport or build_transport(settings)
+        # rate limit, coalescing locks and strategy outcomes shared with the other workers
+        self.shared = build_shared_state(settings)
+        # one budget for every request handled by this worker (the rate limit is shared)
+        self.limiter = ScrapeLimiter(
+            max_concurrent=settings.max_concurrent_scrapes,
+            calls_per_minute=settings.firecrawl_calls_per_minute,
+            burst=settings.firecrawl_burst,
+            shared=self.shared,
+        )
+        # the Firecrawl API keys calls are spread over
+        self.key_pool = KeyPool(
+            [settings.firecrawl_api_key, *settings.firecrawl_api_keys.split(",")],
+            cooldown=settings.firecrawl_key_cooldown_seconds,
+        )
+        # "sequential" tries the search strategies one by one, "hedged" races them
+        self.search_mode = settings.search_mode
+        self.search_stats = SearchStats()
+        # learned order of the search strategies, skipping ones that keep failing
+        self.strategy_scheduler = StrategyScheduler(
+            ["primary", "fallback", "direct_url"],
+            window=settings.strategy_window,
+            min_samples=settings.strategy_min_samples,
+            breaker_failures=settings.strategy_breaker_failures,
+            open_seconds=settings.strategy_probe_interval_seconds,
+            enabled=settings.strategy_scheduling,
+        )
+        self._probes = set()
+        self._strategies_synced = 0.0
+        # one breaker per proxy mode: when Firecrawl/Zillow keep failing in a mode, calls fail fast
+        self.breakers = {
+            mode: CircuitBreaker(mode, settings.breaker_failure_threshold, settings.breaker_reset_seconds)
+            for mode in ("basic", "stealth")
+        }
+        # address -> zpid/final URL, so repeat searches skip the browser-action search
+        self.zpid_cache = ZpidCache(
+            build_cache_backend(settings.zpid_cache_backend, "zpid", settings.zpid_cache_max_entries, settings),
+            ttl=settings.zpid_cache_ttl_seconds,
+            negative_ttl=settings.zpid_cache_negative_ttl_seconds,
+        )
+        self.fingerprints = FingerprintIndex(
+            build_cache_backend(settings.fingerprint_backend, "fingerprint", settings.fingerprint_max_entries, settings),
+            ttl=settings.fingerprint_ttl_seconds,
+        )
+        self.area_index = AreaIndex(
+            build_cache_backend(settings.area_index_backend, "area", settings.area_index_max_entries, settings),
+            ttl=settings.area_index_ttl_seconds,
+        )
+        # zpid -> parsed result, served locally before asking Firecrawl
+        self.result_cache = ResultCache(
+            memory=MemoryBackend(settings.result_cache_memory_entries),
+            shared=build_cache_backend(settings.result_cache_backend, "result", settings.result_cache_max_entries, settings),
+            fresh_ttl=settings.result_cache_fresh_seconds,
+            stale_ttl=settings.result_cache_stale_seconds,
+            store_raw=settings.result_cache_store_raw,
+        )
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # dedupes concurrent scrapes of the same property
+        self.single_flight = SingleFlight()
+        # CPU-bound parsing of large pages runs off the event loop
+        self.parser = ParseExecutor(
+            mode=settings.parse_executor,
+            workers=settings.parse_workers,
+            threshold_bytes=settings.parse_offload_threshold_bytes,
+        )
+        # the formats and page options each kind of Firecrawl call asks for
+        self.profiles = build_profiles(settings)
+        self.profile_stats = ProfileStats()
+        # per-client quotas, credit budget and fair turns at the scrape slots; a search
+        # is priced as its first search call plus the property page, a results page as
+        # one search call, an area map as its flat credit
+        direct_credits = estimate_credits(self.profiles["property"].params())
+        search_credits = estimate_credits(self.profiles["search_primary"].params()) + direct_credits
+        priors = {
+            "direct": direct_credits,
+            "search": search_credits,
+            "search_page": estimate_credits(self.profiles["search_direct_url"].params()),
+            "map": 1,
+        }
+        self.credit_scheduler = CreditScheduler(
+            settings,
+            CreditEstimator(priors, alpha=settings.credit_estimate_alpha),
+            buckets=self.shared,
+        )
+        # learns how far each profile's waits and timeouts can be tightened, from the
+        # outcomes of every worker when there is shared state
+        self.wait_tuner = WaitTuner(
+            settings.wait_tuning_path,
+            bases=settings.scrape_waits,
+            window=settings.wait_tuning_window,
+            min_scale=settings.wait_tuning_min_scale,
+            max_scale=settings.wait_tuning_max_scale,
+            tolerance=settings.wait_tuning_tolerance,
+            enabled=settings.wait_tuning_enabled,
+            shared=self.shared is not None,
+        )
+        self._wait_tuning_synced = 0.0
         self.logger = logging.getLogger(__name__)
+
+    async def aclose(self):
+        await self.transport.aclose()
+        self.parser.shutdown()
+        if self.shared is not None:
+            await self.sync_wait_tuning(force=True)
+            await self.shared.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        # everything the service counts, for the /stats endpoint
+        return {
+            "search_mode": self.search_mode,
+            "shared_state": settings.shared_state_backend,
+            "search": self.search_stats.snapshot(),
+            "strategies": self.strategy_scheduler.snapshot(),
+            "limiter": self.limiter.stats(),
+            "zpid_cache": self.zpid_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+            "change_detection": self.fingerprints.stats(),
+            "coalescing": self.single_flight.stats(),
+            "parsing": self.parser.stats(),
+            "profiles": self.profile_stats.snapshot(),
+            "credits": self.credit_scheduler.stats(),
+            "api_keys": self.key_pool.stats(),
+        }
+
+    async def _firecrawl_scrape(self, url: str, profile: str, **overrides):
+        # every Firecrawl call goes through the per-API-key rate limit, with the
+        # formats and options of its scrape profile
+        scrape_profile = self.profiles[profile]
+        await self.sync_wait_tuning()
+        params, scale = self.wait_tuner.apply(profile, scrape_profile.params(**overrides))
+        breaker = self.breakers["stealth" if params.get("proxy") == "stealth" else "basic"]
+        trial = breaker.before_call()
+        api_key = self.key_pool.acquire()
+        try:
+            await self.limiter.throttle(api_key)
+        except BaseException:
+            # cancelled while waiting for the rate limit (a hedged search that lost, a
+            # client that went away): hand back the half-open trial and the key
+            breaker.release(trial)
+            self.key_pool.release(api_key)
+            raise
+        mode = "stealth" if params.get("proxy") == "stealth" else "basic"
+        credits = estimate_credits(params)
+        metrics.count_firecrawl_call(profile, mode, credits)
+        meter = current_credit_meter.get()
+        if meter is not None:
+            meter.add(credits)
+
+        with tracing.span("firecrawl.scrape", {
+            "firecrawl.profile": scrape_profile.label,
+            "firecrawl.proxy": mode,
+            "firecrawl.wait_scale": scale,
+            "url.full": url,
+        }) as current:
+            started = time.perf_counter()
+            response = None
+            error = None
+            try:
+                response = await self.transport.scrape_url(url, **self._key_params(api_key), **params)
+                return response
+            except asyncio.CancelledError:
+                # a hedged search that lost says nothing about its profile
+                started = None
+                breaker.release(trial)
+                raise
+            except Exception as e:
+                error = e
+                metrics.count_error("firecrawl", e)
+                raise
+            finally:
+                self.key_pool.release(api_key, getattr(error, "status_code", None))
+                if started is not None:
+                    breaker.record(self._call_succeeded(response), trial)
+                    elapsed = time.perf_counter() - started
+                    payload_bytes = response_payload_bytes(response)
+                    if profile == "property":
+                        metrics.observe_stage(f"scrape_{mode}", elapsed)
+                    self.profile_stats.record(
+                        scrape_profile.label,
+                        elapsed,
+                        payload_bytes,
+                        success=bool(response and response.success)
+                    )
+                    self.wait_tuner.record(profile, scale, self._page_loaded(response), elapsed)
+                    metadata = (response.metadata or {}) if response else {}
+                    tracing.set_attributes(current, {
+                        "firecrawl.success": bool(response and response.success),
+                        "firecrawl.payload_bytes": payload_bytes,
+                        "http.response.status_code": metadata.get("statusCode"),
+                        "firecrawl.final_url": metadata.get("sourceURL"),
+                    })
+
+    def _call_succeeded(self, response) -> bool:
+        # for the proxy-mode breakers: Firecrawl answered and Zillow didn't block or fail
+        if not response or not response.success:
+            return False
+        status_code = (response.metadata or {}).get("statusCode") or 200
+        return status_code not in (401, 403, 429) and status_code < 500
+
+    def _page_loaded(self, response) -> bool:
+        # the scrape got past loading: a usable page, not a block or the untouched homepage
+        if not response or not response.success:
+            return False
+        metadata = response.metadata or {}
+        if (metadata.get("statusCode") or 200) >= 400:
+            return False
+        return not metadata.get("sourceURL", "").rstrip("/").endswith("zillow.com")
     
     # https://docs.firecrawl.dev/features/stealth-mode
-    async def scrape_zillow_property(self, zillow_url: str) -> Dict[str, Any]:
-        # scrape Zillow property with automatic zpid search
-        
-        # check if URL already has zpid
-        if "_zpid" not in zillow_url:
-            self.logger.info(f"URL missing zpid, performing search simulation for: {zillow_url}")
-            address = self._extract_address_from_url(zillow_url)
-            return await self._search_and_scrape_zillow(address)
-        
-        # if URL has zpid, scrape directly
-        return await self._scrape_zillow_direct(zillow_url)
+    async def scrape_zillow_property(self, zillow_url: str, include_raw: bool = False) -> ScrapeResult:
+        # scrape Zillow property with automatic zpid search;
+        # identical requests already in flight share one scrape. With include_raw the
+        # result carries the page markdown, so cached results without it don't answer
+        with metrics.stage("address_normalization"):
+            key = self._coalescing_key(zillow_url)
+        flight_key = f"{key}:raw" if include_raw else key
+        metrics.count_cache("coalescing", "follower" if flight_key in self.single_flight.in_flight else "leader")
+        with tracing.span("zillow.scrape", {"url.full": zillow_url, "zillow.coalescing_key": key}) as current:
+            try:
+                result = await self.single_flight.do(
+                    flight_key, lambda: self._scrape_zillow_property(zillow_url, key, include_raw)
+                )
+            except Exception as e:
+                metrics.count_error("request", e)
+                raise
+            tracing.set_attributes(current, {
+                "zillow.final_url": result.final_url,
+                "zillow.result_cache": result.result_cache,
+                "zillow.zpid_cache": result.zpid_cache,
+            })
+            return result
+
+    async def _scrape_zillow_property(self, zillow_url: str, key: str, include_raw: bool = False) -> ScrapeResult:
+        # retries across this whole request come out of one budget
+        current_retry_budget.set(RetryBudget(settings.firecrawl_retry_budget))
+        # another worker scraping the same property: wait for it, the shared caches then answer
+        async with held_lock(self.shared, key, settings.shared_lock_ttl_seconds, settings.shared_lock_poll_seconds) as waited:
+            if waited:
+                metrics.count_cache("coalescing", "remote_follower")
+            kind = "direct" if "_zpid" in zillow_url else "search"
+            async with self.credit_scheduler.admit(kind), self.limiter.slot():
+                # check if URL already has zpid
+                if "_zpid" not in zillow_url:
+                    address = self._extract_address_from_url(zillow_url)
+                    return await self._resolve_and_scrape_zillow(address, include_raw)
+
+                # if URL has zpid, scrape directly
+                return await self._scrape_zillow_direct(zillow_url, include_raw)
+
+    def _key_params(self, api_key: str) -> Dict[str, str]:
+        # with a single key the transport keeps using the one it was built with
+        return {"api_key": api_key} if len(self.key_pool.keys) > 1 else {}
 
-    async def _search_and_scrape_zillow(self, address: str) -> Dict[str, Any]:
+    def _coalescing_key(self, zillow_url: str) -> str:
+        zpid = extract_zpid(zillow_url)
+        if zpid:
+            return f"zpid:{zpid}"
+        return f"address:{normalize_address(self._extract_address_from_url(zillow_url))}"
+
+    async def _resolve_and_scrape_zillow(self, address: str, include_raw: bool = False) -> ScrapeResult:
+        # use the zpid cache when we've resolved this address before, search otherwise
+        cached = await self.zpid_cache.lookup(address)
+
+        metrics.count_cache("zpid", "negative" if cached and cached.get("not_found") else "hit" if cached else "miss")
+        if cached and cached.get("not_found"):
+            self.logger.info(f"zpid cache: {address} recently not found, skipping search")
+            raise PropertyNotFound(f"Property search failed: address recently not found ({cached.get('reason', 'unknown')})")
+
+        if cached and cached.get("final_url"):
+            self.logger.info(f"zpid cache hit for {address}: {cached['final_url']}")
+            try:
+                result = await self._scrape_zillow_direct(cached["final_url"], include_raw)
+                result.zpid_cache = "hit"
+                return result
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                # the listing moved or vanished; forget it and search again
+                self.logger.warning(f"Cached URL failed for {address}, searching again: {str(e)}")
+                await self.zpid_cache.invalidate(address)
+
+        self.logger.info(f"URL missing zpid, performing search simulation for: {address}")
+        try:
+            result = await self._search_and_scrape_zillow(address, include_raw)
+        except PropertyNotFound as e:
+            # only a search Zillow answered is remembered; outages, timeouts and used-up
+            # retries say nothing about the address and propagate uncached
+            await self.zpid_cache.store_not_found(address, str(e))
+            raise
+
+        final_url = result.final_url or ""
+        if "homedetails" in final_url and "_zpid" in final_url:
+            await self.zpid_cache.store(address, final_url)
+            if settings.result_cache_enabled and result.result_cache is None:
+                # the search landed on the property page itself; keep that parse too
+                await self.result_cache.put(extract_zpid(final_url), result)
+        result.zpid_cache = "miss"
+        return result
+
+    async def _search_and_scrape_zillow(self, address: str, include_raw: bool = False) -> ScrapeResult:
         # use multiple approaches to search for property on Zillow
         
         try:
             self.logger.info(f"Starting comprehensive Zillow search for: {address}")
             
-            # try multiple approaches
-            response = None
-            
-            # approach 1: simulated search with actions
-            self.logger.info("Attempting approach 1: Simulated search with actions")
-            response = await self._attempt_zillow_search_primary(address)
-            
-            if not response or not response.success:
-                self.logger.info("Approach 1 failed, trying approach 2: Fallback selectors")
-                # Approach 2: Fallback selectors
-                response = await self._attempt_zillow_search_fallback(address)
-            
-            if not response or not response.success:
-                self.logger.info("Approach 2 failed, trying approach 3: Direct search URL")
-                # approach 3: Direct search URL
-                response = await self._attempt_zillow_search_direct_url(address)
+            response = await self._run_search_strategies(address)
             
             if not response or not response.success:
                 self.logger.error(f"All search approaches failed for: {address}")
@@ -59,105 +346,251 @@ class ZillowScrapingService:
             if response.markdown:
                 self.logger.info(f"Response contains {len(response.markdown)} characters of markdown")
                 # log first 200 characters
-                self.logger.info(f"Response preview: {response.markdown[:200]}...")
+                self.logger.debug(f"Response preview: {response.markdown[:200]}...")
             
             # if ended up on property page
             if "homedetails" in final_url and "_zpid" in final_url:
                 self.logger.info("Success: Found direct property page")
-                property_data = self._extract_zillow_data(response)
-                return {
-                    "success": True,
-                    "url": final_url,
-                    "final_url": final_url,
-                    "property_data": property_data,
-                    "raw_content": response.markdown or "",
-                    "search_performed": True
-                }
+                return await self._property_result(response, final_url, final_url, search_performed=True)
             
             elif any(keyword in final_url.lower() for keyword in ["homes", "search", "results"]):
                 self.logger.info("Found search results page, extracting property links")
                 # on search results page, try to find the first property link
-                return await self._handle_search_results(response, address)
+                return await self._handle_search_results(response, address, include_raw)
             
             else:
                 # attempt property data extraction
                 self.logger.warning(f"Unexpected final URL: {final_url}, attempting to extract data anyway")
-                property_data = self._extract_zillow_data(response)
+                property_data = await self._extract_zillow_data(response)
                 
                 # if found property data
-                if any(property_data.values()):
-                    return {
-                        "success": True,
-                        "url": final_url,
-                        "final_url": final_url,
-                        "property_data": property_data,
-                        "raw_content": response.markdown or "",
-                        "search_performed": True,
-                        "note": "Data extracted from unexpected page"
-                    }
+                if self._has_property_data(property_data):
+                    return ScrapeResult(
+                        success=True,
+                        url=final_url,
+                        final_url=final_url,
+                        property_data=property_data,
+                        raw=RawContent.from_text(response.markdown),
+                        search_performed=True,
+                        note="Data extracted from unexpected page"
+                    )
+                elif self._page_loaded(response):
+                    # Zillow served a page for the search, with no listing on it
+                    raise PropertyNotFound(f"Property search failed: no listing found. Final URL: {final_url}")
                 else:
                     raise Exception(f"Search did not lead to property data. Final URL: {final_url}")
                 
+        except (CircuitOpenError, PropertyNotFound):
+            raise
         except Exception as e:
             self.logger.error(f"Search and scrape failed for {address}: {str(e)}")
             raise Exception(f"Property search failed: {str(e)}")
     
+    async def _run_search_strategies(self, address: str):
+        # run the configured search mode and record its latency, winner and credits spent
+        mode = self.search_mode
+        meter = CreditMeter(current_credit_meter.get())
+        token = current_credit_meter.set(meter)
+        started = time.perf_counter()
+        response, winner = None, None
+        # every strategy needs the stealth proxy; fail fast instead of three doomed calls
+        if not self.breakers["stealth"].available():
+            raise CircuitOpenError("stealth", self.breakers["stealth"].retry_after())
+        await self._sync_strategies()
+        self._start_probes(address)
+
+        try:
+            if mode == "hedged":
+                response, winner = await self._hedged_search(address)
+            else:
+                response, winner = await self._sequential_search(address)
+            return response
+        finally:
+            current_credit_meter.reset(token)
+            self.search_stats.record_search(
+                mode,
+                time.perf_counter() - started,
+                success=self._landed_on_property(response),
+                meter=meter,
+                winner=winner
+            )
+
+    async def _sequential_search(self, address: str):
+        # try the strategies one after another, in the scheduler's order
+        response = None
+        for name in self.strategy_scheduler.order():
+            self.logger.info(f"Attempting search strategy {name} for {address}")
+            response = await self._timed_strategy(name, address)
+            if response and response.success:
+                return response, name
+            self.logger.info(f"Search strategy {name} failed")
+
+        return response, None
+
+    async def _hedged_search(self, address: str):
+        # start the direct URL search right away (the best-ranked strategy, once they've
+        # all been measured) and the others after search_hedge_delay_seconds (or as soon
+        # as the first gives up); the first response that lands on a property page wins,
+        # the rest are cancelled
+        loop = asyncio.get_running_loop()
+        hedge_at = loop.time() + settings.search_hedge_delay_seconds
+        order = self.strategy_scheduler.order(lead="direct_url")
+        tasks = {asyncio.create_task(self._timed_strategy(order[0], address)): order[0]}
+        launched = len(order) == 1
+        results = {}
+
+        try:
+            while tasks or not launched:
+                if not launched and (not tasks or loop.time() >= hedge_at):
+                    self.logger.info(f"Hedging search for {address} with {', '.join(order[1:])}")
+                    for name in order[1:]:
+                        tasks[asyncio.create_task(self._timed_strategy(name, address))] = name
+                    launched = True
+
+                timeout = None if launched else max(0.0, hedge_at - loop.time())
+                done, _ = await asyncio.wait(tasks.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    name = tasks.pop(task)
+                    results[name] = task.result()
+                    if self._landed_on_property(results[name]):
+                        self.logger.info(f"Hedged search won by {name}")
+                        return results[name], name
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        # nobody reached a property page; keep the scheduler's preference order
+        for name in order:
+            response = results.get(name)
+            if response and response.success:
+                return response, name
+        return None, None
+
+    async def _timed_strategy(self, name: str, address: str):
+        strategies = {
+            "primary": self._attempt_zillow_search_primary,
+            "fallback": self._attempt_zillow_search_fallback,
+            "direct_url": self._attempt_zillow_search_direct_url,
+        }
+        with tracing.span("zillow.search_strategy", {"zillow.strategy": name, "zillow.address": address}) as current:
+            started = time.perf_counter()
+            try:
+                response = await strategies[name](address)
+            except asyncio.CancelledError:
+                # a hedged loser: not a failure, but it took at least this long
+                elapsed = time.perf_counter() - started
+                self.strategy_scheduler.record(name, None, elapsed)
+                await self._share_outcome(name, None, elapsed)
+                raise
+            elapsed = time.perf_counter() - started
+            tracing.set_attributes(current, {
+                "zillow.landed_on_property": self._landed_on_property(response),
+                "zillow.final_url": (response.metadata or {}).get("sourceURL") if response else None,
+            })
+        metrics.observe_stage(f"search_{name}", elapsed)
+        self.search_stats.record_strategy(name, elapsed, self._landed_on_property(response))
+        # for ordering, a strategy is useful if it got off the homepage at all
+        self.strategy_scheduler.record(name, self._page_loaded(response), elapsed)
+        await self._share_outcome(name, self._page_loaded(response), elapsed)
+        return response
+
+    async def _share_outcome(self, name: str, success: Optional[bool], seconds: float):
+        if self.shared is None:
+            return
+        try:
+            await self.shared.push_outcome(name, {"success": success, "seconds": seconds}, settings.strategy_window)
+        except Exception as e:
+            self.logger.warning(f"Could not share outcome of search strategy {name}: {str(e)}")
+
+    async def _sync_strategies(self):
+        # rank from every worker's outcomes, reloaded at most every strategy_sync_seconds
+        if self.shared is None or time.monotonic() - self._strategies_synced < settings.strategy_sync_seconds:
+            return
+        self._strategies_synced = time.monotonic()
+        try:
+            self.strategy_scheduler.load(await self.shared.outcomes(self.strategy_scheduler.strategies))
+        except Exception as e:
+            self.logger.warning(f"Could not load shared search strategy outcomes: {str(e)}")
+
+    async def sync_wait_tuning(self, force: bool = False):
+        # fold this worker's wait outcomes into the shared tuning state and adopt the
+        # result, at most every wait_tuning_sync_seconds; the lock keeps two workers'
+        # read-modify-writes from overwriting each other
+        if self.shared is None or not self.wait_tuner.enabled:
+            return
+        if not force and time.monotonic() - self._wait_tuning_synced < settings.wait_tuning_sync_seconds:
+            return
+        self._wait_tuning_synced = time.monotonic()
+        try:
+            async with held_lock(self.shared, "wait_tuning", settings.shared_lock_ttl_seconds,
+                                 settings.shared_lock_poll_seconds):
+                state = self.wait_tuner.merge(await self.shared.get_document("wait_tuning"))
+                await self.shared.put_document("wait_tuning", state)
+        except Exception as e:
+            self.logger.warning(f"Could not sync wait tuning with the other workers: {str(e)}")
+
+    def _start_probes(self, address: str):
+        # re-try strategies whose breaker is open in the background, so the
+        # request that triggers the probe doesn't wait on a known-bad path
+        for name in self.strategy_scheduler.due_probes():
+            self.logger.info(f"Probing disabled search strategy {name} with {address}")
+            task = asyncio.create_task(self._probe_strategy(name, address))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+
+    async def _probe_strategy(self, name: str, address: str):
+        # credits spent on a probe are not charged to the search that started it
+        current_credit_meter.set(None)
+        try:
+            await self._timed_strategy(name, address)
+        except CircuitOpenError as e:
+            self.logger.info(f"Probe of search strategy {name} skipped: {str(e)}")
+        finally:
+            self.strategy_scheduler.end_probe(name)
+
+    @staticmethod
+    def _has_property_data(property_data: Dict[str, Any]) -> bool:
+        # anything extracted besides where it was extracted from
+        return any(value for key, value in property_data.items() if key != "data_source")
+
+    def _landed_on_property(self, response) -> bool:
+        # a search succeeded if it ended on a homedetails/_zpid page
+        if not response or not response.success or not response.metadata:
+            return False
+        final_url = response.metadata.get("sourceURL", "")
+        return "homedetails" in final_url and "_zpid" in final_url
+
     async def _attempt_zillow_search_primary(self, address: str):
         # primary search method using data-testid selectors with debugging
         try:
             self.logger.info(f"Starting primary search for: {address}")
             
             # use actions to navigate and search with detailed debugging
-            response = self.app.scrape_url(
+            response = await self._firecrawl_scrape(
                 "https://www.zillow.com/",
-                formats=["markdown", "html"],
-                onlyMainContent=False,
-                waitFor=2000,  # reduced from 3000
+                profile="search_primary",
                 actions=[
-                    {
-                        "type": "wait",
-                        "milliseconds": 3000  # reduced from 4000
-                    },
-                    {
-                        "type": "screenshot",
-                        "fullPage": False
-                    },
+                    named_wait("page_load"),
+                    debug_screenshot(),
                     {
                         "type": "click",
                         "selector": "div[data-testid='search-bar-container'] input[type='text']"
                     },
-                    {
-                        "type": "wait",
-                        "milliseconds": 800  # reduced from 1000
-                    },
+                    named_wait("after_click"),
                     {
                         "type": "write", 
                         "text": address
                     },
-                    {
-                        "type": "wait",
-                        "milliseconds": 1500  # reduced from 2000
-                    },
-                    {
-                        "type": "screenshot",
-                        "fullPage": False
-                    },
+                    named_wait("after_typing"),
+                    debug_screenshot(),
                     {
                         "type": "click",
                         "selector": "div[data-testid='search-bar-container'] button[type='submit']"
                     },
-                    {
-                        "type": "wait",
-                        "milliseconds": 6000  # reduced from 8000
-                    },
-                    {
-                        "type": "screenshot",
-                        "fullPage": False
-                    }
-                ],
-                maxAge=0,  # don't cache search results
-                proxy="stealth",
-                timeout=35000  # reduced from 60000 to 35 seconds
+                    named_wait("after_submit"),
+                    debug_screenshot()
+                ]
             )
             
             self.logger.info(f"Primary search response success: {response.success if response else 'No response'}")
@@ -169,6 +602,9 @@ class ZillowScrapingService:
                     self.logger.warning(f"Search failed - still on homepage. This suggests selectors may be wrong or bot detection occurred.")
             
             return response
+        except CircuitOpenError:
+            # the stealth breaker opened mid-search: an outage, not a failed strategy
+            raise
         except Exception as e:
             self.logger.error(f"Primary search method failed: {str(e)}")
             return None
@@ -178,44 +614,27 @@ class ZillowScrapingService:
         try:
             self.logger.info(f"Starting fallback search for: {address}")
             
-            response = self.app.scrape_url(
+            response = await self._firecrawl_scrape(
                 "https://www.zillow.com/",
-                formats=["markdown", "html"],
-                onlyMainContent=True,
-                waitFor=2000,  # reduced from 3000
+                profile="search_fallback",
                 actions=[
-                    {
-                        "type": "wait",
-                        "milliseconds": 3000  # reduced from 4000
-                    },
+                    named_wait("page_load"),
                     {
                         "type": "click",
                         "selector": "input[placeholder*='Enter an address']"
                     },
-                    {
-                        "type": "wait",
-                        "milliseconds": 800  # reduced from 1000
-                    },
+                    named_wait("after_click"),
                     {
                         "type": "write", 
                         "text": address
                     },
-                    {
-                        "type": "wait",
-                        "milliseconds": 1500  # reduced from 2000
-                    },
+                    named_wait("after_typing"),
                     {
                         "type": "press",
                         "key": "Enter"  # Enter instead of clicking submit
                     },
-                    {
-                        "type": "wait",
-                        "milliseconds": 6000  # reduced from 8000
-                    }
-                ],
-                maxAge=0,
-                proxy="stealth",
-                timeout=30000  # added explicit timeout
+                    named_wait("after_submit")
+                ]
             )
             
             self.logger.info(f"Fallback search response success: {response.success if response else 'No response'}")
@@ -223,6 +642,8 @@ class ZillowScrapingService:
                 self.logger.info(f"Fallback search final URL: {response.metadata.get('sourceURL', 'No URL')}")
             
             return response
+        except CircuitOpenError:
+            raise
         except Exception as e:
             self.logger.error(f"Fallback search method failed: {str(e)}")
             return None
@@ -238,167 +659,368 @@ class ZillowScrapingService:
             
             self.logger.info(f"Trying direct search URL: {search_url}")
             
-            response = self.app.scrape_url(
-                search_url,
-                formats=["markdown", "html"],
-                onlyMainContent=True,
-                waitFor=3000,  # reduced from 5000
-                maxAge=0,
-                proxy="stealth",
-                timeout=25000  # added explicit timeout
-            )
+            response = await self._firecrawl_scrape(search_url, profile="search_direct_url")
             
             self.logger.info(f"Direct URL search response success: {response.success if response else 'No response'}")
             if response and response.metadata:
                 self.logger.info(f"Direct URL search final URL: {response.metadata.get('sourceURL', 'No URL')}")
             
             return response
+        except CircuitOpenError:
+            raise
         except Exception as e:
             self.logger.error(f"Direct URL search method failed: {str(e)}")
             return None
 
-    async def _handle_search_results(self, search_response, address: str) -> Dict[str, Any]:
+    async def _handle_search_results(self, search_response, address: str, include_raw: bool = False) -> ScrapeResult:
         # handle case where search leads to results page instead of direct property page
         
         try:
-            # extract the first property link from search results
-            html_content = search_response.html or ""
             markdown_content = search_response.markdown or ""
-            
-            # look for property links in the HTML
-            import re
-            property_link_pattern = r'href="([^"]*homedetails[^"]*_zpid[^"]*)"'
-            matches = re.findall(property_link_pattern, html_content)
-            
-            if not matches:
-                # try alternative pattern
-                property_link_pattern = r'"(\/homedetails\/[^"]*_zpid[^"]*)"'
-                matches = re.findall(property_link_pattern, html_content)
-            
-            self.logger.info(f"Found {len(matches)} property links in search results")
-            
-            if matches:
-                # get the first property link and make it absolute
-                first_property_url = matches[0]
-                if first_property_url.startswith('/'):
-                    first_property_url = f"https://www.zillow.com{first_property_url}"
-                
-                self.logger.info(f"Found property URL in search results: {first_property_url}")
-                
+
+            # every listing on the page; the ones we don't follow still seed the zpid cache
+            cards = await self._harvest_search_results(search_response)
+
+            self.logger.info(f"Found {len(cards)} property links in search results")
+
+            if cards:
+                # the listing whose address is the one searched for, else the first
+                wanted = normalize_address(address)
+                card = next((card for card in cards if card["address"] and normalize_address(card["address"]) == wanted), cards[0])
+
+                self.logger.info(f"Found property URL in search results: {card['url']}")
+
                 # scrape this specific property page
-                return await self._scrape_zillow_direct(first_property_url)
+                return await self._scrape_zillow_direct(card["url"], include_raw)
             
             else:
                 # try to extract property data directly from search results
                 self.logger.warning("No property links found, extracting from search results page")
-                property_data = self._extract_zillow_data(search_response)
+                property_data = await self._extract_zillow_data(search_response)
+                if not self._has_property_data(property_data) and self._page_loaded(search_response):
+                    # a results page with no listings: Zillow has nothing for the address
+                    raise PropertyNotFound("Property search failed: no listing found on the search results page")
                 
-                return {
-                    "success": True,
-                    "url": search_response.metadata.get("sourceURL", ""),
-                    "final_url": search_response.metadata.get("sourceURL", ""),
-                    "property_data": property_data,
-                    "raw_content": markdown_content,
-                    "search_performed": True,
-                    "note": "Data extracted from search results page"
-                }
+                return ScrapeResult(
+                    success=True,
+                    url=search_response.metadata.get("sourceURL", ""),
+                    final_url=search_response.metadata.get("sourceURL", ""),
+                    property_data=property_data,
+                    raw=RawContent.from_text(markdown_content),
+                    search_performed=True,
+                    note="Data extracted from search results page"
+                )
                 
+        except (CircuitOpenError, PropertyNotFound):
+            raise
         except Exception as e:
             self.logger.error(f"Failed to handle search results: {str(e)}")
             raise Exception(f"Could not process search results: {str(e)}")
 
-    async def _scrape_zillow_direct(self, zillow_url: str) -> Dict[str, Any]:
-        # directly scrape a Zillow property URL (with zpid)
-        
+    async def _harvest_search_results(self, search_response) -> List[Dict[str, Any]]:
+        # the listing cards on a results page (zpid, url, address, price, beds, baths),
+        # each stored in the zpid cache so later requests for them skip the search
+        html = search_response.html or ""
+        markdown = search_response.markdown or ""
+        with metrics.stage("extraction"):
+            cards = await self.parser.run(extract_search_cards, markdown, html, size=len(markdown) + len(html))
+        for card in cards:
+            if card["address"]:
+                await self.zpid_cache.store(card["address"], card["url"])
+                metrics.count_cache("zpid", "seeded")
+        return cards
+
+    async def scrape_zillow_search_page(self, search_url: str) -> Dict[str, Any]:
+        # one Firecrawl call for a whole results page (a ZIP, neighborhood or city, one
+        # page of it): every listing card on it, with the zpid cache seeded from them
+        meter = CreditMeter(current_credit_meter.get())
+        token = current_credit_meter.set(meter)
+        current_retry_budget.set(RetryBudget(settings.firecrawl_retry_budget))
         try:
-            # first try with basic scraping
-            self.logger.info(f"Attempting direct scraping for: {zillow_url}")
-            response = self.app.scrape_url(
-                zillow_url,
-                formats=["markdown", "html"],
-                onlyMainContent=True,
-                waitFor=2000,
-                maxAge=604800000  # 1 week cache
-            )
+            async with self.credit_scheduler.admit("search_page"), self.limiter.slot():
+                response = await self._firecrawl_scrape(search_url, profile="search_direct_url")
+        finally:
+            current_credit_meter.reset(token)
+
+        if not self._page_loaded(response):
+            status = (response.metadata or {}).get("statusCode") if response else None
+            raise Exception(f"Search results page did not load: {search_url} (status {status})")
+
+        cards = await self._harvest_search_results(response)
+        self.logger.info(f"Harvested {len(cards)} listings from {search_url}")
+        return {
+            "url": (response.metadata or {}).get("sourceURL") or search_url,
+            "listings": cards,
+            "credits": meter.credits,
+        }
+
+    async def crawl_zillow_area(self, location: str, max_pages: Optional[int] = None, details: bool = False,
+                                max_details: Optional[int] = None) -> Dict[str, Any]:
+        # every listing in a ZIP, neighborhood or city: results pages until one adds
+        # nothing new, plus the listing links Firecrawl's map knows for the area, deduped
+        # by zpid and compared with the area's index. With details, only listings that
+        # are new or changed since their last scrape get their property page scraped.
+        now = time.time()
+        cards: Dict[str, Dict[str, Any]] = {}
+        credits, pages, complete = 0, 0, False
+        for page in range(1, (max_pages or settings.area_max_pages) + 1):
+            try:
+                result = await self.scrape_zillow_search_page(build_zillow_results_url(location, page))
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if page == 1:
+                    raise
+                self.logger.warning(f"Area crawl for {location} stopped at page {page}: {str(e)}")
+                break
+            pages += 1
+            credits += result["credits"]
+            added = [card for card in result["listings"] if card["zpid"] not in cards]
+            for card in added:
+                cards[card["zpid"]] = card
+            if not added:
+                # past its last page Zillow serves the last page again
+                complete = True
+                break
 
-            # check if the response was successful
-            if not response.success:
-                self.logger.info(f"Basic scraping failed, retrying with stealth proxy. Error: {getattr(response, 'error', 'Unknown error')}")
-                # retry with stealth proxy
-                response = self.app.scrape_url(
-                    zillow_url,
-                    formats=["markdown", "html"],
-                    onlyMainContent=True,
-                    waitFor=2000,
-                    proxy="stealth",
-                    maxAge=604800000  # 1 week cache
+        if settings.area_map_enabled:
+            links, map_credits = await self._map_area_links(location)
+            credits += map_credits
+            for url in links:
+                card = listing_card(url)
+                if card["zpid"] and card["zpid"] not in cards:
+                    cards[card["zpid"]] = card
+
+        listings = list(cards.values())
+        index = await self.area_index.load(location)
+        entries = classify(listings, index, now)
+        unseen = [zpid for zpid in index if zpid not in entries]
+        removed = unseen if complete else []
+        if not complete:
+            # a partial crawl can't tell delisted from not reached yet; keep them
+            entries.update({zpid: index[zpid] for zpid in unseen})
+
+        crawl = {
+            "area": location,
+            "pages": pages,
+            "complete": complete,
+            "listings": listings,
+            "removed": removed,
+            "credits": credits,
+        }
+        if details:
+            targets = [card for card in listings if needs_scrape(entries[card["zpid"]])]
+            if max_details is not None:
+                targets = targets[:max_details]
+            meter = CreditMeter(current_credit_meter.get())
+            token = current_credit_meter.set(meter)
+            try:
+                crawl["details"] = await asyncio.gather(
+                    *[self._scrape_area_listing(card, entries[card["zpid"]]) for card in targets]
                 )
-                
-                if not response.success:
-                    raise Exception(f"Stealth scraping also failed: {getattr(response, 'error', 'Unknown error')}")
-             
-            # check status code in metadata if available
-            status_code = response.metadata.get("statusCode") if response.metadata else None
-            if status_code in [401, 403, 500]:
-                self.logger.info(f"Got status code {status_code}, retrying with stealth proxy")
-                # Retry with stealth proxy
-                response = self.app.scrape_url(
-                    zillow_url,
-                    formats=["markdown", "html"], 
-                    onlyMainContent=True,
-                    waitFor=2000,
-                    proxy="stealth",
-                    maxAge=604800000  # 1 week
+            finally:
+                current_credit_meter.reset(token)
+            crawl["detail_credits"] = meter.credits
+
+        await self.area_index.save(location, entries)
+        self.logger.info(f"Area crawl for {location}: {len(listings)} listings over {pages} pages, {len(removed)} removed")
+        return crawl
+
+    async def _map_area_links(self, location: str):
+        # homedetails links Firecrawl's /v1/map knows for the area (1 credit, no page
+        # fetches), for listings the results pages didn't reach; failures only log
+        try:
+            async with self.credit_scheduler.admit("map"):
+                return await self._map_links(location)
+        except CreditLimitError as e:
+            self.logger.warning(f"Skipping map for {location}: {str(e)}")
+            return [], 0
+
+    async def _map_links(self, location: str):
+        breaker = self.breakers["basic"]
+        try:
+            trial = breaker.before_call()
+        except CircuitOpenError as e:
+            self.logger.warning(f"Skipping map for {location}: {str(e)}")
+            return [], 0
+        api_key = self.key_pool.acquire()
+        error = None
+        try:
+            await self.limiter.throttle(api_key)
+            metrics.count_firecrawl_call("area_map", "basic", 1)
+            meter = current_credit_meter.get()
+            if meter is not None:
+                meter.add(1)
+            with tracing.span("firecrawl.map", {"url.full": build_zillow_results_url(location)}):
+                response = await self.transport.map_url(
+                    "https://www.zillow.com", search=location, limit=settings.area_map_limit,
+                    **self._key_params(api_key)
                 )
-                
-                if not response.success:
-                    raise Exception(f"Stealth retry failed: {getattr(response, 'error', 'Unknown error')}")
-            
-            # Extract property data from the scraped content
-            property_data = self._extract_zillow_data(response)
-            final_url = response.metadata.get("sourceURL", zillow_url) if response.metadata else zillow_url
-
-            return {
-                "success": True,
-                "url": zillow_url,
-                "final_url": final_url,
-                "property_data": property_data,
-                "raw_content": response.markdown or ""
-            }
-            
+        except asyncio.CancelledError:
+            breaker.release(trial)
+            raise
         except Exception as e:
-            self.logger.error(f"Direct scraping failed for {zillow_url}: {str(e)}")
-            
-            # Fallback to stealth proxy on any exception
+            error = e
+            breaker.record(False, trial)
+            metrics.count_error("firecrawl", e)
+            self.logger.warning(f"Map failed for {location}: {str(e)}")
+            return [], 1
+        finally:
+            self.key_pool.release(api_key, getattr(error, "status_code", None))
+        breaker.record(bool(response.success), trial)
+        links = [url for url in response.links or [] if "_zpid" in url and in_area(url, location)]
+        return links, 1
+
+    async def _scrape_area_listing(self, card: Dict[str, Any], entry: Dict[str, Any]) -> Dict[str, Any]:
+        # one listing's property page for an area crawl, never raising; a card that
+        # changed since the last scrape means the cached page is out of date too
+        if entry.get("scraped_at") is not None or card.get("change") == "changed":
+            await self.result_cache.invalidate(card["zpid"])
+        try:
+            result = await self.scrape_zillow_property(card["url"])
+        except Exception as e:
+            self.logger.error(f"Area listing scrape failed for {card['url']}: {str(e)}")
+            return {"success": False, "status": "error", "zpid": card["zpid"], "url": card["url"], "error": str(e)}
+
+        if result.success:
+            entry["scraped_hash"] = entry["hash"]
+            entry["scraped_at"] = time.time()
+        return {
+            "success": result.success,
+            "status": "ok" if result.success else "failed",
+            "zpid": card["zpid"],
+            "url": result.final_url or card["url"],
+            "property_data": result.property_data,
+        }
+
+    async def _scrape_zillow_direct(self, zillow_url: str, include_raw: bool = False) -> ScrapeResult:
+        # serve a property page from the local result cache when we can
+        zpid = extract_zpid(zillow_url)
+        if zpid is None or not settings.result_cache_enabled:
+            return await self._fetch_zillow_direct(zillow_url)
+
+        cached = await self.result_cache.get(zpid, need_raw=include_raw)
+        metrics.count_cache("result", "miss" if cached is None else "fresh" if cached["fresh"] else "stale")
+        if cached is not None:
+            result = cached["result"]
+            if cached["fresh"]:
+                result.result_cache = "fresh"
+            else:
+                # stale-while-revalidate: answer now, refresh behind the response
+                result.result_cache = "stale"
+                self._schedule_refresh(zpid, zillow_url)
+            return result
+
+        result = await self._fetch_zillow_direct(zillow_url)
+        await self.result_cache.put(zpid, result)
+        result.result_cache = "miss"
+        return result
+
+    def _schedule_refresh(self, zpid: str, zillow_url: str):
+        # at most one background refresh per zpid at a time
+        if zpid in self._refreshing:
+            return
+
+        async def refresh():
+            current_retry_budget.set(RetryBudget(settings.firecrawl_retry_budget))
             try:
-                self.logger.info("Retrying with stealth proxy")
-                response = self.app.scrape_url(
-                    zillow_url,
-                    formats=["markdown", "html"],
-                    onlyMainContent=True,
-                    waitFor=2000,
-                    proxy="stealth",
-                    maxAge=604800000
-                )
-                
-                if not response.success:
-                    raise Exception(f"Stealth fallback failed: {getattr(response, 'error', 'Unknown error')}")
-                
-                property_data = self._extract_zillow_data(response)
-                final_url = response.metadata.get("sourceURL", zillow_url) if response.metadata else zillow_url
-
-                return {
-                    "success": True,
-                    "url": zillow_url,
-                    "final_url": final_url,
-                    "property_data": property_data,
-                    "raw_content": response.markdown or ""
-                }
-                
-            except Exception as stealth_error:
-                self.logger.error(f"Stealth proxy also failed: {str(stealth_error)}")
-                raise Exception(f"Both basic and stealth scraping failed: {str(stealth_error)}")
-    
+                await self.result_cache.put(zpid, await self._fetch_zillow_direct(zillow_url))
+                self.logger.info(f"Refreshed cached result for zpid {zpid}")
+            except Exception as e:
+                self.logger.warning(f"Background refresh failed for zpid {zpid}: {str(e)}")
+            finally:
+                self._refreshing.pop(zpid, None)
+
+        self._refreshing[zpid] = asyncio.create_task(refresh())
+
+    async def _fetch_zillow_direct(self, zillow_url: str) -> ScrapeResult:
+        # directly scrape a Zillow property URL (with zpid): basic first, then the stealth
+        # proxy when basic fails, is blocked (401/403/500) or its breaker is open; further
+        # stealth retries come out of the request's retry budget and back off with jitter
+        budget = current_retry_budget.get() or RetryBudget(settings.firecrawl_retry_budget)
+        use_stealth = not self.breakers["basic"].available()
+        retries = 0
+        last_error = "Unknown error"
+
+        while True:
+            mode = "stealth" if use_stealth else "basic"
+            try:
+                self.logger.info(f"Attempting {mode} scraping for: {zillow_url}")
+                if use_stealth:
+                    response = await self._firecrawl_scrape(zillow_url, profile="property", proxy="stealth")
+                else:
+                    response = await self._firecrawl_scrape(zillow_url, profile="property")
+
+                status_code = response.metadata.get("statusCode") if response.metadata else None
+                if response.success and status_code not in [401, 403, 500]:
+                    # Extract property data from the scraped content
+                    final_url = response.metadata.get("sourceURL", zillow_url) if response.metadata else zillow_url
+                    return await self._property_result(response, zillow_url, final_url)
+
+                last_error = getattr(response, "error", None) or f"status code {status_code}"
+                self.logger.info(f"{mode.capitalize()} scraping failed for {zillow_url}: {last_error}")
+
+            except CircuitOpenError as e:
+                # stealth is known to be down: fail fast instead of queueing behind it
+                if use_stealth:
+                    raise
+                last_error = str(e)
+            except Exception as e:
+                last_error = str(e)
+                self.logger.error(f"{mode.capitalize()} scraping failed for {zillow_url}: {last_error}")
+
+            if not use_stealth:
+                # switching from basic to stealth is the normal path, not a retry
+                use_stealth = True
+                metrics.count_retry("stealth_fallback")
+                continue
+
+            if not budget.spend():
+                raise Exception(f"Both basic and stealth scraping failed: {last_error}")
+            retries += 1
+            metrics.count_retry("stealth_retry")
+            delay = backoff_delay(retries, settings.retry_backoff_base_seconds, settings.retry_backoff_max_seconds)
+            self.logger.info(f"Retrying stealth scraping for {zillow_url} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _property_result(self, response, url: str, final_url: str, **fields) -> ScrapeResult:
+        # a property page into a result; with change detection on, a page whose listing
+        # sections fingerprint the same as last time reuses the data parsed from it then
+        markdown = response.markdown or ""
+        zpid = extract_zpid(final_url) or extract_zpid(url)
+        fingerprint, previous = None, None
+        if settings.change_detection_enabled and zpid:
+            with metrics.stage("fingerprint"):
+                fingerprint = page_fingerprint(markdown)
+            previous = await self.fingerprints.lookup(zpid, fingerprint)
+
+        if previous is not None and previous["hash"] == fingerprint:
+            metrics.count_cache("fingerprint", "unchanged")
+            property_data = previous["property_data"]
+        else:
+            property_data = await self._extract_zillow_data(response)
+            if fingerprint is not None:
+                metrics.count_cache("fingerprint", "changed" if previous else "new")
+                await self.fingerprints.record(zpid, fingerprint, property_data, previous)
+
+        return ScrapeResult(
+            success=True,
+            url=url,
+            final_url=final_url,
+            property_data=property_data,
+            raw=RawContent.from_text(markdown),
+            fingerprint=fingerprint,
+            content_changed=None if fingerprint is None else previous is None or previous["hash"] != fingerprint,
+            **fields
+        )
+
+    async def describe_changes(self, result: ScrapeResult, since: Optional[str] = None) -> Dict[str, Any]:
+        # "diff" mode: the fields that changed since the `since` fingerprint (by default
+        # the version stored before this request), or everything when that one is unknown
+        zpid = extract_zpid(result.final_url or "") or extract_zpid(result.url or "")
+        entry = await self.fingerprints.get(zpid) if zpid and result.fingerprint else None
+        return describe_changes(result.fingerprint, entry, since, result.property_data, result.content_changed)
+
     def _extract_address_from_url(self, url: str) -> str:
         # Extract address from constructed Zillow URL for search
         import re
@@ -429,71 +1051,15 @@ class ZillowScrapingService:
         # If no match, assume it's already a properly formatted address
         return url.replace('https://www.zillow.com/homedetails/', '').replace('/', '')
     
-    def _extract_zillow_data(self, response) -> Dict[str, Any]:
-        # Extract structured data from FireCrawl response
+    async def _extract_zillow_data(self, response) -> Dict[str, Any]:
+        # Extract structured data from FireCrawl response, preferring the page's embedded JSON;
+        # large pages are parsed on the parse executor instead of the event loop
         markdown = response.markdown or ""
-        metadata = response.metadata or {}
-        
-        return {
-            "address": metadata.get("title", "").replace(" | Zillow", ""),
-            "price": self._extract_price(markdown),
-            "bedrooms": self._extract_bedrooms(markdown),
-            "bathrooms": self._extract_bathrooms(markdown),
-            "square_feet": self._extract_square_feet(markdown),
-            "lot_size": self._extract_lot_size(markdown),
-            "year_built": self._extract_year_built(markdown),
-            "property_type": self._extract_property_type(markdown),
-            "description": metadata.get("description", ""),
-            "images": metadata.get("ogImage", [])
-        }
-    
-    def _extract_price(self, markdown: str) -> Optional[str]:
-        # Extract property price from markdown content
-        import re
-        price_pattern = r'\$[\d,]+(?:\.\d{2})?'
-        match = re.search(price_pattern, markdown)
-        return match.group(0) if match else None
-    
-    def _extract_bedrooms(self, markdown: str) -> Optional[int]:
-        # Extract bedroom count
-        import re
-        bed_pattern = r'(\d+)\s*(?:bd|bed|bedroom)'
-        match = re.search(bed_pattern, markdown.lower())
-        return int(match.group(1)) if match else None
-    
-    def _extract_bathrooms(self, markdown: str) -> Optional[float]:
-        # Extract bathroom count
-        import re
-        bath_pattern = r'(\d+(?:\.\d+)?)\s*(?:ba|bath|bathroom)'
-        match = re.search(bath_pattern, markdown.lower())
-        return float(match.group(1)) if match else None
-    
-    def _extract_square_feet(self, markdown: str) -> Optional[int]:
-        # Extract square footage
-        import re
-        sqft_pattern = r'([\d,]+)\s*(?:sq ft|sqft|square feet)'
-        match = re.search(sqft_pattern, markdown.lower())
-        return int(match.group(1).replace(',', '')) if match else None
-    
-    def _extract_lot_size(self, markdown: str) -> Optional[str]:
-        # Extract lot size
-        import re
-        lot_pattern = r'([\d,.]+)\s*(?:acres?|sq ft lot)'
-        match = re.search(lot_pattern, markdown.lower())
-        return match.group(0) if match else None
-    
-    def _extract_year_built(self, markdown: str) -> Optional[int]:
-        # Extract year built
-        import re
-        year_pattern = r'(?:built|year built).*?(\d{4})'
-        match = re.search(year_pattern, markdown.lower())
-        return int(match.group(1)) if match else None
-    
-    def _extract_property_type(self, markdown: str) -> Optional[str]:
-        # Extract property type
-        types = ['single family', 'condo', 'townhouse', 'multi-family', 'land', 'mobile']
-        markdown_lower = markdown.lower()
-        for prop_type in types:
-            if prop_type in markdown_lower:
-                return prop_type.title()
-        return None
\ No newline at end of file
+        html = None
+        if settings.structured_extraction:
+            html = getattr(response, "rawHtml", None) or response.html
+        size = len(markdown) + len(html or "")
+        with metrics.stage("extraction"), tracing.span("zillow.extract", {"zillow.page_bytes": size}) as current:
+            property_data = await self.parser.run(extract_property_fields, markdown, response.metadata or {}, html, size=size)
+            tracing.set_attributes(current, {"zillow.data_source": property_data.get("data_source")})
+            return property_data
@@ -0,0 +1,325 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from services import metrics
+from services.credits import current_priority
+
+logger = logging.getLogger(__name__)
+
+# Bulk ingestion: stream a CSV/JSONL file of property rows through the scraper and
+# write one output record per row.
+# Memory stays flat: rows are read lazily, at most `concurrency` are in flight, and
+# output is written as it completes. Progress goes to <output>.checkpoint.json after
+# every `checkpoint_every` rows, together with the committed size of the output, so
+# a resumed run truncates anything written after the last checkpoint and skips every
+# row the checkpoint already covers; each row ends up in the output exactly once.
+# Rows run at `priority` with the credit scheduler; a row it throttles ("throttled"
+# record with retry_after) waits at least a second and is tried again, up to
+# `throttle_retries` times, before it is written out as failed.
+
+
+def iter_rows(path: str) -> Iterator[Tuple[int, Any]]:
+    # (row number, row dict) from a .csv (header row) or .jsonl/.ndjson file; a
+    # JSONL line that doesn't parse is yielded as the exception so it's reported
+    # against its row instead of stopping the run
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="") as f:
+        if extension == ".csv":
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, row
+        elif extension in (".jsonl", ".ndjson"):
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield index, json.loads(line)
+                except ValueError as e:
+                    yield index, e
+                index += 1
+        else:
+            raise ValueError(
+                f"Unsupported input file: {path} (expected .csv, .jsonl or .ndjson)"
+            )
+
+
+class JsonlSink:
+    # appends one JSON line per record; commit() makes everything written so far durable
+
+    def __init__(self, path: str, committed_bytes: int = 0):
+        self.path = path
+        self.file = open(path, "a+b")
+        # drop records written after the last checkpoint, they will be scraped again
+        self.file.truncate(committed_bytes)
+        self.file.seek(committed_bytes)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(record, default=str).encode() + b"\n")
+
+    def commit(self) -> Dict[str, Any]:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"output_bytes": self.file.tell()}
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetSink:
+    # writes the rows of each checkpoint interval as one part file in the output
+    # directory; rows buffered since the last commit are simply lost on a crash
+
+    COLUMNS = [
+        "row",
+        "status",
+        "success",
+        "address",
+        "url",
+        "property_data",
+        "error",
+        "elapsed_seconds",
+    ]
+
+    def __init__(self, path: str, committed_parts: int = 0):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "Parquet output needs the pyarrow package: pip install pyarrow"
+            )
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.path = path
+        self.parts = committed_parts
+        self.buffer: List[Dict[str, Any]] = []
+        os.makedirs(path, exist_ok=True)
+        # part files past the checkpoint belong to rows that will be scraped again
+        for name in os.listdir(path):
+            if (
+                name.startswith("part-")
+                and name.endswith(".parquet")
+                and int(name[5:10]) >= committed_parts
+            ):
+                os.remove(os.path.join(path, name))
+
+    def write(self, record: Dict[str, Any]) -> None:
+        row = {column: record.get(column) for column in self.COLUMNS}
+        # property_data varies by source (tax_history is a list), keep it as a JSON string
+        row["property_data"] = (
+            json.dumps(record["property_data"], default=str)
+            if record.get("property_data")
+            else None
+        )
+        self.buffer.append(row)
+
+    def commit(self) -> Dict[str, Any]:
+        if self.buffer:
+            table = self.pyarrow.Table.from_pylist(self.buffer)
+            self.parquet.write_table(
+                table, os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            )
+            self.parts += 1
+            self.buffer = []
+        return {"output_parts": self.parts}
+
+    def close(self) -> None:
+        pass
+
+
+def checkpoint_path(output_path: str) -> str:
+    return output_path.rstrip("/") + ".checkpoint.json"
+
+
+def load_checkpoint(output_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(checkpoint_path(output_path)) as f:
+            checkpoint: Dict[str, Any] = json.load(f)
+            return checkpoint
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(output_path: str, checkpoint: Dict[str, Any]) -> None:
+    # write-then-rename so a crash mid-write never leaves a torn checkpoint
+    path = checkpoint_path(output_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class IngestRun:
+    # one input file -> one output (JSONL file or Parquet directory), resumable
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        scrape_row: Callable[[Any], Awaitable[Dict[str, Any]]],
+        concurrency: int = 10,
+        checkpoint_every: int = 100,
+        priority: int = 0,
+        throttle_retries: int = 20,
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        # scrape_row must not raise: failures come back as records with an error
+        self.scrape_row = scrape_row
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.priority = priority
+        self.throttle_retries = throttle_retries
+        self.parquet = output_path.rstrip("/").endswith(".parquet")
+
+        checkpoint = load_checkpoint(output_path) or {}
+        if checkpoint and checkpoint.get("input") != os.path.abspath(input_path):
+            raise ValueError(
+                f"{output_path} was written from {checkpoint.get('input')}, not {input_path}"
+            )
+        # every row below next_row is in the output, plus the ones in done_rows
+        self.next_row: int = checkpoint.get("next_row", 0)
+        self.done_rows: Set[int] = set(checkpoint.get("done_rows", []))
+        self.succeeded: int = checkpoint.get("succeeded", 0)
+        self.failed: int = checkpoint.get("failed", 0)
+        self.output_state: Dict[str, Any] = {
+            key: checkpoint[key]
+            for key in ("output_bytes", "output_parts")
+            if key in checkpoint
+        }
+        self.resumed_from = self.next_row + len(self.done_rows)
+        self.pending_rows: Set[int] = set()
+        self.in_flight: Set[int] = set()
+        self.finished = checkpoint.get("finished", False)
+        self.started_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+
+    async def run(self) -> Dict[str, Any]:
+        if self.finished:
+            return self.progress()
+
+        self.started_at = time.time()
+        metrics.current_endpoint.set("ingest")
+        current_priority.set(self.priority)
+        sink: Union[JsonlSink, ParquetSink]
+        if self.parquet:
+            sink = ParquetSink(
+                self.output_path, self.output_state.get("output_parts", 0)
+            )
+        else:
+            sink = JsonlSink(self.output_path, self.output_state.get("output_bytes", 0))
+        if self.resumed_from:
+            logger.info(
+                f"Resuming {self.input_path} after {self.resumed_from} finished rows"
+            )
+
+        rows = iter_rows(self.input_path)
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while True:
+                # top up to `concurrency` rows in flight, reading the input lazily
+                for index, row in rows:
+                    if index < self.next_row or index in self.done_rows:
+                        continue
+                    self.in_flight.add(index)
+                    tasks.add(asyncio.create_task(self._scrape(index, row)))
+                    if len(tasks) >= self.concurrency:
+                        break
+                if not tasks:
+                    break
+
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index, record = task.result()
+                    sink.write(record)
+                    self.in_flight.discard(index)
+                    self.pending_rows.add(index)
+                    if record.get("success"):
+                        self.succeeded += 1
+                    else:
+                        self.failed += 1
+
+                if len(self.pending_rows) >= self.checkpoint_every:
+                    self._commit(sink)
+
+            self.finished = True
+            self._commit(sink)
+        finally:
+            self.ended_at = time.time()
+            for task in tasks:
+                task.cancel()
+            sink.close()
+
+        logger.info(
+            f"Ingested {self.input_path}: {self.succeeded} succeeded, {self.failed} failed"
+        )
+        return self.progress()
+
+    async def _scrape(self, index: int, row: Any) -> Tuple[int, Dict[str, Any]]:
+        record = await self.scrape_row(row)
+        for _ in range(self.throttle_retries):
+            if record.get("status") != "throttled":
+                break
+            await asyncio.sleep(max(record["retry_after"], 1.0))
+            record = await self.scrape_row(row)
+        return index, {"row": index, **record}
+
+    def _commit(self, sink: Union[JsonlSink, ParquetSink]) -> None:
+        self.output_state = sink.commit()
+        self.done_rows |= self.pending_rows
+        self.pending_rows = set()
+        # advance the watermark so done_rows only holds rows finished out of order
+        while self.next_row in self.done_rows:
+            self.done_rows.discard(self.next_row)
+            self.next_row += 1
+
+        _save_checkpoint(
+            self.output_path,
+            {
+                "input": os.path.abspath(self.input_path),
+                "next_row": self.next_row,
+                "done_rows": sorted(self.done_rows),
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "finished": self.finished,
+                "updated_at": time.time(),
+                **self.output_state,
+            },
+        )
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "input": self.input_path,
+            "output": self.output_path,
+            "finished": self.finished,
+            "rows_done": self.next_row + len(self.done_rows) + len(self.pending_rows),
+            "rows_checkpointed": self.next_row + len(self.done_rows),
+            "resumed_from": self.resumed_from,
+            "in_flight": len(self.in_flight),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": (
+                round((self.ended_at or time.time()) - self.started_at, 3)
+                if self.started_at
+                else None
+            ),
+        }
@@ -0,0 +1,394 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, cast
+from urllib.parse import SplitResult, urlsplit
+
+import httpx
+
+from services import metrics
+from services.credits import (
+    CreditLimitError,
+    DEFAULT_TENANT,
+    current_priority,
+    current_tenant,
+)
+
+if TYPE_CHECKING:
+    from services.firecrawl import ZillowScrapingService
+
+logger = logging.getLogger(__name__)
+
+# Persistent scrape job queue.
+# A job is claimed by setting a lease (lease_token + lease_expires_at); if the worker
+# holding it dies, the lease runs out and the job becomes claimable again, so jobs are
+# delivered at least once. Failed jobs are retried with exponential backoff until
+# max_attempts, higher priority runs first, ties go to the oldest job. A job the
+# credit scheduler defers (low priority, budget running low) goes back in the queue
+# without using up an attempt. A job whose lease runs out after its last attempt
+# (the worker died mid-scrape every time) is marked failed instead of leased again.
+# The queue's methods block (claim waits up to 30s for another process's write lock),
+# so async code calls them through asyncio.to_thread; one connection is shared by
+# those threads, a lock keeps its transactions apart.
+
+
+class SQLiteJobQueue:
+    # WAL-mode SQLite file, safe to share between gunicorn workers on one host
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, payload TEXT NOT NULL, priority INTEGER NOT NULL,"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL,"
+            " available_at REAL NOT NULL, lease_token TEXT, lease_expires_at REAL,"
+            " webhook_url TEXT, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, available_at)"
+        )
+
+    def enqueue(
+        self,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        max_attempts: int = 3,
+        webhook_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        with self.lock:
+            now = time.time()
+            job_id = uuid.uuid4().hex
+            self.conn.execute(
+                "INSERT INTO jobs (id, payload, priority, status, attempts, max_attempts, available_at,"
+                " webhook_url, created_at, updated_at) VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    json.dumps(payload),
+                    priority,
+                    max_attempts,
+                    now,
+                    webhook_url,
+                    now,
+                    now,
+                ),
+            )
+            return cast(Dict[str, Any], self.get(job_id))
+
+    def claim(self, visibility_timeout: float) -> Optional[Dict[str, Any]]:
+        # take the next ready job, or one whose lease has expired; BEGIN IMMEDIATE
+        # holds the write lock so two workers can't claim the same job. An expired
+        # job with no attempts left comes back as "failed" rather than leased
+        with self.lock:
+            now = time.time()
+            token = uuid.uuid4().hex
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id, status, attempts, max_attempts FROM jobs WHERE (status = 'queued' AND available_at <= ?)"
+                    " OR (status = 'running' AND lease_expires_at < ?)"
+                    " ORDER BY priority DESC, available_at, created_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                job = dict(row)
+                if (
+                    job["status"] == "running"
+                    and job["attempts"] >= job["max_attempts"]
+                ):
+                    # the lease ran out on the last attempt, so don't hand it out again
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, lease_token = NULL,"
+                        " lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                        (
+                            f"Lease expired on attempt {job['attempts']} of {job['max_attempts']}",
+                            now,
+                            job["id"],
+                        ),
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_token = ?,"
+                        " lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                        (token, now + visibility_timeout, now, job["id"]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self.get(row["id"])
+
+    def extend_lease(self, job_id: str, token: str, visibility_timeout: float) -> bool:
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND lease_token = ? AND status = 'running'",
+                (time.time() + visibility_timeout, job_id, token),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, token: str, result: Dict[str, Any]) -> bool:
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, lease_token = NULL,"
+                " lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_token = ?",
+                (json.dumps(result, default=str), time.time(), job_id, token),
+            )
+            return cursor.rowcount == 1
+
+    def fail(
+        self, job_id: str, token: str, error: str, retry_delay: float
+    ) -> Optional[str]:
+        # requeue with a delay, or mark failed once attempts are used up; returns the new status
+        with self.lock:
+            job = self.get(job_id)
+            if job is None or job["lease_token"] != token:
+                return None
+            now = time.time()
+            status = "queued" if job["attempts"] < job["max_attempts"] else "failed"
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_token = NULL,"
+                " lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_token = ?",
+                (status, error, now + retry_delay, now, job_id, token),
+            )
+            return status
+
+    def defer(self, job_id: str, token: str, delay: float) -> bool:
+        # requeue without counting the attempt
+        with self.lock:
+            now = time.time()
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, available_at = ?, lease_token = NULL,"
+                " lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_token = ?",
+                (now + delay, now, job_id, token),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            job["payload"] = json.loads(job["payload"])
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            return job
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()
+            return {row["status"]: row["n"] for row in rows}
+
+
+class JobWorkerPool:
+    # asyncio workers in this process that drain the queue through the shared scraper
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue,
+        scraper: "ZillowScrapingService",
+        workers: int,
+        visibility_timeout: float,
+        retry_base_seconds: float,
+        poll_interval: float,
+        allow_private_webhooks: bool = False,
+    ):
+        self.queue = queue
+        self.scraper = scraper
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_interval = poll_interval
+        self.allow_private_webhooks = allow_private_webhooks
+        self.tasks: List[asyncio.Task] = []
+        self.webhooks = httpx.AsyncClient(timeout=10.0)
+
+    def start(self) -> None:
+        for number in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker(number)))
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self) -> None:
+        # cancelled jobs keep their lease and are picked up again when it expires
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await self.webhooks.aclose()
+
+    async def _worker(self, number: int) -> None:
+        metrics.current_endpoint.set("job_worker")
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim, self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Job worker {number} could not claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job["status"] == "failed":
+                logger.warning(f"Job {job['id']} failed: {job['error']}")
+                if job["webhook_url"]:
+                    await self._deliver_webhook(job)
+                continue
+
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id, token = job["id"], job["lease_token"]
+        heartbeat = asyncio.create_task(self._keep_lease(job_id, token))
+        # the job is scheduled as the client that queued it, at the job's priority
+        tenant_token = current_tenant.set(job["payload"].get("tenant", DEFAULT_TENANT))
+        priority_token = current_priority.set(job["priority"])
+        try:
+            result = await self.scraper.scrape_zillow_property(
+                job["payload"]["zillow_url"]
+            )
+            await asyncio.to_thread(
+                self.queue.complete, job_id, token, result.to_dict()
+            )
+            logger.info(f"Job {job_id} succeeded on attempt {job['attempts']}")
+        except asyncio.CancelledError:
+            raise
+        except CreditLimitError as e:
+            if e.deferrable:
+                await asyncio.to_thread(self.queue.defer, job_id, token, e.retry_after)
+                logger.info(f"Job {job_id} deferred for {e.retry_after:.0f}s: {str(e)}")
+            else:
+                status = await asyncio.to_thread(
+                    self.queue.fail, job_id, token, str(e), e.retry_after
+                )
+                logger.warning(
+                    f"Job {job_id} attempt {job['attempts']} failed ({status}): {str(e)}"
+                )
+        except Exception as e:
+            # exponential backoff with jitter: base, 2*base, 4*base, ...
+            delay = (
+                self.retry_base_seconds
+                * (2 ** (job["attempts"] - 1))
+                * random.uniform(0.8, 1.2)
+            )
+            status = await asyncio.to_thread(
+                self.queue.fail, job_id, token, str(e), delay
+            )
+            logger.warning(
+                f"Job {job_id} attempt {job['attempts']} failed ({status}): {str(e)}"
+            )
+        finally:
+            current_priority.reset(priority_token)
+            current_tenant.reset(tenant_token)
+            heartbeat.cancel()
+
+        finished = await asyncio.to_thread(self.queue.get, job_id)
+        if (
+            finished
+            and finished["webhook_url"]
+            and finished["status"] in ("succeeded", "failed")
+        ):
+            await self._deliver_webhook(finished)
+
+    async def _keep_lease(self, job_id: str, token: str) -> None:
+        # renew the lease while the scrape is still running
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(
+                self.queue.extend_lease, job_id, token, self.visibility_timeout
+            ):
+                return
+
+    async def _deliver_webhook(self, job: Dict[str, Any]) -> None:
+        try:
+            # checked again here, and posted to the address just checked: resolving the
+            # name a second time could land somewhere else (DNS rebinding). The name
+            # still goes in the Host header and the TLS SNI / certificate check.
+            url = job["webhook_url"]
+            address = await check_webhook_url(url, self.allow_private_webhooks)
+            parts = urlsplit(url)
+            response = await self.webhooks.post(
+                _pinned_url(parts, address),
+                json=job_view(job),
+                headers={"Host": parts.netloc.rpartition("@")[2]},
+                extensions={"sni_hostname": parts.hostname},
+            )
+            if response.status_code >= 400:
+                logger.warning(
+                    f"Webhook for job {job['id']} returned {response.status_code}"
+                )
+        except Exception as e:
+            logger.warning(f"Webhook for job {job['id']} failed: {str(e)}")
+
+
+async def check_webhook_url(url: str, allow_private: bool = False) -> str:
+    # webhooks are POSTed from inside our network, so only plain http(s) to public
+    # addresses; raises ValueError otherwise. Every address the host resolves to
+    # must be public, so a name can't smuggle in a loopback or metadata address.
+    # Returns the address to post to (the host itself when private hosts are allowed)
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http or https URL")
+    if allow_private:
+        return parts.hostname
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            parts.hostname, parts.port or None
+        )
+    except OSError:
+        raise ValueError(f"webhook_url host {parts.hostname} could not be resolved")
+    for info in infos:
+        address = ipaddress.ip_address(str(info[4][0]).split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise ValueError(
+                f"webhook_url host {parts.hostname} is not a public address"
+            )
+    return str(infos[0][4][0]).split("%")[0]
+
+
+def _pinned_url(parts: SplitResult, address: str) -> str:
+    # the URL with its host swapped for `address`, keeping credentials and port
+    host = f"[{address}]" if ":" in address else address
+    userinfo, _, _ = parts.netloc.rpartition("@")
+    netloc = host if parts.port is None else f"{host}:{parts.port}"
+    return parts._replace(
+        netloc=f"{userinfo}@{netloc}" if userinfo else netloc
+    ).geturl()
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    # the public shape of a job, without lease internals
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "zillow_url": job["payload"].get("zillow_url"),
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
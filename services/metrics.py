@@ -0,0 +1,288 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus metrics in the text exposition format, without a client library.
+# Everything is labeled with the endpoint (route template) of the request being served;
+# work outside a request (job workers, bulk ingestion) sets its own label.
+# Values are per worker process: scrape every worker, or aggregate in Prometheus.
+
+# seconds, from a cache hit to a slow stealth search
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    20,
+    30,
+    60,
+    120,
+)
+
+# the ASGI scope of the request being served (its "route" is filled in by routing),
+# or a plain label for background work
+current_endpoint: contextvars.ContextVar[Any] = contextvars.ContextVar(
+    "current_endpoint", default="background"
+)
+
+
+def endpoint_label() -> str:
+    value = current_endpoint.get()
+    if isinstance(value, dict):
+        route = value.get("route")
+        return getattr(route, "path", None) or "unmatched"
+    return str(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(
+    names: Tuple[str, ...], values: Tuple[str, ...], extra: str = ""
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...],
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # label values -> [per-bucket counts..., sum, count]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            cumulative: float = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += series[index]
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-2])}"
+            )
+            lines.append(
+                f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}"
+            )
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "property_scrape_stage_seconds",
+    "Time spent in each stage of a property scrape",
+    ("endpoint", "stage"),
+)
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ("endpoint", "method", "status"),
+)
+CACHE_EVENTS = Counter(
+    "property_cache_events_total",
+    "zpid cache, result cache and request coalescing outcomes",
+    ("endpoint", "cache", "result"),
+)
+FIRECRAWL_CALLS = Counter(
+    "firecrawl_calls_total",
+    "Firecrawl scrape calls by profile and proxy mode",
+    ("endpoint", "profile", "proxy"),
+)
+FIRECRAWL_CREDITS = Counter(
+    "firecrawl_credits_total",
+    "Estimated Firecrawl credits spent",
+    ("endpoint", "proxy"),
+)
+RETRIES = Counter(
+    "firecrawl_retries_total",
+    "Extra Firecrawl calls made after a failed one",
+    ("endpoint", "reason"),
+)
+CREDIT_SCHEDULER = Counter(
+    "credit_scheduler_decisions_total",
+    "Credit scheduler admissions, quota rejections and budget sheds",
+    ("endpoint", "kind", "decision"),
+)
+ERRORS = Counter(
+    "property_scrape_errors_total",
+    "Failed Firecrawl calls and failed scrape requests by error class",
+    ("endpoint", "stage", "error_class"),
+)
+
+METRICS: List[Union[Counter, Histogram]] = [
+    STAGE_SECONDS,
+    HTTP_SECONDS,
+    CACHE_EVENTS,
+    FIRECRAWL_CALLS,
+    FIRECRAWL_CREDITS,
+    RETRIES,
+    CREDIT_SCHEDULER,
+    ERRORS,
+]
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- hooks used by the service ---
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    # time one stage of the current request; time spent before a failure counts too
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(
+            time.perf_counter() - started, endpoint=endpoint_label(), stage=name
+        )
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, endpoint=endpoint_label(), stage=name)
+
+
+def count_cache(cache: str, result: str) -> None:
+    CACHE_EVENTS.inc(endpoint=endpoint_label(), cache=cache, result=result)
+
+
+def count_firecrawl_call(profile: str, proxy: str, credits: int) -> None:
+    endpoint = endpoint_label()
+    FIRECRAWL_CALLS.inc(endpoint=endpoint, profile=profile, proxy=proxy)
+    FIRECRAWL_CREDITS.inc(credits, endpoint=endpoint, proxy=proxy)
+
+
+def count_retry(reason: str) -> None:
+    RETRIES.inc(endpoint=endpoint_label(), reason=reason)
+
+
+def count_scheduler(kind: str, decision: str) -> None:
+    CREDIT_SCHEDULER.inc(endpoint=endpoint_label(), kind=kind, decision=decision)
+
+
+def count_error(stage_name: str, error: BaseException) -> None:
+    ERRORS.inc(
+        endpoint=endpoint_label(), stage=stage_name, error_class=error_class(error)
+    )
+
+
+def error_class(error: BaseException) -> str:
+    # coarse, low-cardinality buckets; most service errors are plain Exceptions
+    name = type(error).__name__
+    if name == "CircuitOpenError":
+        return "circuit_open"
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in name:
+        return "timeout"
+    if name in (
+        "ConnectError",
+        "ReadError",
+        "WriteError",
+        "RemoteProtocolError",
+        "HTTPStatusError",
+    ):
+        return "transport"
+    message = str(error)
+    if "Property search failed" in message:
+        return "search_failed"
+    if "status code" in message or "Status code" in message:
+        return "http_status"
+    return "scrape_failed" if type(error) is Exception else name
+
+
+class MetricsMiddleware:
+    # ASGI middleware: exposes the request scope to the metric hooks and records
+    # request latency labeled by route template
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = current_endpoint.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started,
+                endpoint=endpoint_label(),
+                method=scope["method"],
+                status=status["code"],
+            )
+            current_endpoint.reset(token)
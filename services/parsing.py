@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(
+    fn: Callable[..., Any], args: Tuple[Any, ...]
+) -> Tuple[Any, float, float]:
+    # runs in the worker thread/process; wall-clock timestamps so they compare across processes
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time() - started
+
+
+class ParseExecutor:
+    # runs CPU-bound parsing (regex scans, JSON decoding) off the event loop once the
+    # input is larger than threshold_bytes; smaller inputs are parsed inline because
+    # the hand-off would cost more than the parse.
+    # mode: "inline" (never offload), "thread" or "process" (fn and args must pickle)
+
+    def __init__(
+        self, mode: str = "thread", workers: int = 2, threshold_bytes: int = 256 * 1024
+    ):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(
+                f"Unknown parse executor: {mode} (expected 'inline', 'thread' or 'process')"
+            )
+        self.mode = mode
+        self.workers = workers
+        self.threshold_bytes = threshold_bytes
+        self.executor: Optional[Executor] = None
+
+        self.inline_count = 0
+        self.offloaded_count = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.parse_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        # created lazily so a preloaded gunicorn app doesn't fork with live pool threads
+        if self.executor is None:
+            if self.mode == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="parse"
+                )
+        return self.executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any, size: int) -> Any:
+        if self.mode == "inline" or size < self.threshold_bytes:
+            started = time.perf_counter()
+            result = fn(*args)
+            self.inline_count += 1
+            self.parse_seconds += time.perf_counter() - started
+            return result
+
+        submitted = time.time()
+        self.offloaded_count += 1
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, duration = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, args
+            )
+        finally:
+            self.queue_depth -= 1
+
+        self.wait_seconds += max(0.0, started - submitted)
+        self.parse_seconds += duration
+        if size >= 4 * self.threshold_bytes:
+            logger.info(
+                f"Parsed {size} bytes with {fn.__name__} in {duration:.3f}s ({self.mode} pool)"
+            )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.inline_count + self.offloaded_count
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "threshold_bytes": self.threshold_bytes,
+            "inline": self.inline_count,
+            "offloaded": self.offloaded_count,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "parse_seconds": round(self.parse_seconds, 3),
+            "avg_parse_ms": (
+                round(self.parse_seconds / total * 1000, 3) if total else None
+            ),
+            "avg_queue_wait_ms": (
+                round(self.wait_seconds / self.offloaded_count * 1000, 3)
+                if self.offloaded_count
+                else None
+            ),
+        }
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
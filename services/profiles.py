@@ -0,0 +1,119 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from config.settings import Settings
+
+# Scrape profiles: each Firecrawl call site names the profile it scrapes with, and the
+# profile supplies the minimal formats and page options that code path actually reads.
+# Screenshot actions are only useful when debugging selectors; call sites mark them
+# with debug_screenshot() and they are stripped unless the profile runs in debug mode
+# (SCRAPE_DEBUG_PROFILES), which also asks Firecrawl for a screenshot of the final page.
+# How long a profile waits (waitFor, timeout, the pauses between browser actions) is
+# not set here: the wait tuner fills those in from its base waits (SCRAPE_WAITS),
+# scaled by what it has learned.
+
+DEBUG_ONLY = "_debug_only"
+WAIT = "_wait"
+
+
+def debug_screenshot() -> Dict[str, Any]:
+    # a screenshot action that is only sent when the profile runs in debug mode
+    return {"type": "screenshot", "fullPage": False, DEBUG_ONLY: True}
+
+
+def named_wait(name: str) -> Dict[str, Any]:
+    # a wait action lasting the profile's base wait `name`, as tuned
+    return {"type": "wait", WAIT: name}
+
+
+class ScrapeProfile:
+    def __init__(
+        self, name: str, formats: List[str], debug: bool = False, **options: Any
+    ):
+        self.name = name
+        self.formats = formats
+        self.debug = debug
+        # default page options (onlyMainContent, maxAge, proxy); the call site can
+        # still override any of them
+        self.options = options
+
+    @property
+    def label(self) -> str:
+        # what the call is counted under in the profile stats
+        return f"{self.name}:debug" if self.debug else self.name
+
+    def params(self, **overrides: Any) -> Dict[str, Any]:
+        params = {"formats": list(self.formats), **self.options, **overrides}
+        actions = params.get("actions")
+        if actions:
+            params["actions"] = [
+                {key: value for key, value in action.items() if key != DEBUG_ONLY}
+                for action in actions
+                if self.debug or not action.get(DEBUG_ONLY)
+            ]
+        if self.debug and "screenshot" not in params["formats"]:
+            params["formats"].append("screenshot")
+        return params
+
+
+def build_profiles(settings: Settings) -> Dict[str, ScrapeProfile]:
+    debug = {
+        name.strip()
+        for name in settings.scrape_debug_profiles.split(",")
+        if name.strip()
+    }
+
+    def profile(name: str, formats: List[str], **options: Any) -> ScrapeProfile:
+        return ScrapeProfile(
+            name, formats, debug=name in debug or "*" in debug, **options
+        )
+
+    return {
+        # search strategies: markdown for the result, html for the results-page link scan
+        "search_primary": profile(
+            "search_primary",
+            ["markdown", "html"],
+            onlyMainContent=False,
+            maxAge=0,  # don't cache search results
+            proxy="stealth",
+        ),
+        "search_fallback": profile(
+            "search_fallback",
+            ["markdown", "html"],
+            onlyMainContent=True,
+            maxAge=0,
+            proxy="stealth",
+        ),
+        "search_direct_url": profile(
+            "search_direct_url",
+            ["markdown", "html"],
+            onlyMainContent=True,
+            maxAge=0,
+            proxy="stealth",
+        ),
+        # property pages: only markdown is read, plus rawHtml (which keeps the
+        # <script> blocks with the listing JSON) for structured extraction; rawHtml is
+        # the whole page, so this roughly triples the payload on the fixture pages
+        "property": profile(
+            "property",
+            ["markdown", "rawHtml"] if settings.structured_extraction else ["markdown"],
+            onlyMainContent=True,
+            maxAge=604800000,  # 1 week cache
+        ),
+    }
+
+
+def response_payload_bytes(response: Any) -> Optional[int]:
+    # approximate size of the content Firecrawl sent back for one scrape
+    if response is None:
+        return None
+    size = 0
+    for field in ("markdown", "html", "rawHtml", "screenshot"):
+        value = getattr(response, field, None)
+        if value:
+            size += len(value)
+    for field in ("links", "actions"):
+        value = getattr(response, field, None)
+        if value:
+            size += len(json.dumps(value, default=str))
+    return size
@@ -0,0 +1,125 @@
+import contextvars
+import math
+import random
+import time
+from typing import Any, Dict, Optional
+
+# Shared resilience pieces around Firecrawl calls:
+# - CircuitBreaker: one per proxy mode (basic / stealth). After `failure_threshold`
+#   failed calls in a row it opens and calls in that mode fail fast with
+#   CircuitOpenError; after `reset_seconds` a single trial call is let through
+#   (half-open) and its outcome closes or re-opens the breaker. Calls that started
+#   before the breaker opened may finish while it is open or half-open; they don't
+#   touch its state, only the trial does.
+# - RetryBudget: how many retries one request may spend in total, so an outage
+#   can't multiply every request into a burst of calls.
+# - backoff_delay: exponential backoff with full jitter between retries.
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, mode: str, retry_after: float):
+        super().__init__(
+            f"Firecrawl {mode} scraping is failing, circuit open for another {math.ceil(retry_after)}s"
+        )
+        self.mode = mode
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_seconds: float = 30
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def available(self) -> bool:
+        # would a call be let through right now (without claiming the half-open trial)
+        if self.state == "closed":
+            return True
+        return not self.trial_in_flight and self.retry_after() == 0
+
+    def before_call(self) -> bool:
+        # raises CircuitOpenError instead of letting the call through; True when the
+        # call is the half-open trial, to be passed back to record() / release()
+        if self.state == "closed":
+            return False
+        if self.state == "open" and self.retry_after() == 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError(self.name, self.retry_after())
+
+    def record(self, success: bool, trial: bool = False) -> None:
+        if trial:
+            self.trial_in_flight = False
+        elif self.state != "closed":
+            # a call let through while closed, finishing late: the trial decides
+            return
+        if success:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if (
+            self.state == "half_open"
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self, trial: bool = False) -> None:
+        # the call never finished (cancelled); if it was the trial, let the next one be
+        if trial:
+            self.trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        if state == "open" and self.retry_after() == 0:
+            # the next call will be the trial
+            state = "half_open"
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": (
+                round(self.retry_after(), 1) if self.state != "closed" else 0
+            ),
+            "times_opened": self.opened,
+            "rejected_calls": self.rejected,
+        }
+
+
+class RetryBudget:
+    def __init__(self, retries: int):
+        self.remaining = retries
+
+    def spend(self) -> bool:
+        # take one retry; False when the request has used them all
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+# the retry budget of the request this task is serving, if any
+current_retry_budget: contextvars.ContextVar[Optional[RetryBudget]] = (
+    contextvars.ContextVar("current_retry_budget", default=None)
+)
+
+
+def backoff_delay(retry: int, base: float, cap: float) -> float:
+    # full jitter: uniform in [0, min(cap, base * 2^(retry-1))]
+    return random.uniform(0, min(cap, base * (2 ** (retry - 1))))
@@ -0,0 +1,120 @@
+import base64
+import zlib
+from typing import Any, Dict, Optional
+
+# What a property scrape hands back. Results sit in batches, coalesced waits, job
+# queues and caches, so they are kept small: fixed-slot records instead of dicts,
+# and the page markdown (tens to hundreds of KB) compressed once when the result is
+# built and only inflated for callers that ask for it (include_raw=true).
+
+
+class PropertyNotFound(Exception):
+    # Zillow answered the search and there is no listing for the address: the one
+    # outcome worth remembering in the zpid cache (outages and errors say nothing
+    # about the address)
+    pass
+
+
+class RawContent:
+    # a page's markdown, zlib-compressed; .text() inflates it on demand
+
+    __slots__ = ("blob",)
+
+    def __init__(self, blob: bytes):
+        self.blob = blob
+
+    @classmethod
+    def from_text(cls, text: str) -> Optional["RawContent"]:
+        if not text:
+            return None
+        # level 1: most of level 6's saving on markdown, at a fraction of the CPU
+        return cls(zlib.compress(text.encode("utf-8"), 1))
+
+    @classmethod
+    def from_stored(cls, stored: str) -> "RawContent":
+        # the base64 form kept in JSON cache entries
+        return cls(base64.b64decode(stored))
+
+    def stored(self) -> str:
+        return base64.b64encode(self.blob).decode("ascii")
+
+    def text(self) -> str:
+        return zlib.decompress(self.blob).decode("utf-8")
+
+
+# everything but `raw`, in response order
+FIELDS = (
+    "success",
+    "url",
+    "final_url",
+    "property_data",
+    "search_performed",
+    "note",
+    "fingerprint",
+    "content_changed",
+    "zpid_cache",
+    "result_cache",
+)
+
+
+class ScrapeResult:
+    # one scraped property; zpid_cache / result_cache say how the caches answered,
+    # content_changed whether the page differed from the last fetch of it (see changes.py)
+
+    __slots__ = FIELDS + ("raw",)
+
+    def __init__(
+        self,
+        success: bool,
+        url: str,
+        property_data: Dict[str, Any],
+        final_url: Optional[str] = None,
+        raw: Optional[RawContent] = None,
+        search_performed: Optional[bool] = None,
+        note: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        content_changed: Optional[bool] = None,
+        zpid_cache: Optional[str] = None,
+        result_cache: Optional[str] = None,
+    ):
+        self.success = success
+        self.url = url
+        self.final_url = final_url
+        self.property_data = property_data
+        self.raw = raw
+        self.search_performed = search_performed
+        self.note = note
+        self.fingerprint = fingerprint
+        self.content_changed = content_changed
+        self.zpid_cache = zpid_cache
+        self.result_cache = result_cache
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScrapeResult":
+        # a result cache entry back into a result; the compressed markdown stays compressed
+        raw = (
+            RawContent.from_stored(data["raw_content_z"])
+            if data.get("raw_content_z")
+            else None
+        )
+        return cls(raw=raw, **{name: data[name] for name in FIELDS if name in data})
+
+    def copy(self) -> "ScrapeResult":
+        # shallow: coalesced callers get their own cache annotations, not their own data
+        return ScrapeResult(
+            raw=self.raw, **{name: getattr(self, name) for name in FIELDS}
+        )
+
+    def to_dict(self, include_raw: bool = False) -> Dict[str, Any]:
+        # JSON-ready; unset fields are left out
+        data = {
+            name: getattr(self, name)
+            for name in FIELDS
+            if getattr(self, name) is not None
+        }
+        if include_raw:
+            data["raw_content"] = self.raw_content()
+        return data
+
+    def raw_content(self) -> str:
+        return self.raw.text() if self.raw is not None else ""
@@ -0,0 +1,176 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Orders the address-search strategies by what they've been doing lately.
+# Each strategy keeps a rolling window of outcomes; its score is the expected time to
+# a useful result (average latency / smoothed success rate) and strategies are tried
+# cheapest first. A strategy with fewer than `min_samples` outcomes is tried early so
+# it gets measured. After `breaker_failures` failures in a row its breaker opens and
+# it is skipped; every `open_seconds` one probe is let through (the service runs it in
+# the background), and a success closes the breaker again.
+# A run that was cut short (a hedged search that lost) is recorded as censored, with
+# success None: it took at least that long, but neither succeeded nor failed. Its time
+# counts towards the latency (total time observed over the runs that finished) and it
+# counts as a sample, but it leaves the success rate and the failure streak alone.
+# With several workers, each one records into shared state and periodically load()s
+# the merged outcomes, so they all rank from the same history.
+
+
+class StrategyScheduler:
+    def __init__(
+        self,
+        strategies: List[str],
+        window: int = 50,
+        min_samples: int = 5,
+        breaker_failures: int = 5,
+        open_seconds: float = 300,
+        enabled: bool = True,
+    ):
+        # `strategies` in their default order, which also breaks ties
+        self.strategies = list(strategies)
+        self.window = window
+        self.min_samples = min_samples
+        self.breaker_failures = breaker_failures
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+        self.outcomes: Dict[str, Deque[Tuple[Optional[bool], float]]] = {
+            name: deque(maxlen=window) for name in self.strategies
+        }
+        self.consecutive_failures = {name: 0 for name in self.strategies}
+        # strategy -> when its breaker opened (or was last probed)
+        self.opened_at: Dict[str, float] = {}
+        self.probing: set = set()
+        self.skipped = {name: 0 for name in self.strategies}
+        self.probes = {name: 0 for name in self.strategies}
+
+    def record(self, name: str, success: Optional[bool], seconds: float) -> None:
+        self.outcomes[name].append((success, seconds))
+        self.probing.discard(name)
+        if success is None:
+            return
+        if success:
+            self.consecutive_failures[name] = 0
+            self.opened_at.pop(name, None)
+            return
+        self.consecutive_failures[name] += 1
+        if (
+            name in self.opened_at
+            or self.consecutive_failures[name] >= self.breaker_failures
+        ):
+            # open, or stay open after a failed probe
+            self.opened_at[name] = time.monotonic()
+
+    def load(self, outcomes: Dict[str, List[Dict[str, Any]]]) -> None:
+        # replace the windows with the outcomes every worker recorded (oldest first);
+        # the failure streaks, and so the breakers, follow the merged history
+        for name, items in outcomes.items():
+            if name not in self.outcomes or not items:
+                continue
+            self.outcomes[name] = deque(
+                ((item["success"], item["seconds"]) for item in items),
+                maxlen=self.window,
+            )
+            failures = 0
+            for success, _ in reversed(self.outcomes[name]):
+                if success is None:
+                    continue
+                if success:
+                    break
+                failures += 1
+            self.consecutive_failures[name] = failures
+            if failures == 0:
+                self.opened_at.pop(name, None)
+            elif failures >= self.breaker_failures and name not in self.opened_at:
+                self.opened_at[name] = time.monotonic()
+
+    def score(self, name: str) -> Optional[float]:
+        outcomes = self.outcomes[name]
+        if len(outcomes) < self.min_samples:
+            return None
+        finished = [success for success, _ in outcomes if success is not None]
+        successes = sum(1 for success in finished if success)
+        latency = sum(seconds for _, seconds in outcomes) / max(1, len(finished))
+        return latency / ((successes + 1) / (len(finished) + 2))
+
+    def _rank(self, names: List[str]) -> List[str]:
+        # unmeasured strategies first, then by score, then default order
+        def key(name: str) -> Tuple[float, int]:
+            score = self.score(name)
+            return (-1.0 if score is None else score, self.strategies.index(name))
+
+        return sorted(names, key=key)
+
+    def order(self, lead: Optional[str] = None) -> List[str]:
+        # the strategies to run for one search, best first, without open breakers.
+        # `lead` stays first until every strategy has been measured (hedged searches
+        # start with the cheap one rather than whichever hasn't been tried yet)
+        if not self.enabled:
+            return self._lead(list(self.strategies), lead)
+
+        available = [name for name in self.strategies if name not in self.opened_at]
+        for name in self.opened_at:
+            self.skipped[name] += 1
+        if not available:
+            # everything looks dead: better to try than to fail without asking
+            available = list(self.strategies)
+        ranked = self._rank(available)
+        if any(self.score(name) is None for name in ranked):
+            return self._lead(ranked, lead)
+        return ranked
+
+    def _lead(self, order: List[str], lead: Optional[str]) -> List[str]:
+        if lead in order:
+            order.remove(lead)
+            order.insert(0, lead)
+        return order
+
+    def due_probes(self) -> List[str]:
+        # open strategies whose cooldown is over; each is handed out once per cooldown
+        if not self.enabled:
+            return []
+        now = time.monotonic()
+        due = []
+        for name, opened in list(self.opened_at.items()):
+            if name not in self.probing and now - opened >= self.open_seconds:
+                self.probing.add(name)
+                self.opened_at[name] = now
+                self.probes[name] += 1
+                due.append(name)
+        return due
+
+    def end_probe(self, name: str) -> None:
+        # the probe finished without an outcome (e.g. cancelled at shutdown)
+        self.probing.discard(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        strategies = {}
+        for name in self.strategies:
+            outcomes = self.outcomes[name]
+            finished = [success for success, _ in outcomes if success is not None]
+            score = self.score(name)
+            strategies[name] = {
+                "breaker": "open" if name in self.opened_at else "closed",
+                "samples": len(outcomes),
+                "cut_short": len(outcomes) - len(finished),
+                "success_rate": (
+                    round(sum(1 for success in finished if success) / len(finished), 3)
+                    if finished
+                    else None
+                ),
+                "avg_seconds": (
+                    round(sum(seconds for _, seconds in outcomes) / len(outcomes), 3)
+                    if outcomes
+                    else None
+                ),
+                "score": round(score, 3) if score is not None else None,
+                "consecutive_failures": self.consecutive_failures[name],
+                "skipped": self.skipped[name],
+                "probes": self.probes[name],
+            }
+        available = [name for name in self.strategies if name not in self.opened_at]
+        return {
+            "enabled": self.enabled,
+            "order": self._rank(available) if self.enabled else list(self.strategies),
+            "strategies": strategies,
+        }
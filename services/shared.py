@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Protocol
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# State that has to agree across worker processes (and hosts) when the app runs with
+# more than one worker:
+#   - Firecrawl rate-limit tokens, one bucket per API key
+#   - coalescing locks, so two workers don't scrape the same property at once
+#   - recent search-strategy outcomes, so every worker learns from all of them
+#   - the wait-tuning state, so every worker's outcomes move the same scales
+# Caches are shared through their own backends (services/cache.py).
+# Every backend exposes the same coroutines:
+#   await state.reserve_token(key, rate, capacity, tokens=1) -> seconds to wait before the call
+#     (negative tokens hand back an earlier reservation)
+#   await state.acquire_lock(key, ttl) -> token or None, await state.release_lock(key, token)
+#   await state.push_outcome(name, outcome, window), await state.outcomes(names)
+#   await state.get_document(key) -> dict or None, await state.put_document(key, document)
+# "memory" means no shared state: each worker keeps its own (build_shared_state -> None).
+
+
+class SharedState(Protocol):
+    async def reserve_token(
+        self, key: str, rate: float, capacity: float, tokens: float = 1.0
+    ) -> float: ...
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]: ...
+
+    async def release_lock(self, key: str, token: str) -> None: ...
+
+    async def push_outcome(
+        self, name: str, outcome: Dict[str, Any], window: int
+    ) -> None: ...
+
+    async def outcomes(self, names: List[str]) -> Dict[str, List[Dict[str, Any]]]: ...
+
+    async def get_document(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    async def put_document(self, key: str, document: Dict[str, Any]) -> None: ...
+
+    async def aclose(self) -> None: ...
+
+
+class SQLiteSharedState:
+    # WAL-mode SQLite file shared by every worker on this host; each operation is one
+    # short IMMEDIATE transaction, so workers serialize on the file's write lock
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS strategy_outcomes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, outcome TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS strategy_outcomes_name ON strategy_outcomes (name, id)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, document TEXT NOT NULL)"
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    async def reserve_token(
+        self, key: str, rate: float, capacity: float, tokens: float = 1.0
+    ) -> float:
+        # take tokens now, going into debt if the bucket is empty; the caller waits
+        # off the debt, so callers across all workers are spaced `tokens / rate` apart
+        with self._transaction():
+            now = time.time()
+            row = self.conn.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            level = (
+                capacity
+                if row is None
+                else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+            )
+            level -= tokens
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, level, now),
+            )
+        return max(0.0, -level / rate)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO locks (key, token, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at"
+            " WHERE locks.expires_at < ?",
+            (key, token, now + ttl, now),
+        )
+        return token if cursor.rowcount == 1 else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        self.conn.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+    async def push_outcome(
+        self, name: str, outcome: Dict[str, Any], window: int
+    ) -> None:
+        with self._transaction():
+            self.conn.execute(
+                "INSERT INTO strategy_outcomes (name, outcome) VALUES (?, ?)",
+                (name, json.dumps(outcome)),
+            )
+            self.conn.execute(
+                "DELETE FROM strategy_outcomes WHERE name = ? AND id NOT IN ("
+                " SELECT id FROM strategy_outcomes WHERE name = ? ORDER BY id DESC LIMIT ?)",
+                (name, name, window),
+            )
+
+    async def outcomes(self, names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        # oldest first, like the scheduler's own windows
+        result: Dict[str, List[Dict[str, Any]]] = {name: [] for name in names}
+        for name, outcome in self.conn.execute(
+            "SELECT name, outcome FROM strategy_outcomes ORDER BY id"
+        ):
+            if name in result:
+                result[name].append(json.loads(outcome))
+        return result
+
+    async def get_document(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT document FROM documents WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def put_document(self, key: str, document: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents (key, document) VALUES (?, ?)",
+            (key, json.dumps(document)),
+        )
+
+    async def aclose(self) -> None:
+        self.conn.close()
+
+
+# take a token in one round trip; Redis' own clock keeps hosts with skewed clocks honest
+_RESERVE_TOKEN = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local take = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) - take
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(tokens)
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisSharedState:
+    # Redis-compatible store (Redis, Valkey, KeyDB) shared by workers on any host;
+    # `client` needs async get/set/eval/lpush/ltrim/lrange and pipelines
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.prefix = "property-firecrawl:shared:"
+
+    async def reserve_token(
+        self, key: str, rate: float, capacity: float, tokens: float = 1.0
+    ) -> float:
+        level = float(
+            await self.client.eval(
+                _RESERVE_TOKEN, 1, self.prefix + "rate:" + key, rate, capacity, tokens
+            )
+        )
+        return max(0.0, -level / rate)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = await self.client.set(
+            self.prefix + "lock:" + key, token, nx=True, px=int(ttl * 1000)
+        )
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self.client.eval(_RELEASE_LOCK, 1, self.prefix + "lock:" + key, token)
+
+    async def push_outcome(
+        self, name: str, outcome: Dict[str, Any], window: int
+    ) -> None:
+        key = self.prefix + "outcomes:" + name
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lpush(key, json.dumps(outcome))
+            pipe.ltrim(key, 0, window - 1)
+            await pipe.execute()
+
+    async def outcomes(self, names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        result = {}
+        for name in names:
+            raw = await self.client.lrange(self.prefix + "outcomes:" + name, 0, -1)
+            result[name] = [json.loads(item) for item in reversed(raw)]
+        return result
+
+    async def get_document(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self.prefix + "document:" + key)
+        return json.loads(raw) if raw else None
+
+    async def put_document(self, key: str, document: Dict[str, Any]) -> None:
+        await self.client.set(self.prefix + "document:" + key, json.dumps(document))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def build_shared_state(settings: Settings) -> Optional[SharedState]:
+    kind = settings.shared_state_backend.lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        return SQLiteSharedState(settings.cache_sqlite_path)
+    if kind == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError(
+                "The redis shared state backend needs the redis package: pip install redis"
+            )
+        return RedisSharedState(redis.Redis.from_url(settings.cache_redis_url))
+    raise ValueError(
+        f"Unknown shared state backend: {kind} (expected 'memory', 'sqlite' or 'redis')"
+    )
+
+
+@asynccontextmanager
+async def held_lock(
+    state: Optional[SharedState], key: str, ttl: float, poll_seconds: float
+) -> AsyncIterator[bool]:
+    # hold `key` across workers; while another worker holds it, wait for it to finish.
+    # The lock expires after `ttl`, so a crashed worker can't hold a key forever.
+    if state is None:
+        yield False
+        return
+    waited = False
+    try:
+        token = await state.acquire_lock(key, ttl)
+        while token is None:
+            waited = True
+            await asyncio.sleep(poll_seconds)
+            token = await state.acquire_lock(key, ttl)
+    except Exception as e:
+        # a store outage costs duplicate scrapes, not failed requests
+        logger.warning(
+            f"Shared lock unavailable for {key}, continuing without it: {str(e)}"
+        )
+        yield waited
+        return
+    try:
+        yield waited
+    finally:
+        try:
+            await state.release_lock(key, token)
+        except Exception as e:
+            logger.warning(
+                f"Could not release shared lock {key}, it expires in {ttl}s: {str(e)}"
+            )
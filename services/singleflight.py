@@ -0,0 +1,44 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    # coalesces concurrent calls that share a key: the first caller (leader) runs
+    # the work, everyone who arrives while it is in flight (followers) awaits the
+    # same result instead of starting their own scrape
+
+    def __init__(self) -> None:
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+
+        # shield so a caller that goes away doesn't cancel the work for the others
+        result = await asyncio.shield(task)
+        # each caller gets its own shallow copy so annotations don't leak between them
+        return result.copy() if hasattr(result, "copy") else result
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.followers
+        return {
+            "misses": self.leaders,
+            "hits": self.followers,
+            "hit_rate": round(self.followers / total, 3) if total else None,
+            "in_flight": len(self.in_flight),
+        }
@@ -0,0 +1,174 @@
+import contextvars
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Firecrawl bills 1 credit per scrape and 5 when the stealth proxy is used
+BASIC_SCRAPE_CREDITS = 1
+STEALTH_SCRAPE_CREDITS = 5
+
+
+def estimate_credits(params: Dict[str, Any]) -> int:
+    # rough credit cost of one /v1/scrape call with the given options
+    return (
+        STEALTH_SCRAPE_CREDITS
+        if params.get("proxy") == "stealth"
+        else BASIC_SCRAPE_CREDITS
+    )
+
+
+class CreditMeter:
+    # running credit total for one unit of work (e.g. one property search); a meter
+    # started inside another one (a search within a scheduled scrape) also counts
+    # towards the outer one
+    def __init__(self, parent: Optional["CreditMeter"] = None):
+        self.credits = 0
+        self.calls = 0
+        self.parent = parent
+
+    def add(self, credits: int) -> None:
+        self.credits += credits
+        self.calls += 1
+        if self.parent is not None:
+            self.parent.add(credits)
+
+
+# the meter of the search currently running in this task, if any;
+# tasks spawned during the search inherit it
+current_credit_meter: contextvars.ContextVar[Optional[CreditMeter]] = (
+    contextvars.ContextVar("current_credit_meter", default=None)
+)
+
+
+class LatencyWindow:
+    # keeps the last `size` samples and reports percentiles over them
+
+    def __init__(self, size: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        if not self.samples:
+            return {"p50": None, "p90": None, "p95": None, "p99": None}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {
+            name: round(ordered[min(last, int(round(q * last)))], 3)
+            for name, q in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99))
+        }
+
+
+class SearchStats:
+    # per-mode (sequential/hedged) and per-strategy counters for tuning the search policy
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.modes: Dict[str, Dict[str, Any]] = {}
+        self.strategies: Dict[str, Dict[str, Any]] = {}
+        self.started = time.time()
+
+    def _entry(self, table: Dict[str, Dict[str, Any]], name: str) -> Dict[str, Any]:
+        if name not in table:
+            table[name] = {
+                "count": 0,
+                "success": 0,
+                "credits": 0,
+                "calls": 0,
+                "wins": {},
+                "latency": LatencyWindow(self.window),
+            }
+        return table[name]
+
+    def record_search(
+        self,
+        mode: str,
+        seconds: float,
+        success: bool,
+        meter: CreditMeter,
+        winner: Optional[str],
+    ) -> None:
+        entry = self._entry(self.modes, mode)
+        entry["count"] += 1
+        entry["success"] += 1 if success else 0
+        entry["credits"] += meter.credits
+        entry["calls"] += meter.calls
+        entry["latency"].add(seconds)
+        if winner:
+            entry["wins"][winner] = entry["wins"].get(winner, 0) + 1
+
+    def record_strategy(self, strategy: str, seconds: float, success: bool) -> None:
+        entry = self._entry(self.strategies, strategy)
+        entry["count"] += 1
+        entry["success"] += 1 if success else 0
+        entry["latency"].add(seconds)
+
+    def _render(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        count = entry["count"]
+        return {
+            "count": count,
+            "success_rate": round(entry["success"] / count, 3) if count else None,
+            "credits": entry["credits"],
+            "credits_per_search": round(entry["credits"] / count, 2) if count else None,
+            "firecrawl_calls": entry["calls"],
+            "wins": dict(entry["wins"]),
+            "latency_seconds": entry["latency"].percentiles(),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "since": self.started,
+            "modes": {name: self._render(entry) for name, entry in self.modes.items()},
+            "strategies": {
+                name: {
+                    key: value
+                    for key, value in self._render(entry).items()
+                    if key in ("count", "success_rate", "latency_seconds")
+                }
+                for name, entry in self.strategies.items()
+            },
+        }
+
+
+class ProfileStats:
+    # per scrape profile: Firecrawl calls, response payload size and latency
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self, profile: str, seconds: float, payload_bytes: Optional[int], success: bool
+    ) -> None:
+        if profile not in self.profiles:
+            self.profiles[profile] = {
+                "calls": 0,
+                "success": 0,
+                "payload_bytes": 0,
+                "max_payload_bytes": 0,
+                "latency": LatencyWindow(self.window),
+            }
+        entry = self.profiles[profile]
+        entry["calls"] += 1
+        entry["success"] += 1 if success else 0
+        entry["latency"].add(seconds)
+        if payload_bytes is not None:
+            entry["payload_bytes"] += payload_bytes
+            entry["max_payload_bytes"] = max(entry["max_payload_bytes"], payload_bytes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "calls": entry["calls"],
+                "success_rate": round(entry["success"] / entry["calls"], 3),
+                "avg_payload_bytes": (
+                    round(entry["payload_bytes"] / entry["success"])
+                    if entry["success"]
+                    else None
+                ),
+                "max_payload_bytes": entry["max_payload_bytes"],
+                "latency_seconds": entry["latency"].percentiles(),
+            }
+            for name, entry in self.profiles.items()
+        }
@@ -0,0 +1,155 @@
+import logging
+from typing import Any, ContextManager, Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Optional OpenTelemetry tracing. With TRACING_ENABLED=false (the default) span()
+# hands back one shared no-op object, so instrumented code pays a function call and
+# an attribute check per span and the SDK is never imported. When enabled, spans
+# are batched to an OTLP/HTTP collector or appended as JSON lines to a local file.
+# Spans live in contextvars, so tasks spawned inside a request (hedged searches,
+# background probes) nest under it.
+
+
+class _NoopSpan:
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# the SDK objects, once configure() has installed them
+_tracer: Any = None
+_provider: Any = None
+_propagate: Any = None
+
+
+def configure(settings: Settings) -> None:
+    # install the tracer provider once, at startup
+    global _tracer, _provider, _propagate
+    if not settings.tracing_enabled or _tracer is not None:
+        return
+    try:
+        from opentelemetry import propagate, trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+    except ImportError:
+        raise ImportError(
+            "Tracing needs the OpenTelemetry SDK: pip install opentelemetry-sdk"
+        )
+
+    if settings.tracing_exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            raise ImportError(
+                "The otlp exporter needs: pip install opentelemetry-exporter-otlp-proto-http"
+            )
+        exporter = OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    elif settings.tracing_exporter == "file":
+        out = open(settings.tracing_file_path, "a")
+        exporter = ConsoleSpanExporter(
+            out=out, formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    else:
+        raise ValueError(
+            f"Unknown tracing exporter: {settings.tracing_exporter} (expected 'otlp' or 'file')"
+        )
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = _provider.get_tracer("property-firecrawl")
+    _propagate = propagate
+    logger.info(f"Tracing enabled, exporting spans via {settings.tracing_exporter}")
+
+
+def shutdown() -> None:
+    # flush spans still waiting in the batch processor
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> ContextManager[Any]:
+    # `with span("name", {...}) as current:`; None attributes are dropped
+    if _tracer is None:
+        return NOOP_SPAN
+    started: ContextManager[Any] = _tracer.start_as_current_span(
+        name,
+        attributes={
+            key: value for key, value in (attributes or {}).items() if value is not None
+        },
+    )
+    return started
+
+
+def set_attributes(current: Any, attributes: Dict[str, Any]) -> None:
+    if current is NOOP_SPAN:
+        return
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+class TracingMiddleware:
+    # ASGI middleware: one server span per HTTP request, continuing an incoming
+    # traceparent header, named after the matched route once routing is done
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if _tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from opentelemetry.trace import SpanKind
+
+        carrier = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope.get("headers", [])
+        }
+        status = {"code": 500}
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=_propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+            },
+        ) as current:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route: Optional[Any] = scope.get("route")
+                if route is not None:
+                    current.update_name(f"{scope['method']} {route.path}")
+                    current.set_attribute("http.route", route.path)
+                current.set_attribute("http.response.status_code", status["code"])
@@ -0,0 +1,199 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import httpx
+from firecrawl import FirecrawlApp
+from firecrawl.firecrawl import MapResponse, ScrapeResponse
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Non-blocking ways of calling Firecrawl's /v1/scrape endpoint.
+# Every transport exposes the same coroutine: await transport.scrape_url(url, **params)
+# where params are the camelCase Firecrawl API options (formats, waitFor, maxAge, ...)
+# and the return value is a firecrawl ScrapeResponse, same as FirecrawlApp.scrape_url.
+# await transport.map_url(url, search=..., limit=...) calls /v1/map the same way and
+# returns a MapResponse (the site's known URLs, without fetching any page).
+# Both take api_key= to make the call with a key other than the configured one.
+
+
+class FirecrawlAPIError(Exception):
+    # Firecrawl answered with an error status (402: out of credits, 429: rate limited)
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class HttpxFirecrawlTransport:
+    # talks to the Firecrawl REST API directly through one shared httpx.AsyncClient,
+    # so every scrape in the worker reuses the same connection pool
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = "https://api.firecrawl.dev",
+        max_connections: int = 20,
+        default_timeout: float = 60.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.default_timeout = default_timeout
+        self.client = client or httpx.AsyncClient(
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=default_timeout,
+        )
+
+    async def scrape_url(
+        self, url: str, api_key: Optional[str] = None, **params: Any
+    ) -> ScrapeResponse:
+        payload: Dict[str, Any] = {"url": url, "origin": "property-firecrawl"}
+        payload.update(params)
+
+        # give the HTTP request 5s on top of the scrape timeout, like the SDK does
+        timeout = (
+            (params["timeout"] + 5000) / 1000
+            if params.get("timeout")
+            else self.default_timeout
+        )
+
+        response = await self.client.post(
+            f"{self.api_url}/v1/scrape",
+            json=payload,
+            timeout=timeout,
+            headers=self._auth(api_key),
+        )
+
+        try:
+            response_json = response.json()
+        except ValueError:
+            raise Exception(
+                f"Failed to parse Firecrawl response as JSON. Status code: {response.status_code}"
+            )
+
+        if response.status_code == 200:
+            if response_json.get("success") and "data" in response_json:
+                return ScrapeResponse(**response_json["data"])
+            raise Exception(
+                f"Failed to scrape URL. Error: {response_json.get('error', response_json)}"
+            )
+
+        raise FirecrawlAPIError(
+            f"Failed to scrape URL. Status code {response.status_code}. "
+            f"Error: {response_json.get('error', 'No error message provided')}",
+            response.status_code,
+        )
+
+    async def map_url(
+        self, url: str, api_key: Optional[str] = None, **params: Any
+    ) -> MapResponse:
+        payload: Dict[str, Any] = {"url": url, "origin": "property-firecrawl"}
+        payload.update(params)
+
+        response = await self.client.post(
+            f"{self.api_url}/v1/map",
+            json=payload,
+            timeout=self.default_timeout,
+            headers=self._auth(api_key),
+        )
+
+        try:
+            response_json = response.json()
+        except ValueError:
+            raise Exception(
+                f"Failed to parse Firecrawl response as JSON. Status code: {response.status_code}"
+            )
+
+        if response.status_code == 200 and response_json.get("success"):
+            return MapResponse(**response_json)
+        raise FirecrawlAPIError(
+            f"Failed to map URL. Status code {response.status_code}. "
+            f"Error: {response_json.get('error', 'No error message provided')}",
+            response.status_code,
+        )
+
+    def _auth(self, api_key: Optional[str]) -> Optional[Dict[str, str]]:
+        return {"Authorization": f"Bearer {api_key}"} if api_key else None
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class ExecutorFirecrawlTransport:
+    # runs the synchronous FirecrawlApp in a bounded thread pool so the event loop never blocks
+
+    def __init__(self, app: FirecrawlApp, max_workers: int = 8):
+        self.app = app
+        self.apps: Dict[str, FirecrawlApp] = {}
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="firecrawl"
+        )
+
+    async def scrape_url(
+        self, url: str, api_key: Optional[str] = None, **params: Any
+    ) -> ScrapeResponse:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self._app(api_key).scrape_url, url, **params),
+        )
+
+    async def map_url(
+        self, url: str, api_key: Optional[str] = None, **params: Any
+    ) -> MapResponse:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(self._app(api_key).map_url, url, **params)
+        )
+
+    def _app(self, api_key: Optional[str]) -> FirecrawlApp:
+        # one SDK client per extra key, made on first use
+        if not api_key or api_key == self.app.api_key:
+            return self.app
+        if api_key not in self.apps:
+            self.apps[api_key] = FirecrawlApp(api_key=api_key, api_url=self.app.api_url)
+        return self.apps[api_key]
+
+    async def aclose(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+def build_transport(settings: Settings) -> Any:
+    # pick the transport configured in config/settings.py
+    mode = settings.firecrawl_transport.lower()
+
+    if mode == "httpx":
+        logger.info(
+            f"Using httpx Firecrawl transport (max_connections={settings.firecrawl_max_connections})"
+        )
+        return HttpxFirecrawlTransport(
+            api_key=settings.firecrawl_api_key,
+            api_url=settings.firecrawl_api_url,
+            max_connections=settings.firecrawl_max_connections,
+            default_timeout=settings.firecrawl_request_timeout,
+        )
+
+    if mode == "executor":
+        logger.info(
+            f"Using executor Firecrawl transport (workers={settings.firecrawl_executor_workers})"
+        )
+        app = FirecrawlApp(
+            api_key=settings.firecrawl_api_key, api_url=settings.firecrawl_api_url
+        )
+        return ExecutorFirecrawlTransport(
+            app, max_workers=settings.firecrawl_executor_workers
+        )
+
+    raise ValueError(
+        f"Unknown firecrawl_transport: {settings.firecrawl_transport} (expected 'httpx' or 'executor')"
+    )
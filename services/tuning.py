@@ -0,0 +1,292 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.profiles import WAIT
+
+logger = logging.getLogger(__name__)
+
+# Adaptive waits: every scrape profile has base waits (SCRAPE_WAITS: waitFor, timeout
+# and the named waits between its browser actions) and a scale applied to them. The
+# base waits are kept in the profile's state with what was learned for them, and a
+# scale learned for other base waits is dropped. Outcomes are recorded per scale, and
+# after each window of attempts the controller
+#   - tightens the scale while the success rate holds up against what looser scales
+#     achieved (and the tighter scale isn't already known to do worse),
+#   - backs off when the success rate drops below that by more than `tolerance`.
+# The scales and the success curve are persisted to a JSON file so a restart keeps
+# what was learned. With a shared state backend, workers don't write the file: each
+# one buffers its outcomes and merge() folds them into the state every worker shares
+# (the service does the locking and I/O, see ZillowScrapingService.sync_wait_tuning).
+# While the shared state is out of reach only the newest outcomes are kept.
+
+# scales move on a 0.05 grid: one step tighter, two steps back
+STEP = 0.05
+TIGHTEN = -STEP
+BACK_OFF = 2 * STEP
+
+
+def _bucket(scale: float) -> str:
+    return f"{scale:.2f}"
+
+
+class WaitTuner:
+    def __init__(
+        self,
+        path: Optional[str],
+        bases: Optional[Dict[str, Dict[str, int]]] = None,
+        window: int = 20,
+        min_scale: float = 0.5,
+        max_scale: float = 1.5,
+        tolerance: float = 0.05,
+        enabled: bool = True,
+        shared: bool = False,
+    ):
+        self.path = None if shared else path
+        self.bases = bases or {}
+        self.shared = shared
+        self.window = window
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.tolerance = tolerance
+        self.enabled = enabled
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+        # ("record", profile, scale, success, seconds) / ("reset", profile) since the
+        # last merge, at most max_pending of them
+        self.pending: List[Tuple[Any, ...]] = []
+        self.max_pending = 10 * window
+        self.dropped = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                state: Dict[str, Dict[str, Any]] = json.load(f)
+                return state
+        except (OSError, ValueError) as e:
+            logger.warning(
+                f"Ignoring unreadable wait tuning file {self.path}: {str(e)}"
+            )
+            return {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.state, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save wait tuning to {self.path}: {str(e)}")
+
+    def _learned(self, profile: str) -> Optional[Dict[str, Any]]:
+        # the profile's state, unless it was learned for other base waits (entries
+        # from before base waits were stored were learned for the defaults)
+        entry = self.state.get(profile)
+        base = self.bases.get(profile, {})
+        if entry is None or entry.get("base", base) != base:
+            return None
+        return entry
+
+    def _entry(self, profile: str) -> Dict[str, Any]:
+        entry = self._learned(profile)
+        if entry is None:
+            entry = self.state[profile] = {
+                "base": dict(self.bases.get(profile, {})),
+                "scale": 1.0,
+                "attempts": 0,
+                "success": 0,
+                "curve": {},
+                "adjustments": 0,
+                "updated_at": None,
+            }
+        return entry
+
+    def scale(self, profile: str) -> float:
+        entry = self._learned(profile)
+        if not self.enabled or entry is None:
+            return 1.0
+        return float(entry["scale"])
+
+    def apply(
+        self, profile: str, params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], float]:
+        # the profile's base waits, scaled, filled into the params; returns the params
+        # to send and the scale used
+        scale = self.scale(profile)
+        base = self.bases.get(profile, {})
+        params = dict(params)
+        for key in ("waitFor", "timeout"):
+            if key in base:
+                params[key] = int(base[key] * scale)
+        if params.get("actions"):
+            params["actions"] = [
+                (
+                    {"type": "wait", "milliseconds": int(base[action[WAIT]] * scale)}
+                    if WAIT in action
+                    else action
+                )
+                for action in params["actions"]
+            ]
+        return params, scale
+
+    def record(self, profile: str, scale: float, success: bool, seconds: float) -> None:
+        if not self.enabled:
+            return
+        if self.shared:
+            self._hold(("record", profile, scale, success, seconds))
+            return
+        self._record(profile, scale, success, seconds)
+
+    def _hold(self, op: Tuple[Any, ...]) -> None:
+        if op[0] == "reset":
+            # whatever was held for the profile is wiped by the reset anyway
+            self.pending = [held for held in self.pending if held[1] != op[1]]
+        self.pending.append(op)
+        if len(self.pending) <= self.max_pending:
+            return
+        # the shared state has been out of reach for a while: drop the oldest outcome
+        # (a reset is at most one per profile and always kept)
+        oldest = next(
+            (i for i, held in enumerate(self.pending) if held[0] == "record"), 0
+        )
+        del self.pending[oldest]
+        self.dropped += 1
+        if self.dropped == 1:
+            logger.warning(
+                f"Wait tuning: shared state unreachable, keeping only the newest "
+                f"{self.max_pending} outcomes"
+            )
+
+    def merge(
+        self, state: Optional[Dict[str, Dict[str, Any]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        # replay this worker's outcomes and resets onto the shared state, adopt the
+        # result and return it to be stored back
+        self.state = state or {}
+        for op, profile, *outcome in self.pending:
+            if op == "reset":
+                self.state.pop(profile, None)
+            else:
+                self._record(profile, *outcome)
+        self.pending = []
+        self.dropped = 0
+        return self.state
+
+    def _record(
+        self, profile: str, scale: float, success: bool, seconds: float
+    ) -> None:
+        entry = self._entry(profile)
+        point = entry["curve"].setdefault(
+            _bucket(scale), {"attempts": 0, "success": 0, "seconds": 0.0}
+        )
+        point["attempts"] += 1
+        point["success"] += 1 if success else 0
+        point["seconds"] += seconds
+        # forget old history slowly so the curve follows Zillow/Firecrawl as they change
+        if point["attempts"] > 10 * self.window:
+            for key in ("attempts", "success", "seconds"):
+                point[key] /= 2
+
+        # only outcomes at the current scale count towards its decision
+        if scale != entry["scale"]:
+            return
+        entry["attempts"] += 1
+        entry["success"] += 1 if success else 0
+        if entry["attempts"] >= self.window:
+            self._adjust(profile, entry)
+
+    def _rate(self, point: Optional[Dict[str, Any]]) -> Optional[float]:
+        if not point or point["attempts"] < self.window:
+            return None
+        return float(point["success"] / point["attempts"])
+
+    def _adjust(self, profile: str, entry: Dict[str, Any]) -> None:
+        scale = entry["scale"]
+        rate = entry["success"] / entry["attempts"]
+        entry["attempts"] = 0
+        entry["success"] = 0
+
+        # the best success rate seen at looser scales is what we must not fall below
+        rates = [
+            self._rate(point)
+            for bucket, point in entry["curve"].items()
+            if float(bucket) > scale
+        ]
+        looser = [value for value in rates if value is not None]
+        reference = max(looser) if looser else rate
+
+        if rate < reference - self.tolerance:
+            new_scale = min(self.max_scale, round(scale + BACK_OFF, 2))
+        else:
+            new_scale = max(self.min_scale, round(scale + TIGHTEN, 2))
+            tighter = self._rate(entry["curve"].get(_bucket(new_scale)))
+            if tighter is not None and tighter < reference - self.tolerance:
+                # already tried: the tighter waits cost successes, stay here
+                new_scale = scale
+
+        if new_scale != scale:
+            logger.info(
+                f"Wait tuning: {profile} scale {scale:.2f} -> {new_scale:.2f} "
+                f"(success {rate:.2f}, reference {reference:.2f})"
+            )
+            entry["scale"] = new_scale
+            entry["adjustments"] += 1
+        entry["updated_at"] = time.time()
+        self._save()
+
+    def reset(self, profile: str) -> bool:
+        if self.shared:
+            self._hold(("reset", profile))
+        if profile not in self.state:
+            return False
+        del self.state[profile]
+        self._save()
+        return True
+
+    def snapshot(self, profiles: Dict[str, Any]) -> Dict[str, Any]:
+        # current values and success curve per profile, for the admin endpoint
+        result = {}
+        for name, profile in profiles.items():
+            entry = self.state.get(name, {})
+            params, scale = self.apply(name, profile.params())
+            result[name] = {
+                "scale": scale,
+                "base": self.bases.get(name, {}),
+                "waitFor": params.get("waitFor"),
+                "timeout": params.get("timeout"),
+                "adjustments": entry.get("adjustments", 0),
+                "updated_at": entry.get("updated_at"),
+                "curve": {
+                    bucket: {
+                        "attempts": round(point["attempts"]),
+                        "success_rate": (
+                            round(point["success"] / point["attempts"], 3)
+                            if point["attempts"]
+                            else None
+                        ),
+                        "avg_seconds": (
+                            round(point["seconds"] / point["attempts"], 3)
+                            if point["attempts"]
+                            else None
+                        ),
+                    }
+                    for bucket, point in sorted(
+                        entry.get("curve", {}).items(), key=lambda item: float(item[0])
+                    )
+                },
+            }
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "min_scale": self.min_scale,
+            "max_scale": self.max_scale,
+            "tolerance": self.tolerance,
+            "profiles": result,
+        }
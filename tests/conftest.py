@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+from typing import AsyncIterator
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# settings are read once, at import: keep every store in memory or in a scratch
+# directory, and never reach a real Firecrawl
+_scratch = tempfile.mkdtemp(prefix="property-firecrawl-tests-")
+os.environ.update(
+    FIRECRAWL_API_KEY="fc-test",
+    FIRECRAWL_API_KEYS="",
+    FIRECRAWL_CALLS_PER_MINUTE="0",
+    SHARED_STATE_BACKEND="memory",
+    ZPID_CACHE_BACKEND="memory",
+    RESULT_CACHE_BACKEND="memory",
+    FINGERPRINT_BACKEND="memory",
+    AREA_INDEX_BACKEND="memory",
+    CACHE_SQLITE_PATH=os.path.join(_scratch, "cache.sqlite3"),
+    JOBS_SQLITE_PATH=os.path.join(_scratch, "jobs.sqlite3"),
+    WAIT_TUNING_PATH=os.path.join(_scratch, "wait_tuning.json"),
+    WAIT_TUNING_ENABLED="false",
+    JOB_WORKERS="0",
+    TRACING_ENABLED="false",
+)
+
+import httpx  # noqa: E402
+
+from fake_firecrawl import FakeFirecrawl  # noqa: E402
+from services.firecrawl import ZillowScrapingService  # noqa: E402
+
+PROPERTY_URL = (
+    "https://www.zillow.com/homedetails/1407-Kinney-Ave-Austin-TX-78704/1000002_zpid/"
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def fake() -> FakeFirecrawl:
+    return FakeFirecrawl(latency_median=0.0, latency_p95=0.0)
+
+
+@pytest.fixture
+async def service(fake: FakeFirecrawl) -> AsyncIterator[ZillowScrapingService]:
+    scraper = ZillowScrapingService(transport=fake.transport())
+    yield scraper
+    await scraper.aclose()
+
+
+@pytest.fixture
+async def api(service: ZillowScrapingService) -> AsyncIterator[httpx.AsyncClient]:
+    # the FastAPI app, in-process, scraping through `service`
+    from main import app
+    from routers import scraping
+
+    original = scraping.scraper
+    scraping.scraper = service
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=None
+    ) as client:
+        yield client
+    scraping.scraper = original
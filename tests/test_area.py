@@ -0,0 +1,57 @@
+from collections import Counter
+
+import pytest
+
+from fake_firecrawl import FakeFirecrawl
+from services.area import build_zillow_results_url
+from services.firecrawl import ZillowScrapingService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_results_page_harvests_every_listing_and_seeds_the_zpid_cache(
+    fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    page = await service.scrape_zillow_search_page(build_zillow_results_url("78704"))
+    listings = page["listings"]
+    assert len(listings) > 1
+    assert len({card["zpid"] for card in listings}) == len(listings)
+    assert page["credits"] == 5
+
+    # a request for one of them by address goes straight to its property page
+    card = listings[0]
+    calls = fake.calls
+    slug = card["address"].replace(",", "").replace(" ", "-")
+    result = await service.scrape_zillow_property(
+        f"https://www.zillow.com/homedetails/{slug}"
+    )
+    assert result.zpid_cache == "hit"
+    assert result.final_url == card["url"]
+    assert fake.calls == calls + 1
+
+
+async def test_area_recrawl_only_scrapes_new_and_changed_listings(
+    service: ZillowScrapingService,
+) -> None:
+    first = await service.crawl_zillow_area("78704", details=True)
+    assert first["complete"]
+    assert {card["change"] for card in first["listings"]} == {"new"}
+    assert len(first["details"]) == len(first["listings"])
+
+    # since then: one card changed, one listing is new, one went off the market
+    index = await service.area_index.load("78704")
+    changed, new = [card["zpid"] for card in first["listings"][:2]]
+    index[changed]["hash"] = index[changed]["scraped_hash"] = "0" * 16
+    del index[new]
+    index["1"] = {
+        **index[changed],
+        "url": "https://www.zillow.com/homedetails/x/1_zpid/",
+    }
+    await service.area_index.save("78704", index)
+
+    second = await service.crawl_zillow_area("78704", details=True)
+    changes = Counter(card["change"] for card in second["listings"])
+    assert changes == {"new": 1, "changed": 1, "unchanged": len(second["listings"]) - 2}
+    assert sorted(item["zpid"] for item in second["details"]) == sorted([changed, new])
+    assert second["removed"] == ["1"]
+    assert "1" not in await service.area_index.load("78704")
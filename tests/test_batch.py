@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from config.settings import settings
+from services.firecrawl import ZillowScrapingService
+
+pytestmark = pytest.mark.anyio
+
+
+def batch(*addresses: str) -> Dict[str, Any]:
+    return {
+        "properties": [
+            {"address": address, "city": "Austin", "state": "TX", "zip": "78704"}
+            for address in addresses
+        ]
+    }
+
+
+async def test_batch_scrapes_concurrently_and_one_failure_stays_in_its_item(
+    api: httpx.AsyncClient,
+    service: ZillowScrapingService,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    running, most = 0, 0
+
+    async def scrape(zillow_url: str, include_raw: bool = False) -> Any:
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        if "13-Elm" in zillow_url:
+            raise RuntimeError("search failed")
+        return await original(zillow_url, include_raw)
+
+    original = service.scrape_zillow_property
+    monkeypatch.setattr(service, "scrape_zillow_property", scrape)
+    response = await api.post(
+        "/api/scrape/zillow/batch",
+        json=batch("1407 Kinney Ave", "13 Elm St", "2 Oak Rd", "9 Pine Ln"),
+    )
+
+    body = response.json()
+    assert most == 4
+    assert (body["total"], body["succeeded"], body["failed"]) == (4, 3, 1)
+    assert [item["status"] for item in body["results"]] == ["ok", "error", "ok", "ok"]
+    assert body["results"][1]["error"] == "search failed"
+
+
+async def test_oversized_batch_is_refused(
+    api: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "max_batch_size", 1)
+    response = await api.post(
+        "/api/scrape/zillow/batch", json=batch("1407 Kinney Ave", "2 Oak Rd")
+    )
+    assert response.status_code == 400
+
+
+async def test_stream_sends_each_result_then_a_summary(api: httpx.AsyncClient) -> None:
+    frames: List[Dict[str, Any]] = []
+    async with api.stream(
+        "POST",
+        "/api/scrape/zillow/batch/stream",
+        json=batch("1407 Kinney Ave", "2 Oak Rd"),
+    ) as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        async for line in response.aiter_lines():
+            frames.append(json.loads(line))
+
+    # results come as they finish, each batch of them followed by a progress frame
+    types = [frame["type"] for frame in frames]
+    assert frames[0] == {"type": "progress", "completed": 0, "total": 2}
+    assert types[-2:] == ["progress", "done"] and frames[-2]["completed"] == 2
+    assert sorted(frame["index"] for frame in frames if frame["type"] == "result") == [
+        0,
+        1,
+    ]
+    assert frames[-1]["succeeded"] == 2
+
+
+async def test_stream_as_server_sent_events(api: httpx.AsyncClient) -> None:
+    response = await api.post(
+        "/api/scrape/zillow/batch/stream?format=sse", json=batch("1407 Kinney Ave")
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event.split("\n")[0] for event in response.text.split("\n\n") if event]
+    assert events == [
+        "event: progress",
+        "event: result",
+        "event: progress",
+        "event: done",
+    ]
@@ -0,0 +1,85 @@
+from typing import Any, Dict
+
+import httpx
+import pytest
+
+from config.settings import settings
+from fake_firecrawl import FakeFirecrawl
+
+pytestmark = pytest.mark.anyio
+
+PROPERTY = {
+    "address": "1407 Kinney Ave",
+    "city": "Austin",
+    "state": "TX",
+    "zip": "78704",
+}
+
+
+@pytest.fixture(autouse=True)
+def fetch_every_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    # every request fetches the page, so each one goes through change detection
+    monkeypatch.setattr(settings, "result_cache_enabled", False)
+
+
+async def scrape(api: httpx.AsyncClient, **body: Any) -> Dict[str, Any]:
+    response = await api.post("/api/scrape/zillow?mode=diff", json={**PROPERTY, **body})
+    assert response.status_code == 200, response.text
+    result: Dict[str, Any] = response.json()
+    return result
+
+
+def change_price(fake: FakeFirecrawl, old: int, new: int) -> None:
+    # the listed price, on the page and in the embedded listing JSON
+    for page in fake.detail_pages:
+        page["markdown"] = page["markdown"].replace(f"${old:,}", f"${new:,}")
+        if "rawHtml" in page:
+            page["rawHtml"] = page["rawHtml"].replace(
+                f'\\"price\\": {old}', f'\\"price\\": {new}', 1
+            )
+
+
+async def test_first_scrape_sends_everything(api: httpx.AsyncClient) -> None:
+    body = await scrape(api)
+    assert body["changed"] is True
+    assert body["previous_fingerprint"] is None
+    assert body["changes"] is None
+    assert body["property_data"]["address"]
+
+
+async def test_unchanged_rescrape_without_since(api: httpx.AsyncClient) -> None:
+    first = await scrape(api)
+    body = await scrape(api)
+    assert body["fingerprint"] == first["fingerprint"]
+    assert body["previous_fingerprint"] == first["fingerprint"]
+    assert body["changed"] is False
+    assert body["changes"] == {}
+    assert "property_data" not in body
+
+
+async def test_unknown_since_sends_everything(api: httpx.AsyncClient) -> None:
+    await scrape(api)
+    body = await scrape(api, since="not-a-fingerprint")
+    assert body["changed"] is True
+    assert body["changes"] is None
+    assert body["property_data"]["address"]
+
+
+async def test_changed_page_reports_the_fields_that_moved(
+    api: httpx.AsyncClient, fake: FakeFirecrawl
+) -> None:
+    first = await scrape(api)
+    change_price(fake, 849000, 799000)
+
+    body = await scrape(api)
+    assert body["changed"] is True
+    assert body["previous_fingerprint"] == first["fingerprint"]
+    assert body["changes"]["price"] == {"old": "$849,000", "new": "$799,000"}
+
+    # the next day's sync, nothing moved since
+    body = await scrape(api)
+    assert body["changed"] is False
+
+    # a client that still holds the first version gets the same changes
+    body = await scrape(api, since=first["fingerprint"])
+    assert body["changes"]["price"] == {"old": "$849,000", "new": "$799,000"}
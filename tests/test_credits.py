@@ -0,0 +1,220 @@
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+
+from conftest import PROPERTY_URL
+from config.settings import settings
+from fake_firecrawl import FakeFirecrawl
+from routers import jobs as jobs_router
+from services.area import build_zillow_results_url
+from services.credits import (
+    DEFAULT_TENANT,
+    CreditEstimator,
+    CreditLimitError,
+    CreditScheduler,
+    TenantMiddleware,
+    current_priority,
+    current_tenant,
+)
+from services.firecrawl import ZillowScrapingService
+from services.jobs import SQLiteJobQueue
+from services.metrics import CACHE_EVENTS, CREDIT_SCHEDULER
+from services.stats import current_credit_meter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def tight_quota(monkeypatch: pytest.MonkeyPatch) -> None:
+    # one results page (5 credits) a minute, no waiting for more
+    monkeypatch.setattr(settings, "tenant_credits_per_minute", 5)
+    monkeypatch.setattr(settings, "tenant_max_wait_seconds", 0)
+
+
+def scheduler(estimate: float, **overrides: Any) -> CreditScheduler:
+    # a scheduler pricing every "direct" scrape at `estimate`, learning nothing
+    return CreditScheduler(
+        settings.model_copy(update=overrides),
+        CreditEstimator({"direct": estimate}, alpha=0),
+    )
+
+
+async def scrape(
+    credits: CreditScheduler,
+    spend: int,
+    tenant: str = DEFAULT_TENANT,
+    priority: int = 0,
+) -> None:
+    # one admitted scrape, as `tenant` at `priority`, that costs `spend` credits
+    tenant_token = current_tenant.set(tenant)
+    priority_token = current_priority.set(priority)
+    try:
+        async with credits.admit("direct"):
+            meter = current_credit_meter.get()
+            assert meter is not None
+            meter.add(spend)
+    finally:
+        current_priority.reset(priority_token)
+        current_tenant.reset(tenant_token)
+
+
+async def test_scheduler_settles_the_estimate_against_what_was_spent() -> None:
+    credits = scheduler(5, tenant_credits_per_minute=10, tenant_max_wait_seconds=0)
+
+    # cached scrapes cost nothing: their estimate is handed back every time
+    for _ in range(5):
+        await scrape(credits, 0)
+    # an expensive one is charged in full, so the next one no longer fits
+    await scrape(credits, 10)
+    with pytest.raises(CreditLimitError) as raised:
+        await scrape(credits, 0)
+
+    assert raised.value.reason == "Credit quota exceeded"
+    assert not raised.value.deferrable
+    assert 25 <= raised.value.retry_after <= 30
+    counters = credits.stats()["tenants"][DEFAULT_TENANT]
+    assert (counters["admitted"], counters["rejected"]) == (6, 1)
+    assert counters["estimated_credits"] == 30
+    assert counters["credits"] == 10
+
+
+async def test_quotas_are_per_client() -> None:
+    credits = scheduler(
+        5,
+        tenant_max_wait_seconds=0,
+        tenant_quotas={"acme": {"credits_per_minute": 5}},
+    )
+
+    await scrape(credits, 5, tenant="acme")
+    with pytest.raises(CreditLimitError) as raised:
+        await scrape(credits, 5, tenant="acme", priority=-1)
+    # everyone else is unlimited
+    for _ in range(3):
+        await scrape(credits, 5)
+
+    assert raised.value.tenant == "acme"
+    assert raised.value.deferrable
+    assert credits.stats()["tenants"]["acme"]["rejected"] == 1
+
+
+async def test_low_priority_work_is_shed_from_the_budget_reserve() -> None:
+    credits = scheduler(45, credit_budget_per_hour=100, credit_budget_reserve=0.5)
+
+    # 55 of 100 credits left: enough for the scrape, not for the scrape and the reserve
+    await scrape(credits, 45)
+    with pytest.raises(CreditLimitError) as raised:
+        await scrape(credits, 45, priority=-1)
+    # the shed scrape took nothing, normal work still gets the rest
+    await scrape(credits, 45)
+
+    assert raised.value.reason == "Credit budget running low"
+    assert raised.value.deferrable
+    counters = credits.stats()["tenants"][DEFAULT_TENANT]
+    assert (counters["admitted"], counters["shed"]) == (2, 1)
+
+
+async def test_search_pages_and_area_crawls_go_through_the_scheduler(
+    tight_quota: None, api: httpx.AsyncClient, fake: FakeFirecrawl
+) -> None:
+    first = await api.post("/api/scrape/zillow/search", json={"location": "78704"})
+    calls = fake.calls
+    second = await api.post("/api/scrape/zillow/search", json={"location": "78704"})
+    area = await api.post("/api/scrape/zillow/area", json={"location": "78704"})
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert area.status_code == 429
+    assert int(area.headers["Retry-After"]) >= 1
+    assert fake.calls == calls
+
+
+async def test_area_map_is_admitted_and_charged(service: ZillowScrapingService) -> None:
+    crawl = await service.crawl_zillow_area("78704", max_pages=1)
+
+    estimates = service.credit_scheduler.stats()["estimates"]
+    assert estimates["search_page"]["observed"] == 1
+    assert estimates["map"] == {"estimate": 1, "observed": 1}
+    assert crawl["credits"] == 5 + 1
+
+
+async def seen_by_app(headers: Dict[str, str]) -> Tuple[str, int]:
+    # the client and priority a request carrying `headers` runs as
+    seen: List[Tuple[str, int]] = []
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        seen.append((current_tenant.get(), current_priority.get()))
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    middleware = TenantMiddleware(app, keys={"acme-key": "acme"})
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=middleware), base_url="http://test"
+    ) as client:
+        await client.get("/", headers=headers)
+    return seen[0]
+
+
+async def test_only_configured_api_keys_pick_the_client_and_priority() -> None:
+    assert await seen_by_app({"X-API-Key": "acme-key"}) == ("acme", 0)
+    assert await seen_by_app({"X-API-Key": "acme-key", "X-Priority": "-2"}) == (
+        "acme",
+        -2,
+    )
+    # priority can only go down
+    assert await seen_by_app({"X-API-Key": "acme-key", "X-Priority": "9"}) == (
+        "acme",
+        0,
+    )
+    # naming a client, or an unknown key, gets the shared anonymous bucket
+    assert await seen_by_app({"X-Client-ID": "acme", "X-Priority": "-2"}) == (
+        DEFAULT_TENANT,
+        0,
+    )
+    assert await seen_by_app({"X-API-Key": "guess", "X-Priority": "9"}) == (
+        DEFAULT_TENANT,
+        0,
+    )
+
+
+async def test_job_priority_is_clamped_like_the_header(
+    api: httpx.AsyncClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs_router, "queue", queue)
+    monkeypatch.setitem(settings.tenant_api_keys, "acme-key", "acme")
+
+    async def queued(priority: int, headers: Dict[str, str]) -> Dict[str, Any]:
+        response = await api.post(
+            "/api/scrape/jobs",
+            json={"zillow_url": PROPERTY_URL, "priority": priority},
+            headers=headers,
+        )
+        job = queue.get(response.json()["id"])
+        assert job is not None
+        return job
+
+    assert (await queued(100, {}))["priority"] == 0
+    assert (await queued(-3, {}))["priority"] == 0
+    assert (await queued(100, {"X-API-Key": "acme-key"}))["priority"] == 0
+    acme = await queued(-3, {"X-API-Key": "acme-key"})
+    assert acme["priority"] == -3
+    assert acme["payload"]["tenant"] == "acme"
+
+
+async def test_scheduler_decisions_have_their_own_metric(
+    tight_quota: None, service: ZillowScrapingService
+) -> None:
+    def decisions(decision: str) -> float:
+        return CREDIT_SCHEDULER.values.get(("background", "search_page", decision), 0)
+
+    admitted, rejected = decisions("admitted"), decisions("rejected")
+    await service.scrape_zillow_search_page(build_zillow_results_url("78704", 1))
+    with pytest.raises(CreditLimitError):
+        await service.scrape_zillow_search_page(build_zillow_results_url("78704", 2))
+
+    assert decisions("admitted") == admitted + 1
+    assert decisions("rejected") == rejected + 1
+    assert "credit_scheduler" not in {key[1] for key in CACHE_EVENTS.values}
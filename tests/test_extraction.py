@@ -0,0 +1,118 @@
+import json
+import threading
+from typing import Any, Dict
+
+import pytest
+
+from config.settings import settings
+from services.extraction import extract_property_fields
+from services.parsing import ParseExecutor
+from services.profiles import build_profiles, debug_screenshot
+
+pytestmark = pytest.mark.anyio
+
+MARKDOWN = (
+    "$525,000\n"
+    "3 bd 2 ba 1,850 sqft\n"
+    "Single Family Residence, Built in 1998\n"
+    "0.25 Acres lot"
+)
+METADATA = {"title": "1407 Kinney Ave, Austin, TX 78704 | Zillow"}
+
+
+def next_data_page(listing: Dict[str, Any]) -> str:
+    # the listing the way current pages embed it: a JSON string inside __NEXT_DATA__
+    cache = json.dumps({"query": {"property": listing}})
+    data = {"props": {"pageProps": {"componentProps": {"gdpClientCache": cache}}}}
+    return (
+        '<script id="__NEXT_DATA__" type="application/json">'
+        f"{json.dumps(data)}</script>"
+    )
+
+
+def test_markdown_fields_come_from_one_scan() -> None:
+    fields = extract_property_fields(MARKDOWN, METADATA)
+
+    assert fields["address"] == "1407 Kinney Ave, Austin, TX 78704"
+    assert fields["price"] == "$525,000"
+    assert (fields["bedrooms"], fields["bathrooms"]) == (3, 2.0)
+    assert fields["square_feet"] == 1850
+    assert fields["lot_size"] == "0.25 acres"
+    assert fields["year_built"] == 1998
+    assert fields["property_type"] == "Single Family"
+    assert fields["data_source"] == "markdown"
+
+
+def test_embedded_listing_wins_and_markdown_fills_the_gaps() -> None:
+    html = next_data_page(
+        {
+            "zpid": 29373201,
+            "price": 610000,
+            "bedrooms": 4,
+            "homeType": "SINGLE_FAMILY",
+            "zestimate": 600000,
+        }
+    )
+    fields = extract_property_fields(MARKDOWN, METADATA, html)
+
+    assert fields["data_source"] == "next_data"
+    assert (fields["zpid"], fields["price"], fields["bedrooms"]) == (
+        "29373201",
+        "$610,000",
+        4,
+    )
+    assert fields["zestimate"] == 600000
+    # not in the listing JSON
+    assert fields["square_feet"] == 1850
+    assert fields["year_built"] == 1998
+
+
+def test_json_ld_is_used_without_next_data() -> None:
+    html = (
+        '<script type="application/ld+json">not json</script>'
+        '<script type="application/ld+json">'
+        + json.dumps(
+            {"@type": "SingleFamilyResidence", "floorSize": {"value": "1,900"}}
+        )
+        + "</script>"
+    )
+    fields = extract_property_fields(MARKDOWN, METADATA, html)
+
+    assert fields["data_source"] == "json_ld"
+    assert fields["square_feet"] == 1900
+    assert fields["bedrooms"] == 3
+
+
+async def test_parse_executor_only_offloads_large_inputs() -> None:
+    executor = ParseExecutor("thread", workers=1, threshold_bytes=100)
+
+    def parsed_on(_: str) -> str:
+        return threading.current_thread().name
+
+    try:
+        inline = await executor.run(parsed_on, "small", size=10)
+        offloaded = await executor.run(parsed_on, "large", size=1000)
+    finally:
+        executor.shutdown()
+
+    assert inline == threading.current_thread().name
+    assert offloaded.startswith("parse")
+    assert (executor.stats()["inline"], executor.stats()["offloaded"]) == (1, 1)
+
+
+def test_profiles_send_debug_screenshots_only_in_debug_mode(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    actions = [{"type": "click", "selector": "#search"}, debug_screenshot()]
+
+    params = build_profiles(settings)["search_primary"].params(actions=actions)
+    assert params["actions"] == [{"type": "click", "selector": "#search"}]
+    assert "screenshot" not in params["formats"]
+
+    monkeypatch.setattr(settings, "scrape_debug_profiles", "search_primary")
+    profiles = build_profiles(settings)
+    params = profiles["search_primary"].params(actions=actions)
+    assert params["actions"][1] == {"type": "screenshot", "fullPage": False}
+    assert "screenshot" in params["formats"]
+    assert profiles["search_primary"].label == "search_primary:debug"
+    assert not profiles["property"].debug
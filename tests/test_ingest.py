@@ -0,0 +1,102 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from services.ingest import IngestRun
+
+pytestmark = pytest.mark.anyio
+
+
+def write_rows(path: Path, count: int) -> None:
+    with open(path, "w") as f:
+        for number in range(count):
+            f.write(json.dumps({"address": f"{number} Main St"}) + "\n")
+
+
+def read_output(path: Path) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+async def test_row_throttled_with_no_wait_is_retried_then_written_as_failed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write_rows(tmp_path / "rows.jsonl", 1)
+    attempts = 0
+    waits: List[float] = []
+    real_sleep = asyncio.sleep
+
+    async def throttled(row: Any) -> Dict[str, Any]:
+        # a wait that rounded down to nothing
+        nonlocal attempts
+        attempts += 1
+        return {"success": False, "status": "throttled", "retry_after": 0.0}
+
+    async def sleep(seconds: float) -> None:
+        waits.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    run = IngestRun(
+        str(tmp_path / "rows.jsonl"),
+        str(tmp_path / "out.jsonl"),
+        throttled,
+        throttle_retries=3,
+    )
+    progress = await run.run()
+
+    assert attempts == 4
+    assert waits == [1.0, 1.0, 1.0]
+    assert progress["failed"] == 1
+    assert read_output(tmp_path / "out.jsonl") == [
+        {"row": 0, "success": False, "status": "throttled", "retry_after": 0.0}
+    ]
+
+
+async def test_resumed_run_writes_every_row_exactly_once(tmp_path: Path) -> None:
+    write_rows(tmp_path / "rows.jsonl", 7)
+    scraped: List[int] = []
+    crash = True
+
+    async def scrape_row(row: Any) -> Dict[str, Any]:
+        number = int(row["address"].split()[0])
+        if number == 5 and crash:
+            raise RuntimeError("worker killed")
+        scraped.append(number)
+        return {"success": True, "address": row["address"]}
+
+    def start() -> IngestRun:
+        return IngestRun(
+            str(tmp_path / "rows.jsonl"),
+            str(tmp_path / "out.jsonl"),
+            scrape_row,
+            concurrency=1,
+            checkpoint_every=2,
+        )
+
+    with pytest.raises(RuntimeError):
+        await start().run()
+    # row 4 made it into the output, but not into a checkpoint
+    assert len(read_output(tmp_path / "out.jsonl")) == 5
+
+    crash = False
+    run = start()
+    progress = await run.run()
+
+    assert run.resumed_from == 4
+    assert scraped == [0, 1, 2, 3, 4, 4, 5, 6]
+    assert [record["row"] for record in read_output(tmp_path / "out.jsonl")] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+        5,
+        6,
+    ]
+    assert progress["finished"] and progress["succeeded"] == 7
+    assert (await start().run())["rows_done"] == 7
+    assert scraped == [0, 1, 2, 3, 4, 4, 5, 6]
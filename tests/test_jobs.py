@@ -0,0 +1,231 @@
+import asyncio
+import json
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from routers import jobs as jobs_router
+from services.firecrawl import ZillowScrapingService
+from services.jobs import JobWorkerPool, SQLiteJobQueue, check_webhook_url
+
+pytestmark = pytest.mark.anyio
+
+
+def claim_and_crash(queue: SQLiteJobQueue) -> Dict[str, Any]:
+    # claim with a lease that has already run out, as if the worker died mid-scrape
+    job = queue.claim(visibility_timeout=-1)
+    assert job is not None
+    return job
+
+
+def stored(queue: SQLiteJobQueue, job_id: str) -> Dict[str, Any]:
+    job = queue.get(job_id)
+    assert job is not None
+    return job
+
+
+async def test_expired_lease_on_last_attempt_fails_the_job(tmp_path: Path) -> None:
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    job = queue.enqueue(
+        {"zillow_url": "https://www.zillow.com/homedetails/x/1_zpid/"}, max_attempts=2
+    )
+
+    assert claim_and_crash(queue)["attempts"] == 1
+    assert claim_and_crash(queue)["attempts"] == 2
+    reclaimed = claim_and_crash(queue)
+
+    assert reclaimed["status"] == "failed"
+    assert reclaimed["attempts"] == 2
+    assert reclaimed["lease_token"] is None
+    assert "Lease expired" in reclaimed["error"]
+    assert queue.claim(visibility_timeout=60) is None
+    assert stored(queue, job["id"])["status"] == "failed"
+
+
+async def test_worker_delivers_webhook_for_job_failed_on_reclaim(
+    tmp_path: Path, service: ZillowScrapingService
+) -> None:
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    job = queue.enqueue(
+        {"zillow_url": "https://www.zillow.com/homedetails/x/1_zpid/"},
+        max_attempts=1,
+        webhook_url="http://8.8.8.8/hook",
+    )
+    claim_and_crash(queue)
+
+    delivered: List[Dict[str, Any]] = []
+
+    def hook(request: httpx.Request) -> httpx.Response:
+        delivered.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    pool = JobWorkerPool(
+        queue,
+        service,
+        workers=1,
+        visibility_timeout=60,
+        retry_base_seconds=0,
+        poll_interval=0.01,
+    )
+    pool.webhooks = httpx.AsyncClient(transport=httpx.MockTransport(hook))
+    pool.start()
+    await asyncio.sleep(0.1)
+    await pool.stop()
+
+    assert [(d["id"], d["status"]) for d in delivered] == [(job["id"], "failed")]
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "ftp://example.com/hook",
+        "file:///etc/passwd",
+        "http://127.0.0.1:8000/hook",
+        "http://localhost/hook",
+        "http://10.0.0.5/hook",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://[::1]/hook",
+        "http://[::ffff:127.0.0.1]/hook",
+    ],
+)
+async def test_webhook_url_refuses_private_hosts_and_other_schemes(url: str) -> None:
+    with pytest.raises(ValueError):
+        await check_webhook_url(url)
+
+
+async def test_webhook_url_allows_public_and_opted_in_private_hosts() -> None:
+    await check_webhook_url("https://8.8.8.8/hook")
+    await check_webhook_url("http://127.0.0.1:8000/hook", allow_private=True)
+    with pytest.raises(ValueError):
+        await check_webhook_url("gopher://127.0.0.1/", allow_private=True)
+
+
+async def test_private_webhook_is_never_posted(
+    tmp_path: Path, service: ZillowScrapingService
+) -> None:
+    posted: List[httpx.Request] = []
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    pool = JobWorkerPool(
+        queue,
+        service,
+        workers=0,
+        visibility_timeout=60,
+        retry_base_seconds=0,
+        poll_interval=0.01,
+    )
+
+    def hook(request: httpx.Request) -> httpx.Response:
+        posted.append(request)
+        return httpx.Response(200)
+
+    pool.webhooks = httpx.AsyncClient(transport=httpx.MockTransport(hook))
+
+    job = queue.enqueue(
+        {"zillow_url": "https://www.zillow.com/homedetails/x/1_zpid/"},
+        webhook_url="http://127.0.0.1/hook",
+    )
+    await pool._deliver_webhook(stored(queue, job["id"]))
+    await pool.stop()
+
+    assert posted == []
+
+
+async def test_create_job_rejects_private_webhook(
+    api: httpx.AsyncClient, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs_router, "queue", queue)
+    body = {"zillow_url": "https://www.zillow.com/homedetails/x/1_zpid/"}
+
+    refused = await api.post(
+        "/api/scrape/jobs", json={**body, "webhook_url": "http://169.254.169.254/"}
+    )
+    accepted = await api.post(
+        "/api/scrape/jobs", json={**body, "webhook_url": "https://8.8.8.8/hook"}
+    )
+
+    assert refused.status_code == 400
+    assert "public" in refused.json()["detail"]
+    assert accepted.status_code == 202
+    assert queue.counts() == {"queued": 1}
+
+
+async def test_webhook_is_posted_to_the_checked_address(
+    tmp_path: Path, service: ZillowScrapingService, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # the first lookup is public, every later one points at loopback (DNS rebinding)
+    lookups: List[str] = []
+
+    async def getaddrinfo(host: str, port: Any, *args: Any, **kwargs: Any) -> Any:
+        lookups.append(host)
+        address = "93.184.216.34" if len(lookups) == 1 else "127.0.0.1"
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port or 443))]
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    posted: List[httpx.Request] = []
+
+    def hook(request: httpx.Request) -> httpx.Response:
+        posted.append(request)
+        return httpx.Response(200)
+
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    pool = JobWorkerPool(
+        queue,
+        service,
+        workers=0,
+        visibility_timeout=60,
+        retry_base_seconds=0,
+        poll_interval=0.01,
+    )
+    pool.webhooks = httpx.AsyncClient(transport=httpx.MockTransport(hook))
+    job = queue.enqueue(
+        {"zillow_url": "https://www.zillow.com/homedetails/x/1_zpid/"},
+        webhook_url="https://hooks.example.com:8443/done?job=1",
+    )
+    await pool._deliver_webhook(stored(queue, job["id"]))
+    await pool.stop()
+
+    assert lookups == ["hooks.example.com"]
+    [request] = posted
+    assert str(request.url) == "https://93.184.216.34:8443/done?job=1"
+    assert request.headers["host"] == "hooks.example.com:8443"
+    assert request.extensions["sni_hostname"] == "hooks.example.com"
+
+
+async def test_claim_waiting_for_the_write_lock_leaves_the_loop_running(
+    tmp_path: Path, service: ZillowScrapingService
+) -> None:
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = SQLiteJobQueue(path)
+    job = queue.enqueue({"zillow_url": "https://www.zillow.com/homedetails/x/1_zpid/"})
+    # another process holding the write lock
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    pool = JobWorkerPool(
+        queue,
+        service,
+        workers=1,
+        visibility_timeout=60,
+        retry_base_seconds=0,
+        poll_interval=0.01,
+    )
+    pool.start()
+    try:
+        started = time.perf_counter()
+        await asyncio.sleep(0.2)
+        assert time.perf_counter() - started < 0.5
+    finally:
+        other.execute("COMMIT")
+        other.close()
+    for _ in range(100):
+        if stored(queue, job["id"])["status"] == "succeeded":
+            break
+        await asyncio.sleep(0.02)
+    await pool.stop()
+
+    assert stored(queue, job["id"])["status"] == "succeeded"
@@ -0,0 +1,77 @@
+from typing import Any, Iterator
+
+import httpx
+import pytest
+
+from conftest import PROPERTY_URL
+from services import tracing
+
+pytestmark = pytest.mark.anyio
+
+ROUTE = "/api/scrape/zillow/url"
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+def spans(monkeypatch: pytest.MonkeyPatch) -> Iterator[Any]:
+    # tracing switched on, with the finished spans kept in memory
+    sdk = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry import propagate
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = sdk.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("tests"))
+    monkeypatch.setattr(tracing, "_propagate", propagate)
+    yield exporter
+    provider.shutdown()
+
+
+async def test_metrics_are_labeled_by_route_template(api: httpx.AsyncClient) -> None:
+    await api.post(ROUTE, json={"zillow_url": PROPERTY_URL})
+    exposition = (await api.get("/metrics")).text
+
+    assert (
+        f'http_request_duration_seconds_count{{endpoint="{ROUTE}",method="POST",status="200"}}'
+        in exposition
+    )
+    assert (
+        f'property_scrape_stage_seconds_count{{endpoint="{ROUTE}",stage="extraction"}}'
+        in exposition
+    )
+    assert (
+        f'firecrawl_calls_total{{endpoint="{ROUTE}",profile="property",proxy="basic"}}'
+        in exposition
+    )
+
+
+async def test_scrape_spans_nest_under_the_incoming_trace(
+    spans: Any, api: httpx.AsyncClient
+) -> None:
+    await api.post(
+        ROUTE,
+        json={"zillow_url": PROPERTY_URL},
+        headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"},
+    )
+
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    assert {f"POST {ROUTE}", "zillow.scrape", "firecrawl.scrape"} <= set(finished)
+    server, scrape, call = (
+        finished[f"POST {ROUTE}"],
+        finished["zillow.scrape"],
+        finished["firecrawl.scrape"],
+    )
+    assert format(server.context.trace_id, "032x") == TRACE_ID
+    assert scrape.parent.span_id == server.context.span_id
+    assert call.context.trace_id == server.context.trace_id
+    assert server.attributes["http.route"] == ROUTE
+
+
+def test_spans_are_free_when_tracing_is_off() -> None:
+    with tracing.span("zillow.scrape", {"url.full": PROPERTY_URL}) as current:
+        tracing.set_attributes(current, {"zillow.final_url": PROPERTY_URL})
+    assert current is tracing.NOOP_SPAN
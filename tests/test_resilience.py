@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import PROPERTY_URL
+from fake_firecrawl import FakeFirecrawl
+from services.firecrawl import ZillowScrapingService
+from services.resilience import CircuitBreaker, CircuitOpenError
+
+pytestmark = pytest.mark.anyio
+
+
+def half_open(breaker: CircuitBreaker) -> None:
+    breaker.state = "open"
+    breaker.opened_at = time.monotonic() - breaker.reset_seconds - 1
+
+
+async def exhaust_rate_limit(service: ZillowScrapingService) -> None:
+    # one call per minute, already spent: the next call waits in throttle
+    service.limiter.calls_per_minute = 1
+    service.limiter.burst = 1
+    await service.limiter.throttle("fc-test")
+
+
+async def test_breaker_trial_and_key_released_when_cancelled_in_throttle(
+    service: ZillowScrapingService,
+) -> None:
+    await exhaust_rate_limit(service)
+    breaker = service.breakers["stealth"]
+    half_open(breaker)
+
+    call = asyncio.create_task(
+        service._firecrawl_scrape(PROPERTY_URL, profile="search_direct_url")
+    )
+    await asyncio.sleep(0.05)
+    assert breaker.trial_in_flight
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+
+    assert not breaker.trial_in_flight
+    assert breaker.available()
+    assert service.key_pool.in_flight == {"fc-test": 0}
+
+
+async def test_breaker_trial_and_key_released_when_map_cancelled(
+    service: ZillowScrapingService,
+) -> None:
+    await exhaust_rate_limit(service)
+    breaker = service.breakers["basic"]
+    half_open(breaker)
+
+    call = asyncio.create_task(service._map_area_links("austin tx"))
+    await asyncio.sleep(0.05)
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+
+    assert breaker.available()
+    assert service.key_pool.in_flight == {"fc-test": 0}
+
+
+async def test_trial_call_closes_breaker(service: ZillowScrapingService) -> None:
+    breaker = service.breakers["basic"]
+    half_open(breaker)
+    response = await service._firecrawl_scrape(PROPERTY_URL, profile="property")
+    assert response.success
+    assert breaker.state == "closed"
+    assert service.key_pool.in_flight == {"fc-test": 0}
+
+
+async def test_breaker_opening_mid_search_is_not_cached_as_not_found(
+    fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    # every stealth call fails and the first failure opens the breaker, so the second
+    # strategy is refused by it
+    fake.error_rate = 1.0
+    service.breakers["stealth"].failure_threshold = 1
+    service.search_mode = "sequential"
+    address_url = "https://www.zillow.com/homedetails/1407-Kinney-Ave-Austin-TX-78704"
+
+    with pytest.raises(CircuitOpenError):
+        await service.scrape_zillow_property(address_url)
+
+    assert await service.zpid_cache.lookup("1407 Kinney Ave, Austin, TX 78704") is None
+    samples = {
+        name: strategy["samples"]
+        for name, strategy in service.strategy_scheduler.snapshot()[
+            "strategies"
+        ].items()
+    }
+    # only the call that actually failed counts against its strategy
+    assert sum(samples.values()) == 1
+
+
+def test_late_calls_leave_the_half_open_trial_alone() -> None:
+    breaker = CircuitBreaker("basic", failure_threshold=1, reset_seconds=30)
+    late = breaker.before_call()
+    failing = breaker.before_call()
+    breaker.record(False, failing)
+    assert breaker.state == "open"
+
+    half_open(breaker)
+    trial = breaker.before_call()
+    assert trial and not late
+    # a call from before the breaker opened finishes while the trial runs
+    breaker.record(True, late)
+    assert breaker.state == "half_open"
+    assert breaker.trial_in_flight
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.release(late)
+    assert breaker.trial_in_flight
+
+    breaker.record(False, trial)
+    assert breaker.state == "open"
+    assert not breaker.trial_in_flight
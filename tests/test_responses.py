@@ -0,0 +1,68 @@
+from typing import Dict
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from services import responses
+from services.responses import CompressionMiddleware, negotiate_encoding
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def gzip_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    # what the service offers without the brotli package
+    monkeypatch.setattr(responses, "brotli", None)
+
+
+def test_negotiation_picks_the_preferred_offered_encoding(gzip_only: None) -> None:
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("br;q=1.0, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+
+
+async def served(path: str, headers: Dict[str, str]) -> httpx.Response:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        body = "x" * 2000
+        response: Response
+        if scope["path"] == "/small":
+            response = PlainTextResponse("x" * 10)
+        elif scope["path"] == "/stream":
+            response = StreamingResponse(iter([body, body]), media_type="text/plain")
+        else:
+            response = PlainTextResponse(body)
+        await response(scope, receive, send)
+
+    transport = httpx.ASGITransport(app=CompressionMiddleware(app, minimum_size=1024))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(path, headers=headers)
+    return response
+
+
+async def test_large_bodies_are_compressed_for_clients_that_accept_it(
+    gzip_only: None,
+) -> None:
+    response = await served("/", {"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < 100
+    assert response.text == "x" * 2000
+
+
+@pytest.mark.parametrize(
+    "path,accept_encoding",
+    [("/", "identity"), ("/small", "gzip"), ("/stream", "gzip")],
+)
+async def test_other_responses_pass_through_untouched(
+    gzip_only: None, path: str, accept_encoding: str
+) -> None:
+    response = await served(path, {"Accept-Encoding": accept_encoding})
+
+    assert "content-encoding" not in response.headers
+    assert set(response.text) == {"x"}
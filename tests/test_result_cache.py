@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import PROPERTY_URL
+from fake_firecrawl import FakeFirecrawl
+from services.firecrawl import ZillowScrapingService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_repeat_scrape_is_served_from_the_result_cache(
+    fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    first = await service.scrape_zillow_property(PROPERTY_URL)
+    second = await service.scrape_zillow_property(PROPERTY_URL)
+    assert (first.result_cache, second.result_cache) == ("miss", "fresh")
+    assert second.property_data == first.property_data
+    assert fake.calls == 1
+
+
+async def test_include_raw_refetches_when_the_cache_has_no_markdown(
+    api: httpx.AsyncClient, fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    assert not service.result_cache.store_raw
+    url = "/api/scrape/zillow/url?include_raw=true"
+
+    first = await api.post(url, json={"zillow_url": PROPERTY_URL})
+    second = await api.post(url, json={"zillow_url": PROPERTY_URL})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["raw_content"]
+    assert second.json()["raw_content"] == first.json()["raw_content"]
+    assert fake.calls == 2
+
+    # callers that don't want the markdown still get the cached result
+    await api.post("/api/scrape/zillow/url", json={"zillow_url": PROPERTY_URL})
+    assert fake.calls == 2
+
+
+async def test_include_raw_uses_cached_markdown_when_stored(
+    api: httpx.AsyncClient, fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    service.result_cache.store_raw = True
+    url = "/api/scrape/zillow/url?include_raw=true"
+
+    first = await api.post(url, json={"zillow_url": PROPERTY_URL})
+    second = await api.post(url, json={"zillow_url": PROPERTY_URL})
+    assert second.json()["raw_content"] == first.json()["raw_content"] != ""
+    assert fake.calls == 1
+
+
+async def test_identical_scrapes_in_flight_share_one_call(
+    fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    first, second = await asyncio.gather(
+        service.scrape_zillow_property(PROPERTY_URL),
+        service.scrape_zillow_property(PROPERTY_URL),
+    )
+
+    assert fake.calls == 1
+    assert service.single_flight.stats()["hits"] == 1
+    # each caller gets its own copy
+    assert first is not second
+    assert first.property_data == second.property_data
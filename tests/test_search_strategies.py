@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from config.settings import settings
+from fake_firecrawl import FakeFirecrawl
+from services.firecrawl import ZillowScrapingService
+from services.scheduler import StrategyScheduler
+
+ADDRESS_URL = "https://www.zillow.com/homedetails/1407-Kinney-Ave-Austin-TX-78704"
+
+
+def scheduler() -> StrategyScheduler:
+    return StrategyScheduler(
+        ["primary", "fallback", "direct_url"], min_samples=2, breaker_failures=2
+    )
+
+
+def test_hedged_lead_stays_first_until_every_strategy_is_measured() -> None:
+    strategies = scheduler()
+    assert strategies.order() == ["primary", "fallback", "direct_url"]
+    assert strategies.order(lead="direct_url") == ["direct_url", "primary", "fallback"]
+
+    for _ in range(2):
+        strategies.record("primary", True, 1.0)
+        strategies.record("direct_url", True, 5.0)
+    assert strategies.order(lead="direct_url")[0] == "direct_url"
+
+    for _ in range(2):
+        strategies.record("fallback", True, 3.0)
+    assert strategies.order(lead="direct_url") == ["primary", "fallback", "direct_url"]
+
+
+def test_cut_short_runs_are_neither_successes_nor_failures() -> None:
+    strategies = scheduler()
+    strategies.record("primary", False, 1.0)
+    for _ in range(3):
+        strategies.record("primary", None, 2.0)
+    assert strategies.consecutive_failures["primary"] == 1
+    assert "primary" not in strategies.opened_at
+
+    # 7s observed over 1 finished run, success rate (0 + 1) / (1 + 2)
+    assert strategies.score("primary") == pytest.approx(7.0 / (1 / 3))
+    snapshot = strategies.snapshot()["strategies"]["primary"]
+    assert (snapshot["samples"], snapshot["cut_short"], snapshot["success_rate"]) == (
+        4,
+        3,
+        0.0,
+    )
+
+    strategies.load(
+        {
+            "primary": [
+                {"success": None, "seconds": 2.0},
+                {"success": False, "seconds": 1.0},
+            ]
+        }
+    )
+    assert strategies.consecutive_failures["primary"] == 1
+
+
+@pytest.mark.anyio
+async def test_hedged_search_starts_with_direct_url_and_records_the_loser(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    fake = FakeFirecrawl(latency_median=0.01, latency_p95=0.01)
+    service = ZillowScrapingService(transport=fake.transport())
+    service.search_mode = "hedged"
+    primary = service._attempt_zillow_search_primary
+
+    async def slow_primary(address: str) -> Any:
+        await asyncio.sleep(1.0)
+        return await primary(address)
+
+    monkeypatch.setattr(service, "_attempt_zillow_search_primary", slow_primary)
+    monkeypatch.setattr(settings, "search_hedge_delay_seconds", 10.0)
+    try:
+        result = await service.scrape_zillow_property(ADDRESS_URL)
+        # the losing search is cancelled, not awaited; let it unwind
+        await asyncio.sleep(0.05)
+    finally:
+        await service.aclose()
+
+    assert result.success
+    strategies = service.strategy_scheduler.snapshot()["strategies"]
+    # the direct URL search ran first; it lands on a results page, which launches the
+    # hedge straight away instead of after 10s
+    assert strategies["direct_url"]["samples"] == 1
+    assert strategies["direct_url"]["cut_short"] == 0
+    # fallback won, primary was cancelled and recorded as cut short
+    assert strategies["fallback"]["samples"] == 1
+    assert (strategies["primary"]["samples"], strategies["primary"]["cut_short"]) == (
+        1,
+        1,
+    )
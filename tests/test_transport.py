@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import PROPERTY_URL
+from fake_firecrawl import FakeFirecrawl
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_httpx_transport_returns_scrape_response(fake: FakeFirecrawl) -> None:
+    transport = fake.transport()
+    try:
+        response = await transport.scrape_url(PROPERTY_URL, formats=["markdown"])
+    finally:
+        await transport.aclose()
+    assert response.success
+    assert "1407 Kinney" in response.markdown
+
+
+async def test_httpx_transport_calls_run_concurrently() -> None:
+    fake = FakeFirecrawl(latency_median=0.2, latency_p95=0.2)
+    transport = fake.transport()
+    started = time.perf_counter()
+    try:
+        responses = await asyncio.gather(
+            *[
+                transport.scrape_url(PROPERTY_URL, formats=["markdown"])
+                for _ in range(10)
+            ]
+        )
+    finally:
+        await transport.aclose()
+    assert all(response.success for response in responses)
+    # ten 0.2s calls one after another would take 2s
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from config.settings import settings
+from fake_firecrawl import FakeFirecrawl
+from services.firecrawl import ZillowScrapingService
+from services.profiles import named_wait
+from services.tuning import WaitTuner
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def shared_tuning(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # two "workers" sharing one SQLite state file, tuning after every 4 property calls
+    monkeypatch.setattr(settings, "shared_state_backend", "sqlite")
+    monkeypatch.setattr(settings, "cache_sqlite_path", str(tmp_path / "shared.sqlite3"))
+    monkeypatch.setattr(
+        settings, "wait_tuning_path", str(tmp_path / "wait_tuning.json")
+    )
+    monkeypatch.setattr(settings, "wait_tuning_enabled", True)
+    monkeypatch.setattr(settings, "wait_tuning_window", 4)
+    monkeypatch.setattr(settings, "wait_tuning_sync_seconds", 3600)
+    monkeypatch.setattr(settings, "result_cache_enabled", False)
+
+
+async def scrape(worker: ZillowScrapingService, zpids: List[int]) -> None:
+    for zpid in zpids:
+        await worker.scrape_zillow_property(
+            f"https://www.zillow.com/homedetails/x/{zpid}_zpid/"
+        )
+
+
+async def test_workers_tune_waits_from_each_others_outcomes(
+    shared_tuning: None, fake: FakeFirecrawl
+) -> None:
+    first = ZillowScrapingService(transport=fake.transport())
+    second = ZillowScrapingService(transport=fake.transport())
+    try:
+        # half a window each: neither worker could decide on its own outcomes
+        await scrape(first, [1000001, 1000002])
+        await scrape(second, [1000003, 1000004])
+        await first.sync_wait_tuning(force=True)
+        await second.sync_wait_tuning(force=True)
+        await first.sync_wait_tuning(force=True)
+
+        for worker in (first, second):
+            assert worker.wait_tuner.scale("property") == 0.95
+            assert worker.wait_tuner.state["property"]["curve"]["1.00"]["attempts"] == 4
+    finally:
+        await first.aclose()
+        await second.aclose()
+
+
+async def test_reset_reaches_the_other_workers(
+    shared_tuning: None, fake: FakeFirecrawl
+) -> None:
+    first = ZillowScrapingService(transport=fake.transport())
+    second = ZillowScrapingService(transport=fake.transport())
+    try:
+        await scrape(first, [1000001, 1000002, 1000003, 1000004])
+        await first.sync_wait_tuning(force=True)
+        await second.sync_wait_tuning(force=True)
+        assert second.wait_tuner.scale("property") == 0.95
+
+        first.wait_tuner.reset("property")
+        await first.sync_wait_tuning(force=True)
+        await second.sync_wait_tuning(force=True)
+
+        assert second.wait_tuner.scale("property") == 1.0
+    finally:
+        await first.aclose()
+        await second.aclose()
+
+
+def test_base_waits_come_from_the_tuned_state(tmp_path: Path) -> None:
+    path = str(tmp_path / "wait_tuning.json")
+    bases = {"search": {"waitFor": 2000, "page_load": 3000}}
+    tuner = WaitTuner(path, bases=bases, window=2)
+    for _ in range(2):
+        tuner.record("search", 1.0, True, 1.0)
+
+    params, scale = tuner.apply("search", {"actions": [named_wait("page_load")]})
+    assert scale == 0.95
+    assert params == {
+        "waitFor": 1900,
+        "actions": [{"type": "wait", "milliseconds": 2850}],
+    }
+    assert WaitTuner(path, bases=bases, window=2).scale("search") == 0.95
+
+    # a scale learned for other base waits doesn't carry over
+    changed = WaitTuner(path, bases={"search": {"waitFor": 4000}}, window=2)
+    assert changed.apply("search", {}) == ({"waitFor": 4000}, 1.0)
+
+
+def test_held_outcomes_are_capped_while_shared_state_is_unreachable() -> None:
+    tuner = WaitTuner(None, window=2, shared=True)
+    tuner.reset("search")
+    for _ in range(50):
+        tuner.record("property", 1.0, True, 1.0)
+
+    assert len(tuner.pending) == tuner.max_pending == 20
+    assert tuner.pending[0] == ("reset", "search")
+    assert tuner.dropped == 31
@@ -0,0 +1,95 @@
+from typing import Any
+
+import pytest
+from firecrawl.firecrawl import ScrapeResponse
+
+from config.settings import settings
+from fake_firecrawl import FakeFirecrawl
+from services.cache import MemoryBackend, ZpidCache
+from services.firecrawl import ZillowScrapingService
+from services.results import PropertyNotFound
+
+pytestmark = pytest.mark.anyio
+
+# an address request: the URL routers build when there is no zpid
+ADDRESS = "1407 Kinney Ave, Austin, TX 78704"
+ADDRESS_URL = "https://www.zillow.com/homedetails/1407-Kinney-Ave-Austin-TX-78704"
+
+
+async def test_failed_search_calls_are_not_cached_as_not_found(
+    fake: FakeFirecrawl,
+    service: ZillowScrapingService,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # every Firecrawl call errors, but never enough to open the breaker
+    fake.error_rate = 1.0
+    service.breakers["stealth"].failure_threshold = 100
+    service.search_mode = "sequential"
+    monkeypatch.setattr(settings, "retry_backoff_base_seconds", 0)
+
+    with pytest.raises(Exception) as raised:
+        await service.scrape_zillow_property(ADDRESS_URL)
+
+    assert not isinstance(raised.value, PropertyNotFound)
+    assert await service.zpid_cache.lookup(ADDRESS) is None
+
+
+async def test_search_without_a_listing_is_cached_as_not_found(
+    fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    searches = 0
+
+    async def no_listing(address: str) -> Any:
+        # Zillow answered, on a page with no listing on it
+        nonlocal searches
+        searches += 1
+        return ScrapeResponse(
+            markdown="",
+            metadata={
+                "sourceURL": "https://www.zillow.com/mortgage-rates/",
+                "statusCode": 200,
+            },
+        )
+
+    service._run_search_strategies = no_listing  # type: ignore[method-assign]
+
+    for _ in range(2):
+        with pytest.raises(PropertyNotFound):
+            await service.scrape_zillow_property(ADDRESS_URL)
+
+    entry = await service.zpid_cache.lookup(ADDRESS)
+    assert entry is not None and entry["not_found"]
+    assert searches == 1
+
+
+async def test_resolved_address_skips_the_search(
+    fake: FakeFirecrawl, service: ZillowScrapingService
+) -> None:
+    first = await service.scrape_zillow_property(ADDRESS_URL)
+    calls = fake.calls
+    # the same address written differently shares the entry
+    second = await service.scrape_zillow_property(
+        "https://www.zillow.com/homedetails/1407-kinney-ave.-austin,-tx-78704"
+    )
+
+    assert (first.zpid_cache, second.zpid_cache) == ("miss", "hit")
+    assert second.final_url == first.final_url
+    assert fake.calls == calls
+    assert service.zpid_cache.stats() == {"hits": 1, "negative_hits": 0, "misses": 1}
+
+
+async def test_entries_expire_and_the_least_recently_used_is_evicted() -> None:
+    # addresses that couldn't be resolved get their own, shorter, TTL
+    cache = ZpidCache(MemoryBackend(max_entries=2), ttl=60, negative_ttl=-1)
+    await cache.store_not_found("1 Main St", "no listing")
+    assert await cache.lookup("1 Main St") is None
+
+    await cache.store("1 Main St", "https://www.zillow.com/homedetails/x/1_zpid/")
+    await cache.store("2 Main St", "https://www.zillow.com/homedetails/x/2_zpid/")
+    await cache.lookup("1 main st.")
+    await cache.store("3 Main St", "https://www.zillow.com/homedetails/x/3_zpid/")
+
+    first = await cache.lookup("1 Main St")
+    assert first is not None and first["zpid"] == "1"
+    assert await cache.lookup("2 Main St") is None
+    assert await cache.lookup("3 Main St") is not None